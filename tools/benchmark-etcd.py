@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the container lookups of the etcd backend with and without indexes.
+
+The etcd keyspace is served from memory, so that the numbers show the cost
+spent in the backend itself. The number of etcd nodes read by a lookup is
+what the etcd server would send over the network. The "scan" mode reads
+every container for each lookup, like the backend did before the indexes.
+
+Usage: tools/benchmark-etcd.py [--containers 1000 10000 50000] [--rounds 20]
+"""
+
+import argparse
+import time
+
+import mock
+from oslo_serialization import jsonutils as json
+
+from zun.common import context as zun_context
+import zun.conf
+from zun.db.etcd import api as etcd_api
+from zun.tests.unit.db import utils
+
+CONF = zun.conf.CONF
+
+CONTAINERS_PER_HOST = 50
+CONTAINERS_PER_PROJECT = 200
+
+
+def populate(api, client, count):
+    for i in range(count):
+        values = utils.get_test_container(
+            uuid='%08d-0000-0000-0000-000000000000' % i,
+            name='container%d' % i,
+            host='host%d' % (i // CONTAINERS_PER_HOST),
+            project_id='project%d' % (i // CONTAINERS_PER_PROJECT))
+        client.write('/containers/' + values['uuid'],
+                     json.dump_as_bytes(values))
+        api._write_container_indexes(values)
+    client.write(etcd_api.CONTAINER_INDEX_PATH + '/built', 'now')
+
+
+def measure(client, rounds, func):
+    client.reads = client.nodes_read = 0
+    start = time.time()
+    for i in range(rounds):
+        func(i)
+    return ((time.time() - start) * 1000 / rounds,
+            client.nodes_read // rounds)
+
+
+def run(count, rounds, scan):
+    client = utils.FakeEtcdClient()
+    api = etcd_api.EtcdAPI(host=CONF.etcd.etcd_host, port=CONF.etcd.etcd_port)
+    api._container_indexes_built = True
+    admin = zun_context.get_admin_context(all_tenants=True)
+    patchers = [mock.patch.object(api, 'client', client)]
+    if scan:
+        patchers.append(mock.patch.object(
+            api, '_find_containers',
+            side_effect=lambda filters: api._scan_containers()))
+    for patcher in patchers:
+        patcher.start()
+    try:
+        populate(api, client, count)
+        return [
+            measure(client, rounds, lambda i: api.get_container_by_name(
+                admin, 'container%d' % (i * 7919 % count))),
+            measure(client, rounds, lambda i: api.list_containers(
+                admin, filters={'host': 'host%d' % (
+                    i % (count // CONTAINERS_PER_HOST))})),
+            measure(client, rounds, lambda i: api.list_containers(
+                admin, filters={'project_id': 'project%d' % (
+                    i % (count // CONTAINERS_PER_PROJECT))}, limit=50)),
+        ]
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--containers', type=int, nargs='+',
+                        default=[1000, 10000, 50000])
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    CONF([], project='zun')
+
+    print('%10s %-6s %-16s %12s %12s' % ('containers', 'mode', 'lookup',
+                                         'mean (ms)', 'nodes read'))
+    for count in args.containers:
+        for mode in ('scan', 'index'):
+            results = run(count, args.rounds, mode == 'scan')
+            for name, (mean, nodes) in zip(
+                    ('by name', 'by host', 'project page'), results):
+                print('%10d %-6s %-16s %12.1f %12d' % (count, mode, name,
+                                                       mean, nodes))
+
+
+if __name__ == '__main__':
+    main()
@@ -95,6 +95,10 @@ class CapsuleController(base.Controller):
         new_capsule.containers_uuids = []
         new_capsule.volumes = []
         count = len(containers_spec)
+        # NOTE: The containers of a capsule share the sandbox so they are
+        # placed together, the capsule is scheduled with their total request.
+        capsule_cpu = 0
+        capsule_memory = 0
 
         capsule_restart_policy = capsules_spec.get('restart_policy', 'always')
 
@@ -150,9 +154,11 @@ class CapsuleController(base.Controller):
                 allocation = resources_list.get('allocation')
                 if allocation.get('cpu'):
                     container_dict['cpu'] = allocation.get('cpu')
+                    capsule_cpu += allocation['cpu']
                 if allocation.get('memory'):
                     container_dict['memory'] = \
                         str(allocation['memory']) + 'M'
+                    capsule_memory += int(allocation['memory'])
                 container_dict.pop('resources')
 
             if capsule_restart_policy:
@@ -168,6 +174,10 @@ class CapsuleController(base.Controller):
             new_capsule.containers.append(new_container)
             new_capsule.containers_uuids.append(new_container.uuid)
 
+        if capsule_cpu:
+            new_capsule.cpu = capsule_cpu
+        if capsule_memory:
+            new_capsule.memory = str(capsule_memory) + 'M'
         new_capsule.save(context)
         compute_api.capsule_create(context, new_capsule, requested_networks)
         # Set the HTTP Location Header
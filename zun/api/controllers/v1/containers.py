@@ -55,16 +55,24 @@ def check_policy_on_container(container, action):
     policy.enforce(context, action, container, action=action)
 
 
-def is_all_tenants(search_opts):
-    all_tenants = search_opts.get('all_tenants')
-    if all_tenants:
+def _get_bool_option(search_opts, key):
+    value = search_opts.get(key)
+    if value:
         try:
-            all_tenants = strutils.bool_from_string(all_tenants, True)
+            value = strutils.bool_from_string(value, True)
         except ValueError as err:
             raise exception.InvalidValue(six.text_type(err))
     else:
-        all_tenants = False
-    return all_tenants
+        value = False
+    return value
+
+
+def is_all_tenants(search_opts):
+    return _get_bool_option(search_opts, 'all_tenants')
+
+
+def is_refresh(search_opts):
+    return _get_bool_option(search_opts, 'refresh')
 
 
 class ContainerCollection(collection.Collection):
@@ -153,14 +161,10 @@ class ContainersController(base.Controller):
                                             sort_dir,
                                             filters=filters)
 
-        for i, c in enumerate(containers):
-            try:
-                containers[i] = compute_api.container_show(context, c)
-            except Exception as e:
-                LOG.exception("Error while list container %(uuid)s: "
-                              "%(e)s.",
-                              {'uuid': c.uuid, 'e': e})
-                containers[i].status = consts.UNKNOWN
+        # NOTE(zun): The recorded state is kept up to date by the compute
+        # hosts, querying them is only done on request.
+        if is_refresh(kwargs):
+            containers = compute_api.container_show_many(context, containers)
 
         return ContainerCollection.convert_with_links(containers, limit,
                                                       url=resource_url,
@@ -18,7 +18,11 @@ from zun.api.controllers.v1.views import hosts_view as view
 from zun.api import utils as api_utils
 from zun.common import exception
 from zun.common import policy
+import zun.conf
 from zun import objects
+from zun.scheduler import base_filters
+
+CONF = zun.conf.CONF
 
 
 def _get_host(host_ident):
@@ -61,6 +65,10 @@ class HostCollection(collection.Collection):
 class HostController(base.Controller):
     """Host info controller"""
 
+    _custom_actions = {
+        'scheduler_filters': ['GET'],
+    }
+
     @pecan.expose('json')
     @base.Controller.api_version("1.4")
     @exception.wrap_pecan_controller_exception
@@ -107,3 +115,31 @@ class HostController(base.Controller):
         policy.enforce(context, "host:get", action="host:get")
         host = _get_host(host_ident)
         return view.format_host(pecan.request.host_url, host)
+
+    @pecan.expose('json')
+    @base.Controller.api_version("1.7")
+    @exception.wrap_pecan_controller_exception
+    def scheduler_filters(self):
+        """Retrieve the order and the statistics of the scheduler filters.
+
+        The statistics are the ones of the filters run by this API process,
+        each API worker process keeps its own.
+        """
+        context = pecan.request.context
+        policy.enforce(context, "host:scheduler_filters",
+                       action="host:scheduler_filters")
+        statistics = base_filters.FilterStatistics()
+        stats = statistics.get_stats()
+        names = CONF.scheduler.enabled_filters
+        if CONF.scheduler.adaptive_filter_ordering:
+            names = sorted(names, key=statistics.rank)
+        filters = []
+        for name in names:
+            filter_stats = {'calls': 0, 'hosts': 0, 'rejected': 0,
+                            'time': 0.0, 'selectivity': 0.0,
+                            'cost_per_host': 0.0}
+            filter_stats.update(stats.get(name, {}))
+            filter_stats['name'] = name
+            filters.append(filter_stats)
+        return {'adaptive_ordering': CONF.scheduler.adaptive_filter_ordering,
+                'filters': filters}
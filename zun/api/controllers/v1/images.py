@@ -20,6 +20,7 @@ from zun.api.controllers.v1 import collection
 from zun.api.controllers.v1.schemas import images as schema
 from zun.api.controllers.v1.views import images_view as view
 from zun.api import utils as api_utils
+from zun.common import consts
 from zun.common import exception
 from zun.common.i18n import _
 from zun.common import policy
@@ -57,7 +58,8 @@ class ImagesController(base.Controller):
     """Controller for Images"""
 
     _custom_actions = {
-        'search': ['GET']
+        'search': ['GET'],
+        'warm': ['POST']
     }
 
     @pecan.expose('json')
@@ -118,6 +120,65 @@ class ImagesController(base.Controller):
         pecan.response.status = 202
         return view.format_image(pecan.request.host_url, new_image)
 
+    @pecan.expose('json')
+    @base.Controller.api_version("1.8")
+    @api_utils.enforce_content_types(['application/json'])
+    @exception.wrap_pecan_controller_exception
+    @validation.validated(schema.image_warm)
+    def warm(self, **warm_dict):
+        """Pre-pull images on compute hosts.
+
+        The images are pulled in the background on the given hosts, or on
+        the hosts having all the given labels, or else on all the hosts.
+        The images must have been pulled in the project of the request.
+        The progress of each host is reported in the warm_status of the
+        images.
+        """
+        context = pecan.request.context
+        policy.enforce(context, "image:warm",
+                       action="image:warm")
+        images = warm_dict['images']
+        hosts = warm_dict.get('hosts')
+        labels = warm_dict.get('labels')
+        nodes = objects.ComputeNode.list(context)
+        if hosts:
+            known = set(node.hostname for node in nodes)
+            for host in hosts:
+                if host not in known:
+                    raise exception.ComputeNodeNotFound(compute_node=host)
+            nodes = [node for node in nodes if node.hostname in hosts]
+        if labels:
+            nodes = [node for node in nodes
+                     if all((node.labels or {}).get(key) == value
+                            for key, value in labels.items())]
+        target_hosts = [node.hostname for node in nodes]
+        if not target_hosts:
+            raise exception.InvalidValue(
+                _('No compute host matches the given hosts and labels.'))
+
+        warm_images = []
+        for name in images:
+            repo, tag = utils.parse_image_name(name)
+            found = objects.Image.list(context,
+                                       filters={'repo': repo, 'tag': tag})
+            if not found:
+                raise exception.ImageNotFound(image=name)
+            warm_images.append(found[0])
+        # NOTE(zun): The compute hosts update the status of the same images,
+        # so each host entry is written under the image lock.
+        for image in warm_images:
+            for host in target_hosts:
+                image.update_warm_status(context, host,
+                                         consts.IMAGE_WARM_PENDING)
+
+        LOG.debug('Warming images %(images)s on hosts %(hosts)s',
+                  {'images': images, 'hosts': target_hosts})
+        pecan.request.compute_api.image_warm(context, warm_images,
+                                             target_hosts)
+        pecan.response.status = 202
+        return {'images': [view.format_image(pecan.request.host_url, image)
+                           for image in warm_images]}
+
     @pecan.expose('json')
     @exception.wrap_pecan_controller_exception
     @validation.validate_query_param(pecan.request, schema.query_param_search)
@@ -27,6 +27,26 @@ image_create = {
     'additionalProperties': False
 }
 
+image_warm = {
+    'type': 'object',
+    'properties': {
+        'images': {
+            'type': 'array',
+            'items': parameter_types.repo,
+            'minItems': 1,
+            'uniqueItems': True
+        },
+        'hosts': {
+            'type': ['array', 'null'],
+            'items': parameter_types.hostname,
+            'uniqueItems': True
+        },
+        'labels': parameter_types.labels
+    },
+    'required': ['images'],
+    'additionalProperties': False
+}
+
 query_param_search = {
     'type': 'object',
     'properties': {
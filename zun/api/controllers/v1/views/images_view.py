@@ -22,7 +22,8 @@ _basic_keys = (
     'repo',
     'tag',
     'size',
-    'image_pull_policy'
+    'image_pull_policy',
+    'warm_status'
 )
 
 
@@ -73,7 +73,9 @@ class ZunServiceController(base.Controller):
             raise exception.ZunServiceNotFound(
                 binary=binary, host=host)
         else:
-            return svc.update(context, payload)
+            result = svc.update(context, payload)
+            svcgrp_api.ServiceListCache().invalidate(binary)
+            return result
 
     def _enable_or_disable(self, context, body, params_to_update):
         """Enable/Disable scheduling for a service."""
@@ -153,6 +155,7 @@ class ZunServiceController(base.Controller):
                 binary=binary, host=host)
         else:
             svc.destroy(context)
+            svcgrp_api.ServiceListCache().invalidate(binary)
 
     @pecan.expose('json')
     @exception.wrap_pecan_controller_exception
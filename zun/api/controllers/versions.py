@@ -39,10 +39,12 @@ REST_API_VERSION_HISTORY = """REST API Version History:
     * 1.4 - Support list all container host and show a container host
     * 1.5 - Add runtime to container
     * 1.6 - Support detach network from a container
+    * 1.7 - Add the scheduler filters debug api of the hosts
+    * 1.8 - Add the image warming api
 """
 
 BASE_VER = '1.1'
-CURRENT_MAX_VER = '1.6'
+CURRENT_MAX_VER = '1.8'
 
 
 class Version(object):
@@ -11,18 +11,80 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
+import time
+
 from oslo_utils import timeutils
+import six
 
+from zun.common import singleton
 import zun.conf
 from zun import objects
 
 CONF = zun.conf.CONF
 
 
+@six.add_metaclass(singleton.Singleton)
+class ServiceListCache(object):
+    """Process-wide TTL cache of the zun services listed by binary."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._services = {}
+        self._hits = 0
+        self._misses = 0
+
+    def list_by_binary(self, context, binary, use_cache=True):
+        ttl = CONF.service_list_cache_ttl
+        if use_cache and ttl > 0:
+            with self._lock:
+                cached = self._services.get(binary)
+                if cached and time.time() - cached[0] < ttl:
+                    self._hits += 1
+                    return cached[1]
+
+        loaded_at = time.time()
+        services = objects.ZunService.list_by_binary(context, binary)
+        with self._lock:
+            self._misses += 1
+            self._services[binary] = (loaded_at, services)
+        return services
+
+    def invalidate(self, binary=None):
+        with self._lock:
+            if binary is None:
+                self._services.clear()
+            else:
+                self._services.pop(binary, None)
+
+    def get_stats(self):
+        now = time.time()
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': float(self._hits) / total if total else 0.0,
+                'staleness': {binary: now - loaded_at for binary, (
+                    loaded_at, services) in self._services.items()},
+            }
+
+
 class ServiceGroup(object):
     def __init__(self):
         self.service_down_time = CONF.service_down_time
 
+    def get_up_hosts(self, context, binary='zun-compute', use_cache=True):
+        """Return the hosts on which the given binary is up.
+
+        The service records may come from the service list cache, the
+        liveness is evaluated against the current time on every call.
+        """
+        services = ServiceListCache().list_by_binary(context, binary,
+                                                     use_cache=use_cache)
+        return [service.host for service in services
+                if self.service_is_up(service)]
+
     def service_is_up(self, member):
         if not isinstance(member, objects.ZunService):
             raise TypeError
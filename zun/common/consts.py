@@ -29,6 +29,13 @@ TASK_STATES = (
     'container_stopping', 'container_rebooting',
     )
 
+IMAGE_WARM_STATUSES = (
+    IMAGE_WARM_PENDING, IMAGE_WARM_PULLING, IMAGE_WARM_READY,
+    IMAGE_WARM_FAILED,
+) = (
+    'pending', 'pulling', 'ready', 'failed',
+    )
+
 RESOURCE_CLASSES = (
     VCPU, MEMORY_MB, DISK_GB, PCI_DEVICE, SRIOV_NET_VF,
     NUMA_SOCKET, NUMA_CORE, NUMA_THREAD, NUMA_MEMORY_MB,
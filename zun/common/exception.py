@@ -313,6 +313,11 @@ class InvalidState(Conflict):
     message = _("Invalid resource state.")
 
 
+class ConcurrentUpdateConflict(Conflict):
+    message = _("Failed to update %(key)s, it kept being modified "
+                "concurrently.")
+
+
 # Cannot be templated as the error syntax varies.
 # msg needs to be constructed when raised.
 class InvalidParameterValue(Invalid):
@@ -364,6 +369,11 @@ class ImageNotFound(HTTPNotFound):
     message = _("Image %(image)s could not be found.")
 
 
+class ImageChecksumMismatch(ZunException):
+    message = _("The %(algorithm)s checksum of image %(image)s does not "
+                "match the expected checksum.")
+
+
 class ZunServiceNotFound(HTTPNotFound):
     message = _("Zun service %(binary)s on host %(host)s could not be found.")
 
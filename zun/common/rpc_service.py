@@ -63,6 +63,8 @@ class Service(service.Service):
         servicegroup.setup(CONF, self.binary, self.tg)
         periodic.setup(CONF, self.tg)
         for endpoint in self.endpoints:
+            if hasattr(endpoint, 'init_host'):
+                endpoint.init_host()
             self.tg.add_dynamic_timer(
                 endpoint.run_periodic_tasks,
                 periodic_interval_max=CONF.periodic_interval_max,
@@ -70,6 +72,12 @@ class Service(service.Service):
             )
         self._server.start()
 
+    def reset(self):
+        for endpoint in self.endpoints:
+            if hasattr(endpoint, 'reset'):
+                endpoint.reset()
+        super(Service, self).reset()
+
     def stop(self):
         if self._server:
             self._server.stop()
@@ -99,11 +107,13 @@ class API(object):
                                            timeout=timeout)
 
     def _call(self, server, method, *args, **kwargs):
-        cctxt = self._client.prepare(server=server)
+        version = kwargs.pop('version', None)
+        cctxt = self._client.prepare(server=server, version=version)
         return cctxt.call(self._context, method, *args, **kwargs)
 
     def _cast(self, server, method, *args, **kwargs):
-        cctxt = self._client.prepare(server=server)
+        version = kwargs.pop('version', None)
+        cctxt = self._client.prepare(server=server, version=version)
         return cctxt.cast(self._context, method, *args, **kwargs)
 
     def echo(self, message):
@@ -13,11 +13,18 @@
 """Handles all requests relating to compute resources (e.g. containers,
 networking and storage of containers, and compute hosts on which they run)."""
 
+import collections
+
+import eventlet
+from oslo_log import log as logging
+
 from zun.common import consts
 from zun.common import profiler
 from zun.compute import rpcapi
 from zun.scheduler import client as scheduler_client
 
+LOG = logging.getLogger(__name__)
+
 
 @profiler.trace_cls("rpc")
 class API(object):
@@ -71,6 +78,40 @@ class API(object):
     def container_show(self, context, container, *args):
         return self.rpcapi.container_show(context, container, *args)
 
+    def container_show_many(self, context, containers):
+        """Refresh the given containers from their compute hosts.
+
+        The containers are grouped by host and each host is queried once,
+        in parallel. Containers whose host is down or failed to answer are
+        returned with the UNKNOWN status.
+        """
+        up_hosts = set(rpcapi.get_up_hosts(context))
+        host_containers = collections.defaultdict(list)
+        for container in containers:
+            if container.host is None:
+                continue
+            if container.host in up_hosts:
+                host_containers[container.host].append(container)
+            else:
+                container.status = consts.UNKNOWN
+
+        def _show_many(host, containers):
+            try:
+                return self.rpcapi.container_show_many(context, host,
+                                                       containers)
+            except Exception as e:
+                LOG.exception("Error while showing containers on host "
+                              "%(host)s: %(e)s.", {'host': host, 'e': e})
+                for container in containers:
+                    container.status = consts.UNKNOWN
+                return containers
+
+        pool = eventlet.GreenPool()
+        refreshed = {}
+        for result in pool.starmap(_show_many, host_containers.items()):
+            refreshed.update((c.uuid, c) for c in result)
+        return [refreshed.get(c.uuid, c) for c in containers]
+
     def container_reboot(self, context, container, *args):
         return self.rpcapi.container_reboot(context, container, *args)
 
@@ -130,6 +171,10 @@ class API(object):
     def image_pull(self, context, image):
         return self.rpcapi.image_pull(context, image)
 
+    def image_warm(self, context, images, hosts):
+        for host in hosts:
+            self.rpcapi.image_warm(context, host, images)
+
     def image_search(self, context, image, image_driver, image_tag, *args):
         return self.rpcapi.image_search(context, image, image_driver,
                                         image_tag, *args)
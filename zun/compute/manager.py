@@ -12,19 +12,25 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
+import eventlet
 import six
 
 from oslo_log import log as logging
+import oslo_messaging as messaging
 from oslo_service import periodic_task
 from oslo_utils import excutils
 from oslo_utils import uuidutils
 
 from zun.common import consts
+from zun.common import context as zun_context
 from zun.common import exception
 from zun.common.i18n import _
 from zun.common import utils
 from zun.common.utils import translate_exception
 from zun.compute import compute_node_tracker
+from zun.compute import work_scheduler
 import zun.conf
 from zun.container import driver
 from zun.image import driver as image_driver
@@ -34,20 +40,117 @@ from zun import objects
 CONF = zun.conf.CONF
 LOG = logging.getLogger(__name__)
 
+# Set while the container runtime events of this host are applied to the
+# container records.
+_container_events_watched = threading.Event()
+
+
+def container_events_watched():
+    """Whether the container states are kept in sync from the events."""
+    return _container_events_watched.is_set()
+
 
 class Manager(periodic_task.PeriodicTasks):
     """Manages the running containers."""
 
+    # NOTE(zun): Keep in sync with the version history of the compute rpcapi.
+    target = messaging.Target(version='1.3')
+
     def __init__(self, container_driver=None):
         super(Manager, self).__init__(CONF)
         self.driver = driver.load_container_driver(container_driver)
         self.host = CONF.host
         self._resource_tracker = None
+        self._work_scheduler = work_scheduler.WorkScheduler()
         if self._use_sandbox():
             self.use_sandbox = True
         else:
             self.use_sandbox = False
 
+    def init_host(self):
+        image_driver.init_image_drivers()
+        if CONF.compute.enable_container_events:
+            utils.spawn_n(self._watch_container_events)
+
+    def reset(self):
+        # Called when the configuration is reloaded on SIGHUP.
+        image_driver.init_image_drivers()
+        self._work_scheduler.dispatch()
+
+    def _submit(self, op_class, priority, func, *args, **kwargs):
+        self._work_scheduler.submit(op_class, priority, func, *args, **kwargs)
+
+    def _watch_container_events(self):
+        """Apply the container runtime events to the container records.
+
+        The stream is resumed from the time of the last handled event after
+        a disconnection, so no event is lost while reconnecting.
+        """
+        context = zun_context.get_admin_context(all_tenants=True)
+        since = None
+        _container_events_watched.set()
+        try:
+            while True:
+                try:
+                    for event in self.driver.watch_events(since=since):
+                        since = event.get('time') or since
+                        try:
+                            self._handle_container_event(context, event)
+                        except Exception as e:
+                            LOG.exception("Failed to handle container event "
+                                          "%(event)s: %(error)s",
+                                          {'event': event,
+                                           'error': six.text_type(e)})
+                except NotImplementedError:
+                    LOG.info("Container driver does not support events, "
+                             "relying on the periodic state sync.")
+                    return
+                except Exception as e:
+                    LOG.warning("Container events stream interrupted: %s",
+                                six.text_type(e))
+                eventlet.sleep(CONF.compute.container_events_retry_interval)
+        finally:
+            _container_events_watched.clear()
+
+    def _handle_container_event(self, context, event):
+        try:
+            container = objects.Container.get_by_uuid(context, event['uuid'])
+        except exception.ContainerNotFound:
+            return
+
+        if container.host != self.host or container.task_state is not None:
+            # Skip containers on which an action is in progress, the action
+            # records the resulting state itself.
+            return
+
+        action = event['action']
+        if action in ('start', 'unpause'):
+            updates = {'status': consts.RUNNING, 'status_reason': None}
+        elif action == 'pause':
+            updates = {'status': consts.PAUSED}
+        elif action == 'die':
+            updates = {'status': consts.STOPPED}
+        elif action == 'oom':
+            updates = {'status_reason': _("Killed by the OOM killer")}
+        elif action == 'destroy' and container.auto_remove:
+            updates = {'status': consts.DELETED}
+        elif action == 'destroy':
+            updates = {'status': consts.ERROR,
+                       'status_reason': _("Container was removed from the "
+                                          "container runtime")}
+        else:
+            return
+
+        # Update only the fields that have changed
+        for field, value in updates.items():
+            if getattr(container, field) != value:
+                setattr(container, field, value)
+
+        if container.obj_what_changed():
+            LOG.debug('Updating container %(uuid)s after %(action)s event',
+                      {'uuid': container.uuid, 'action': action})
+            container.save(context)
+
     def _fail_container(self, context, container, error, unset_host=False):
         container.status = consts.ERROR
         container.status_reason = error
@@ -57,12 +160,14 @@ class Manager(periodic_task.PeriodicTasks):
         container.save(context)
 
     def container_create(self, context, limits, requested_networks, container):
-        utils.spawn_n(self._do_container_create, context, container,
-                      requested_networks, limits)
+        self._submit(work_scheduler.OP_CREATE, work_scheduler.PRIORITY_NORMAL,
+                     self._do_container_create, context, container,
+                     requested_networks, limits)
 
     def container_run(self, context, limits, requested_networks, container):
-        utils.spawn_n(self._do_container_run, context, container,
-                      requested_networks, limits)
+        self._submit(work_scheduler.OP_CREATE, work_scheduler.PRIORITY_NORMAL,
+                     self._do_container_run, context, container,
+                     requested_networks, limits)
 
     def _do_container_run(self, context, container, requested_networks,
                           limits=None):
@@ -98,9 +203,16 @@ class Manager(periodic_task.PeriodicTasks):
         try:
             image, image_loaded = image_driver.pull_image(
                 context, repo, tag, image_pull_policy, image_driver_name)
+            try:
+                if not image_loaded:
+                    image_driver.load_image(self.driver, image['path'])
+                if (image['driver'] == 'glance' and
+                        not image.get('manifest_repo_tag')):
+                    image['manifest_repo_tag'] = self.driver.read_tar_image(
+                        image)
+            finally:
+                image_driver.release_image(image)
             image['repo'], image['tag'] = repo, tag
-            if not image_loaded:
-                self.driver.load_image(image['path'])
         except exception.ImageNotFound as e:
             with excutils.save_and_reraise_exception(reraise=reraise):
                 LOG.error(six.text_type(e))
@@ -129,8 +241,7 @@ class Manager(periodic_task.PeriodicTasks):
             limits = limits
             rt = self._get_resource_tracker()
             if image['driver'] == 'glance':
-                image['repo'], image['tag'] = self.driver.read_tar_image(
-                    image)
+                image['repo'], image['tag'] = image['manifest_repo_tag']
             else:
                 image['tag'] = utils.parse_tag_name(image['tag'])
             with rt.container_claim(context, container, container.host,
@@ -207,8 +318,11 @@ class Manager(periodic_task.PeriodicTasks):
             image, image_loaded = image_driver.pull_image(
                 context, repo, tag, sandbox_image_pull_policy,
                 sandbox_image_driver)
-            if not image_loaded:
-                self.driver.load_image(image['path'])
+            try:
+                if not image_loaded:
+                    image_driver.load_image(self.driver, image['path'])
+            finally:
+                image_driver.release_image(image)
             sandbox_id = self.driver.create_sandbox(
                 context, container, image=sandbox_image,
                 requested_networks=requested_networks)
@@ -279,8 +393,10 @@ class Manager(periodic_task.PeriodicTasks):
                     self._fail_container(context, container, six.text_type(e))
 
     def add_security_group(self, context, container, security_group):
-        utils.spawn_n(self._add_security_group, context, container,
-                      security_group)
+        self._submit(work_scheduler.OP_LIFECYCLE,
+                     work_scheduler.PRIORITY_NORMAL,
+                     self._add_security_group, context, container,
+                     security_group)
 
     def _add_security_group(self, context, container, security_group):
         LOG.debug('Adding security_group to container: %s', container.uuid)
@@ -321,6 +437,18 @@ class Manager(periodic_task.PeriodicTasks):
             LOG.exception("Unexpected exception: %s", six.text_type(e))
             raise
 
+    @translate_exception
+    def container_show_many(self, context, containers):
+        LOG.debug('Showing %d containers', len(containers))
+        for i, container in enumerate(containers):
+            try:
+                containers[i] = self.container_show(context, container)
+            except Exception as e:
+                LOG.error("Error while showing container %(uuid)s: %(e)s",
+                          {'uuid': container.uuid, 'e': six.text_type(e)})
+                container.status = consts.UNKNOWN
+        return containers
+
     def _do_container_reboot(self, context, container, timeout, reraise=False):
         LOG.debug('Rebooting container: %s', container.uuid)
         self._update_task_state(context, container, consts.CONTAINER_REBOOTING)
@@ -340,7 +468,9 @@ class Manager(periodic_task.PeriodicTasks):
                 self._fail_container(context, container, six.text_type(e))
 
     def container_reboot(self, context, container, timeout):
-        utils.spawn_n(self._do_container_reboot, context, container, timeout)
+        self._submit(work_scheduler.OP_LIFECYCLE,
+                     work_scheduler.PRIORITY_NORMAL,
+                     self._do_container_reboot, context, container, timeout)
 
     def _do_container_stop(self, context, container, timeout, reraise=False):
         LOG.debug('Stopping container: %s', container.uuid)
@@ -361,10 +491,13 @@ class Manager(periodic_task.PeriodicTasks):
                 self._fail_container(context, container, six.text_type(e))
 
     def container_stop(self, context, container, timeout):
-        utils.spawn_n(self._do_container_stop, context, container, timeout)
+        self._submit(work_scheduler.OP_LIFECYCLE, work_scheduler.PRIORITY_HIGH,
+                     self._do_container_stop, context, container, timeout)
 
     def container_start(self, context, container):
-        utils.spawn_n(self._do_container_start, context, container)
+        self._submit(work_scheduler.OP_LIFECYCLE,
+                     work_scheduler.PRIORITY_NORMAL,
+                     self._do_container_start, context, container)
 
     def _do_container_pause(self, context, container, reraise=False):
         LOG.debug('Pausing container: %s', container.uuid)
@@ -384,7 +517,9 @@ class Manager(periodic_task.PeriodicTasks):
                 self._fail_container(context, container, six.text_type(e))
 
     def container_pause(self, context, container):
-        utils.spawn_n(self._do_container_pause, context, container)
+        self._submit(work_scheduler.OP_LIFECYCLE,
+                     work_scheduler.PRIORITY_NORMAL,
+                     self._do_container_pause, context, container)
 
     def _do_container_unpause(self, context, container, reraise=False):
         LOG.debug('Unpausing container: %s', container.uuid)
@@ -405,7 +540,9 @@ class Manager(periodic_task.PeriodicTasks):
                 self._fail_container(context, container, six.text_type(e))
 
     def container_unpause(self, context, container):
-        utils.spawn_n(self._do_container_unpause, context, container)
+        self._submit(work_scheduler.OP_LIFECYCLE,
+                     work_scheduler.PRIORITY_NORMAL,
+                     self._do_container_unpause, context, container)
 
     @translate_exception
     def container_logs(self, context, container, stdout, stderr,
@@ -469,7 +606,8 @@ class Manager(periodic_task.PeriodicTasks):
                 self._fail_container(context, container, six.text_type(e))
 
     def container_kill(self, context, container, signal):
-        utils.spawn_n(self._do_container_kill, context, container, signal)
+        self._submit(work_scheduler.OP_LIFECYCLE, work_scheduler.PRIORITY_HIGH,
+                     self._do_container_kill, context, container, signal)
 
     @translate_exception
     def container_update(self, context, container, patch):
@@ -587,8 +725,9 @@ class Manager(periodic_task.PeriodicTasks):
             LOG.error("Error occurred while calling glance "
                       "create_image API: %s",
                       six.text_type(e))
-        utils.spawn_n(self._do_container_commit, context, snapshot_image,
-                      container, repository, tag)
+        self._submit(work_scheduler.OP_PULL, work_scheduler.PRIORITY_NORMAL,
+                     self._do_container_commit, context, snapshot_image,
+                     container, repository, tag)
         return snapshot_image.id
 
     def _do_container_image_upload(self, context, snapshot_image, data, tag):
@@ -619,7 +758,8 @@ class Manager(periodic_task.PeriodicTasks):
                                         container_image, tag)
 
     def image_pull(self, context, image):
-        utils.spawn_n(self._do_image_pull, context, image)
+        self._submit(work_scheduler.OP_PULL, work_scheduler.PRIORITY_NORMAL,
+                     self._do_image_pull, context, image)
 
     def _do_image_pull(self, context, image):
         LOG.debug('Creating image...')
@@ -627,8 +767,12 @@ class Manager(periodic_task.PeriodicTasks):
         try:
             pulled_image, image_loaded = image_driver.pull_image(
                 context, image.repo, image.tag)
-            if not image_loaded:
-                self.driver.load_image(pulled_image['path'])
+            try:
+                if not image_loaded:
+                    image_driver.load_image(self.driver,
+                                            pulled_image['path'])
+            finally:
+                image_driver.release_image(pulled_image)
             image_dict = self.driver.inspect_image(repo_tag)
             image.image_id = image_dict['Id']
             image.size = image_dict['Size']
@@ -645,6 +789,40 @@ class Manager(periodic_task.PeriodicTasks):
                           six.text_type(e))
             raise
 
+    def image_warm(self, context, images):
+        # Each image takes its own pull slot, so warming is bounded by the
+        # pull concurrency of the work scheduler.
+        for image in images:
+            self._submit(work_scheduler.OP_PULL, work_scheduler.PRIORITY_LOW,
+                         self._warm_image, context, image)
+
+    def _warm_image(self, context, image):
+        repo_tag = image.repo + ":" + image.tag
+        LOG.debug('Warming image %s', repo_tag)
+        try:
+            image.update_warm_status(context, self.host,
+                                     consts.IMAGE_WARM_PULLING)
+            pulled_image, image_loaded = image_driver.pull_image(
+                context, image.repo, image.tag, 'ifnotpresent')
+            try:
+                if not image_loaded:
+                    image_driver.load_image(self.driver,
+                                            pulled_image['path'])
+            finally:
+                image_driver.release_image(pulled_image)
+        except Exception as e:
+            LOG.warning('Failed to warm image %(image)s: %(error)s',
+                        {'image': repo_tag, 'error': six.text_type(e)})
+            status = consts.IMAGE_WARM_FAILED
+        else:
+            status = consts.IMAGE_WARM_READY
+        try:
+            image.update_warm_status(context, self.host, status)
+        except Exception as e:
+            LOG.error('Failed to record the warm status of image %(image)s: '
+                      '%(error)s', {'image': repo_tag,
+                                    'error': six.text_type(e)})
+
     @translate_exception
     def image_search(self, context, image, image_driver_name,
                      image_tag, exact_match):
@@ -696,8 +874,9 @@ class Manager(periodic_task.PeriodicTasks):
                     return
 
     def capsule_create(self, context, capsule, requested_networks, limits):
-        utils.spawn_n(self._do_capsule_create, context,
-                      capsule, requested_networks, limits)
+        self._submit(work_scheduler.OP_CREATE, work_scheduler.PRIORITY_NORMAL,
+                     self._do_capsule_create, context,
+                     capsule, requested_networks, limits)
 
     def _do_capsule_create(self, context, capsule, requested_networks=None,
                            limits=None, reraise=False):
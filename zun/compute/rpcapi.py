@@ -19,18 +19,24 @@ from zun.common import exception
 from zun.common import profiler
 from zun.common import rpc_service
 import zun.conf
-from zun import objects
+
+
+def get_up_hosts(context, use_cache=True):
+    """Return the hosts of the zun-compute services that are up"""
+    api_servicegroup = servicegroup.ServiceGroup()
+    return api_servicegroup.get_up_hosts(context, 'zun-compute',
+                                         use_cache=use_cache)
 
 
 def check_container_host(func):
     """Verify the state of container host"""
     @functools.wraps(func)
     def wrap(self, context, container, *args, **kwargs):
-        services = objects.ZunService.list_by_binary(context, 'zun-compute')
-        api_servicegroup = servicegroup.ServiceGroup()
-        up_hosts = [service.host for service in services
-                    if api_servicegroup.service_is_up(service)]
-        if container.host is not None and container.host not in up_hosts:
+        host = container.host
+        # NOTE(zun): A host seen down in the cache may have sent a heartbeat
+        # since, so confirm it against the database before failing.
+        if (host is not None and host not in get_up_hosts(context) and
+                host not in get_up_hosts(context, use_cache=False)):
             raise exception.ContainerHostNotUp(container=container.uuid,
                                                host=container.host)
         return func(self, context, container, *args, **kwargs)
@@ -45,6 +51,8 @@ class API(rpc_service.API):
 
         * 1.0 - Initial version.
         * 1.1 - Add image endpoints.
+        * 1.2 - Add container_show_many.
+        * 1.3 - Add image_warm.
     """
 
     def __init__(self, transport=None, context=None, topic=None):
@@ -75,6 +83,10 @@ class API(rpc_service.API):
         return self._call(container.host, 'container_show',
                           container=container)
 
+    def container_show_many(self, context, host, containers):
+        return self._call(host, 'container_show_many',
+                          containers=containers)
+
     def container_reboot(self, context, container, timeout):
         self._cast(container.host, 'container_reboot', container=container,
                    timeout=timeout)
@@ -166,6 +178,9 @@ class API(rpc_service.API):
         host = None
         self._cast(host, 'image_pull', image=image)
 
+    def image_warm(self, context, host, images):
+        self._cast(host, 'image_warm', images=images, version='1.3')
+
     def image_search(self, context, image, image_driver, image_tag,
                      exact_match):
         # NOTE(hongbin): Image API doesn't support multiple compute nodes
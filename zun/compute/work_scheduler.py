@@ -0,0 +1,158 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Bounds the concurrency of the asynchronous operations of zun-compute.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from oslo_context import context as common_context
+from oslo_log import log as logging
+import six
+
+from zun.common import singleton
+from zun.common import utils
+import zun.conf
+
+CONF = zun.conf.CONF
+LOG = logging.getLogger(__name__)
+
+# Operation classes, each one has its own concurrency limit.
+OP_PULL = 'pull'
+OP_CREATE = 'create'
+OP_LIFECYCLE = 'lifecycle'
+
+CONCURRENCY_OPTS = {
+    OP_PULL: 'max_concurrent_pulls',
+    OP_CREATE: 'max_concurrent_creates',
+    OP_LIFECYCLE: 'max_concurrent_lifecycle_operations',
+}
+
+# Lower values run first within an operation class.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class _Task(object):
+
+    def __init__(self, priority, func, args, kwargs):
+        self.priority = priority
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.context = common_context.get_current()
+        self.enqueued_at = time.time()
+
+
+@six.add_metaclass(singleton.Singleton)
+class WorkScheduler(object):
+    """Runs the operations of a compute host in green threads.
+
+    Every operation class runs at most as many operations at once as its
+    concurrency option allows, 0 meaning no limit. The operations over the
+    limit wait in a priority queue of their class, so that interactive
+    operations like stop or kill do not wait behind bulk ones. The limits
+    are read when the operations are dispatched, they follow a reload of
+    the configuration.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._queues = {}
+        self._running = {}
+        self._stats = {}
+        self.clear()
+
+    def _limit(self, op_class):
+        return getattr(CONF.compute, CONCURRENCY_OPTS[op_class])
+
+    def submit(self, op_class, priority, func, *args, **kwargs):
+        """Run func(*args, **kwargs) when its operation class has room."""
+        task = _Task(priority, func, args, kwargs)
+        with self._lock:
+            heapq.heappush(self._queues[op_class],
+                           (priority, next(self._counter), task))
+            self._dispatch(op_class)
+
+    def dispatch(self):
+        """Start the queued operations allowed by the current limits."""
+        with self._lock:
+            for op_class in CONCURRENCY_OPTS:
+                self._dispatch(op_class)
+
+    def _dispatch(self, op_class):
+        queue = self._queues[op_class]
+        limit = self._limit(op_class)
+        while queue and (limit <= 0 or self._running[op_class] < limit):
+            task = heapq.heappop(queue)[2]
+            wait_time = time.time() - task.enqueued_at
+            stats = self._stats[op_class]
+            stats['started'] += 1
+            stats['wait_time'] += wait_time
+            stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+            self._running[op_class] += 1
+            if wait_time >= 1:
+                LOG.debug('%(func)s waited %(wait).1f seconds for a %(op)s '
+                          'slot', {'func': task.func.__name__,
+                                   'wait': wait_time, 'op': op_class})
+            utils.spawn_n(self._run, op_class, task)
+
+    def _run(self, op_class, task):
+        if task.context is not None:
+            task.context.update_store()
+        failed = False
+        try:
+            task.func(*task.args, **task.kwargs)
+        except Exception:
+            failed = True
+            LOG.exception('Unexpected error in %s', task.func.__name__)
+        finally:
+            with self._lock:
+                self._running[op_class] -= 1
+                self._stats[op_class]['failed' if failed else
+                                      'completed'] += 1
+                self._dispatch(op_class)
+
+    def get_stats(self):
+        """Return the queue depth and wait time of every operation class."""
+        with self._lock:
+            stats = {}
+            now = time.time()
+            for op_class, queue in self._queues.items():
+                op_stats = dict(self._stats[op_class])
+                started = op_stats['started']
+                op_stats.update(
+                    limit=self._limit(op_class),
+                    running=self._running[op_class],
+                    queued=len(queue),
+                    oldest_queued=max([now - item[2].enqueued_at
+                                       for item in queue] or [0]),
+                    mean_wait_time=(op_stats['wait_time'] / started
+                                    if started else 0))
+                stats[op_class] = op_stats
+            return stats
+
+    def clear(self):
+        """Forget the queued operations and reset the statistics."""
+        with self._lock:
+            for op_class in CONCURRENCY_OPTS:
+                self._queues[op_class] = []
+                self._running[op_class] = 0
+                self._stats[op_class] = {'started': 0, 'completed': 0,
+                                         'failed': 0, 'wait_time': 0.0,
+                                         'max_wait_time': 0.0}
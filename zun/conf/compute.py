@@ -44,10 +44,72 @@ Possible values:
 """),
 ]
 
+sync_opts = [
+    cfg.BoolOpt(
+        'enable_container_events',
+        default=True,
+        help='Whether zun-compute keeps container states in sync by '
+             'consuming the lifecycle events of the container runtime. '
+             'The periodic full state sync remains as a safety net.'),
+    cfg.IntOpt(
+        'sync_container_state_interval',
+        default=600,
+        help='Interval in seconds between two full syncs of the container '
+             'states with the container runtime, while the container '
+             'events are consumed. Set it to 0 to run the sync on every '
+             'periodic task run and to a negative value to disable it. '
+             'When the container events are not consumed, the sync runs '
+             'on every periodic task run.'),
+    cfg.IntOpt(
+        'container_events_retry_interval',
+        default=5,
+        min=1,
+        help='Seconds to wait before reconnecting to the container runtime '
+             'events stream after it was interrupted.'),
+]
+
+image_opts = [
+    cfg.FloatOpt(
+        'image_digest_false_positive_rate',
+        default=0.01,
+        min=0.0001,
+        max=0.5,
+        help='False positive rate of the digest of the local images '
+             'reported by zun-compute with its compute node. Lower rates '
+             'make the scheduler image locality weigher more accurate at '
+             'the cost of a larger digest.'),
+]
+
+concurrency_opts = [
+    cfg.IntOpt(
+        'max_concurrent_pulls',
+        default=4,
+        min=0,
+        help='Maximum number of image pulls, image warmings and container '
+             'commits run concurrently by zun-compute. The others wait in '
+             'a queue. Set it to 0 for no limit.'),
+    cfg.IntOpt(
+        'max_concurrent_creates',
+        default=10,
+        min=0,
+        help='Maximum number of container and capsule creations run '
+             'concurrently by zun-compute. The others wait in a queue. Set '
+             'it to 0 for no limit.'),
+    cfg.IntOpt(
+        'max_concurrent_lifecycle_operations',
+        default=20,
+        min=0,
+        help='Maximum number of container start, stop, reboot, pause, '
+             'unpause, kill and security group operations run '
+             'concurrently by zun-compute. Stop and kill requests are '
+             'queued ahead of the others. Set it to 0 for no limit.'),
+]
+
 opt_group = cfg.OptGroup(
     name='compute', title='Options for the zun-compute service')
 
-ALL_OPTS = (service_opts + db_opts)
+ALL_OPTS = (service_opts + db_opts + sync_opts + image_opts +
+            concurrency_opts)
 
 
 def register_opts(conf):
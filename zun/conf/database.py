@@ -36,7 +36,26 @@ etcd_opts = [
                             "running."),
     cfg.PortOpt('etcd_port',
                 default=2379,
-                help="Port on which etcd listen client request.")
+                help="Port on which etcd listen client request."),
+    cfg.IntOpt('etcd_write_retries',
+               default=10,
+               min=0,
+               help="Number of times an update is retried when another "
+                    "client modified the same etcd key meanwhile. The "
+                    "updates are compare-and-swap writes on the "
+                    "modification index of the key."),
+    cfg.BoolOpt('etcd_cache_enabled',
+                default=False,
+                help="Serve the reads of containers, compute nodes and zun "
+                     "services from a cache in each process. The cache is "
+                     "loaded once then kept current by watching etcd, the "
+                     "reads go to the etcd server while a watch is "
+                     "failing."),
+    cfg.IntOpt('etcd_cache_watch_timeout',
+               default=60,
+               min=1,
+               help="Number of seconds a watch of the etcd cache waits for "
+                    "a change before it is issued again.")
 ]
 
 etcd_group = cfg.OptGroup(name='etcd', title='Options for etcd connection')
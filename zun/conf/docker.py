@@ -56,6 +56,25 @@ docker_opts = [
                default=5,
                help='Timeout in seconds for executing a command in a docker '
                     'container.'),
+    cfg.IntOpt('client_pool_size',
+               default=10,
+               min=0,
+               help='Maximum number of docker API clients kept open and '
+                    'shared by the green threads of a process. Setting it '
+                    'to 0 disables pooling and creates a new client for '
+                    'every docker operation.'),
+    cfg.IntOpt('client_pool_timeout',
+               default=60,
+               min=0,
+               help='Timeout in seconds to wait for a free docker API '
+                    'client when all the pooled clients are in use.'),
+    cfg.IntOpt('client_health_check_interval',
+               default=60,
+               min=0,
+               help='A pooled docker API client that was idle for longer '
+                    'than this many seconds is pinged before being reused '
+                    'and replaced if the ping fails. 0 pings on every '
+                    'checkout.'),
 ]
 
 ALL_OPTS = (docker_opts)
@@ -27,7 +27,20 @@ Services which consume this:
 * ``zun-compute``
 Interdependencies to other options:
 * None
-""")
+"""),
+    cfg.IntOpt(
+        'image_driver_timeout',
+        default=60,
+        min=0,
+        help='Deadline in seconds of the image search and of the image '
+             'lookups done by each image driver. 0 means no deadline.'),
+    cfg.BoolOpt(
+        'image_pull_hedging',
+        default=False,
+        help='Look the image up in all the drivers of image_driver_list '
+             'concurrently before pulling it, so that the pull starts '
+             'with the first driver, in list order, which has the image '
+             'instead of going through the drivers missing it.'),
 ]
 
 sandbox_opts = [
@@ -52,6 +65,75 @@ glance_driver_opts = [
         help='Shared directory where glance images located. If '
              'specified, docker will try to load the image from '
              'the shared directory by image ID.'),
+    cfg.IntOpt(
+        'image_cache_max_size',
+        default=0,
+        min=0,
+        help='Maximum size in MB of the glance images cached in the '
+             'images directory. The least recently used images which are '
+             'not used by a container of the host are removed when the '
+             'cache grows above this size. 0 means unlimited.'),
+    cfg.IntOpt(
+        'image_cache_max_age',
+        default=0,
+        min=0,
+        help='Number of seconds after which a cached glance image which '
+             'was not used and is not used by a container of the host is '
+             'removed from the images directory. 0 means never.'),
+    cfg.IntOpt(
+        'image_cache_manager_interval',
+        default=600,
+        help='Interval in seconds between two runs of the image cache '
+             'manager, which pins the images used by the containers of '
+             'the host and enforces the image cache quotas. A negative '
+             'value disables the image cache manager.'),
+    cfg.StrOpt(
+        'image_checksum_algorithm',
+        default='md5',
+        choices=['md5', 'sha1', 'sha256', 'sha512'],
+        help='Hash algorithm used to verify the cached glance images. '
+             'Algorithms other than md5 are only used for the images '
+             'whose os_hash_algo property matches, the md5 checksum of '
+             'the image is used otherwise. An image is only hashed again '
+             'when its size, modification time or inode change.'),
+    cfg.IntOpt(
+        'image_cache_scrub_interval',
+        default=-1,
+        help='Interval in seconds between two integrity scrubs of the '
+             'cached glance images, which re-hash every verified image '
+             'and remove the corrupted ones. A negative value disables '
+             'the scrubber.'),
+    cfg.BoolOpt(
+        'direct_load',
+        default=False,
+        help='Stream the glance images into docker load while they are '
+             'downloaded instead of staging them in the images directory '
+             'and loading them from there.'),
+    cfg.BoolOpt(
+        'direct_load_keep_images',
+        default=True,
+        help='With direct_load, also write the streamed images to the '
+             'images directory when they fit in the image cache, so that '
+             'they can be loaded again without downloading them.'),
+    cfg.IntOpt(
+        'direct_load_buffer_chunks',
+        default=16,
+        min=1,
+        help='Number of image chunks buffered between the glance download '
+             'and docker load with direct_load.'),
+    cfg.IntOpt(
+        'image_metadata_cache_ttl',
+        default=60,
+        min=0,
+        help='Number of seconds the metadata of the glance images found '
+             'when pulling or searching images is cached. 0 disables the '
+             'cache.'),
+    cfg.IntOpt(
+        'image_metadata_negative_cache_ttl',
+        default=10,
+        min=0,
+        help='Number of seconds a glance image lookup which found no '
+             'image is cached, bounded by image_metadata_cache_ttl.'),
 ]
 
 glance_opt_group = cfg.OptGroup(name='glance',
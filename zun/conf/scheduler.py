@@ -88,6 +88,113 @@ Related options:
 * All of the filters in this option *must* be present in the
   'scheduler_available_filters' option, or a SchedulerHostFilterNotFound
   exception will be raised.
+"""),
+    cfg.BoolOpt("adaptive_filter_ordering",
+                default=False,
+                help="""
+Reorder the enabled filters by their measured cost and selectivity.
+
+When enabled, the filters which reject the most hosts for the least time are
+applied first, instead of following the order of 'enabled_filters'. The
+filters are measured for the lifetime of the process, each scheduler process
+(e.g. each API worker) measuring and ordering them on its own. The current
+order of the process serving the request can be seen through the scheduler
+filters debug API of the hosts.
+"""),
+    cfg.IntOpt("host_state_full_refresh_interval",
+               default=300,
+               min=0,
+               help="""
+Interval in seconds between two full reloads of the host state cache.
+
+Between two full reloads, the scheduler only reads the compute nodes that
+changed since the previous refresh. A full reload drops the compute nodes that
+were deleted and resets the resources consumed by placements which were not
+reported by the compute nodes yet. Set to 0 to reload every compute node on
+each scheduling request.
+"""),
+    cfg.IntOpt("host_state_refresh_overlap",
+               default=60,
+               min=0,
+               help="""
+Number of seconds by which a refresh of the host state cache reaches back.
+
+The compute nodes are stamped by the clock of their compute host. Between two
+full reloads, a refresh reads the compute nodes changed since the newest change
+already seen minus this overlap, so that the changes of a compute host whose
+clock is late, or whose update was committed late, are not missed. The nodes
+read again without change are not applied again.
+
+Related options:
+
+* host_state_full_refresh_interval
+"""),
+    cfg.MultiStrOpt("weight_classes",
+                    default=["zun.scheduler.weights.all_weighers"],
+                    help="""
+Weighers that the filter scheduler will use.
+
+Only hosts which pass the filters are weighed. The weight for any host starts
+at 0, and the weighers order these hosts by adding to or subtracting from the
+weight assigned by the previous weigher. Weights may become negative. The
+container is scheduled to one of the 'host_subset_size' heaviest hosts.
+
+By default, this is set to all weighers that are included with Zun.
+
+Possible values:
+
+* A list of zero or more strings, where each string corresponds to the name of
+  a weigher that will be used for selecting a host
+"""),
+    cfg.FloatOpt("ram_weight_multiplier",
+                 default=-1.0,
+                 help="""
+Multiplier of the RAM weigher.
+
+The RAM weigher weighs hosts by their free RAM. Negative values pack
+containers onto the hosts with the least free RAM, which keeps room for large
+containers. Positive values spread containers onto the hosts with the most
+free RAM. 0 disables the weigher.
+"""),
+    cfg.FloatOpt("cpu_weight_multiplier",
+                 default=-1.0,
+                 help="""
+Multiplier of the CPU weigher.
+
+The CPU weigher weighs hosts by their free vcpus. Negative values pack
+containers onto the hosts with the fewest free vcpus. Positive values spread
+containers onto the hosts with the most free vcpus. 0 disables the weigher.
+"""),
+    cfg.FloatOpt("container_count_weight_multiplier",
+                 default=0.0,
+                 help="""
+Multiplier of the container count weigher.
+
+The container count weigher weighs hosts by their number of containers.
+Negative values pack containers onto the hosts running the most containers.
+Positive values spread containers onto the hosts running the fewest
+containers. 0 disables the weigher.
+"""),
+    cfg.FloatOpt("image_locality_weight_multiplier",
+                 default=1.0,
+                 help="""
+Multiplier of the image locality weigher.
+
+The image locality weigher weighs hosts by whether they already hold the
+image of the container, according to the image digest reported by the
+compute nodes. Positive values favor the hosts which do not have to pull the
+image. Negative values favor the hosts which have to. 0 disables the weigher.
+"""),
+    cfg.IntOpt("host_subset_size",
+               default=1,
+               min=1,
+               help="""
+Size of the subset of best hosts selected by the scheduler.
+
+The container is scheduled to a host picked randomly among the
+'host_subset_size' heaviest hosts. The default of 1 always picks the heaviest
+host. Larger values trade a less optimal placement for less contention when
+several schedulers place containers at the same time.
 """),
 ]
 
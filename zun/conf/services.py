@@ -40,6 +40,14 @@ periodic_opts = [
                default=180,
                help='Max interval size between periodic tasks execution in '
                     'seconds.'),
+    cfg.IntOpt('service_list_cache_ttl',
+               default=10,
+               min=0,
+               help='Seconds for which the zun services read to check the '
+                    'liveness of the hosts are cached by the API and '
+                    'scheduler. The liveness itself is evaluated on every '
+                    'check, so this only delays noticing new heartbeats. '
+                    'Set it to 0 to disable the cache.'),
 ]
 
 ALL_OPTS = (service_opts + periodic_opts)
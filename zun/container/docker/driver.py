@@ -28,6 +28,7 @@ from zun.common import utils
 from zun.common.utils import check_container_id
 import zun.conf
 from zun.container.docker import host
+from zun.container.docker import host_config_cache
 from zun.container.docker import utils as docker_utils
 from zun.container import driver
 from zun.network import network as zun_network
@@ -37,6 +38,7 @@ from zun import objects
 CONF = zun.conf.CONF
 LOG = logging.getLogger(__name__)
 ATTACH_FLAG = "/attach/ws?logs=0&stream=1&stdin=1&stdout=1&stderr=1"
+CONTAINER_EVENTS = ('start', 'die', 'pause', 'unpause', 'oom', 'destroy')
 
 
 def is_not_found(e):
@@ -83,6 +85,7 @@ class DockerDriver(driver.ContainerDriver):
     def __init__(self):
         super(DockerDriver, self).__init__()
         self._host = host.Host()
+        self._host_config_cache = host_config_cache.HostConfigCache()
 
     def load_image(self, image_path=None):
         with docker_utils.docker_client() as docker:
@@ -161,6 +164,8 @@ class DockerDriver(driver.ContainerDriver):
             image_repo = image['repo'] + ":" + image['tag']
             response = docker.create_container(image_repo, **kwargs)
             container.container_id = response['Id']
+            self._host_config_cache.set(container.container_id,
+                                        kwargs['host_config'])
 
             if network_standalone:
                 addresses = self._setup_network_for_container(
@@ -209,6 +214,7 @@ class DockerDriver(driver.ContainerDriver):
                                                     network_api)
 
             if container.container_id:
+                self._host_config_cache.invalidate(container.container_id)
                 try:
                     docker.remove_container(container.container_id,
                                             force=force)
@@ -232,6 +238,7 @@ class DockerDriver(driver.ContainerDriver):
                                    for c in docker.list_containers()}
 
         db_containers = objects.Container.list_by_host(context, CONF.host)
+        removed_containers = []
         for db_container in db_containers:
             if db_container.status in (consts.CREATING, consts.DELETED):
                 # Skip populating db record since the container is in a
@@ -243,7 +250,7 @@ class DockerDriver(driver.ContainerDriver):
             if not docker_container:
                 if db_container.auto_remove:
                     db_container.status = consts.DELETED
-                    db_container.save(context)
+                    removed_containers.append(db_container)
                 else:
                     LOG.warning("Container was recorded in DB but missing in "
                                 "docker")
@@ -251,6 +258,8 @@ class DockerDriver(driver.ContainerDriver):
 
             self._populate_container(db_container, docker_container)
 
+        if removed_containers:
+            objects.Container.bulk_save(context, removed_containers)
         return db_containers
 
     def update_containers_states(self, context, containers):
@@ -263,6 +272,9 @@ class DockerDriver(driver.ContainerDriver):
         id_to_container_map = {container.container_id: container
                                for container in containers}
 
+        # NOTE(zun): The changes of this sync are saved together at the
+        # end, rather than a database update per container.
+        changed_containers = []
         for cid in (six.viewkeys(id_to_container_map) &
                     six.viewkeys(id_to_db_container_map)):
             container = id_to_container_map[cid]
@@ -271,7 +283,6 @@ class DockerDriver(driver.ContainerDriver):
             if container.status != db_container.status:
                 old_status = container.status
                 container.status = db_container.status
-                container.save(context)
                 LOG.info('Status of container %s changed from %s to %s',
                          container.uuid, old_status, container.status)
             # sync host
@@ -280,9 +291,13 @@ class DockerDriver(driver.ContainerDriver):
             if container.host != cur_host:
                 old_host = container.host
                 container.host = cur_host
-                container.save(context)
                 LOG.info('Host of container %s changed from %s to %s',
                          container.uuid, old_host, container.host)
+            if container.obj_what_changed():
+                changed_containers.append(container)
+
+        if changed_containers:
+            objects.Container.bulk_save(context, changed_containers)
 
     def show(self, context, container):
         with docker_utils.docker_client() as docker:
@@ -302,6 +317,31 @@ class DockerDriver(driver.ContainerDriver):
             self._populate_container(container, response)
             return container
 
+    def watch_events(self, since=None):
+        # NOTE(zun): The events stream is long-lived so it uses a dedicated
+        # client instead of holding one of the pooled clients.
+        docker = docker_utils.new_docker_client()
+        filters = {'type': 'container',
+                   'event': list(CONTAINER_EVENTS) + ['update']}
+        try:
+            for event in docker.events(since=since, filters=filters,
+                                       decode=True):
+                self._host_config_cache.handle_event(event)
+                action = event.get('Action', event.get('status'))
+                name = event.get('Actor', {}).get('Attributes', {}).get(
+                    'name', '')
+                if (action not in CONTAINER_EVENTS or
+                        not name.startswith('zun-') or
+                        name.startswith('zun-sandbox-')):
+                    continue
+                yield {'uuid': name[len('zun-'):],
+                       'action': action,
+                       'time': event.get('time')}
+        except errors.APIError as e:
+            raise exception.DockerError(error_msg=six.text_type(e))
+        finally:
+            docker.close()
+
     def format_status_detail(self, status_time):
         try:
             st = datetime.datetime.strptime((status_time[:19]),
@@ -543,7 +583,9 @@ class DockerDriver(driver.ContainerDriver):
             args['cpu_period'] = 100000
 
         with docker_utils.docker_client() as docker:
-            return docker.update_container(container.container_id, **args)
+            result = docker.update_container(container.container_id, **args)
+            self._host_config_cache.update(container.container_id, **args)
+            return result
 
     @check_container_id
     def get_websocket_url(self, context, container):
@@ -730,19 +772,17 @@ class DockerDriver(driver.ContainerDriver):
         cpu_used = 0
         with docker_utils.docker_client() as docker:
             containers = docker.containers()
-            for container in containers:
-                cnt_id = container['Id']
-                # Fixme: if there is a way to get all container inspect info
-                # for one call only?
-                inspect = docker.inspect_container(cnt_id)
-                cpu_period = inspect['HostConfig']['CpuPeriod']
-                cpu_quota = inspect['HostConfig']['CpuQuota']
+            # NOTE(zun): The HostConfig of the running containers is served
+            # from the per-host cache, only unknown containers are inspected.
+            host_configs = self._host_config_cache.get_many(
+                docker, [container['Id'] for container in containers])
+            for host_config in host_configs.values():
+                cpu_period = host_config['CpuPeriod']
+                cpu_quota = host_config['CpuQuota']
                 if cpu_period and cpu_quota:
                     cpu_used += float(cpu_quota) / cpu_period
-                else:
-                    if 'NanoCpus' in inspect['HostConfig']:
-                        nanocpus = inspect['HostConfig']['NanoCpus']
-                        cpu_used += float(nanocpus) / 1e9
+                elif host_config['NanoCpus']:
+                    cpu_used += float(host_config['NanoCpus']) / 1e9
             return cpu_used
 
     def add_security_group(self, context, container, security_group):
@@ -756,6 +796,13 @@ class DockerDriver(driver.ContainerDriver):
     def get_available_nodes(self):
         return [self._host.get_hostname()]
 
+    def get_local_images(self):
+        with docker_utils.docker_client() as docker:
+            images = docker.images()
+        return [repo_tag for image in images
+                for repo_tag in image.get('RepoTags') or []
+                if repo_tag != '<none>:<none>']
+
     def network_detach(self, context, container, network):
         with docker_utils.docker_client() as docker:
             network_api = zun_network.api(context,
@@ -0,0 +1,120 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""
+Caches the resource related HostConfig of the containers on this host.
+"""
+
+import threading
+
+from docker import errors
+from docker import utils as docker_utils
+from oslo_log import log as logging
+import six
+
+from zun.common import singleton
+
+LOG = logging.getLogger(__name__)
+
+# The subset of HostConfig that is needed for resource accounting.
+HOST_CONFIG_KEYS = ('CpuQuota', 'CpuPeriod', 'NanoCpus', 'Memory')
+
+# Docker events after which the HostConfig of a container has to be
+# re-inspected.
+INVALIDATE_EVENTS = ('update', 'destroy')
+
+
+def _extract(host_config):
+    host_config = host_config or {}
+    return {key: host_config.get(key) for key in HOST_CONFIG_KEYS}
+
+
+@six.add_metaclass(singleton.Singleton)
+class HostConfigCache(object):
+    """In-memory index of container HostConfig keyed by container ID.
+
+    The index is shared by every docker driver in the process. It is filled
+    by the create/update/delete calls of the driver and by the docker events
+    stream, and lazily completed by inspecting containers that are unknown.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._host_configs = {}
+
+    def get(self, container_id):
+        with self._lock:
+            return self._host_configs.get(container_id)
+
+    def set(self, container_id, host_config):
+        with self._lock:
+            self._host_configs[container_id] = _extract(host_config)
+
+    def update(self, container_id, mem_limit=None, cpu_quota=None,
+               cpu_period=None):
+        """Apply the arguments of a docker container update to an entry."""
+        with self._lock:
+            cached = self._host_configs.get(container_id)
+            if cached is None:
+                return
+            if mem_limit is not None:
+                cached['Memory'] = docker_utils.parse_bytes(mem_limit)
+            if cpu_quota is not None:
+                cached['CpuQuota'] = cpu_quota
+            if cpu_period is not None:
+                cached['CpuPeriod'] = cpu_period
+
+    def invalidate(self, container_id):
+        with self._lock:
+            self._host_configs.pop(container_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._host_configs.clear()
+
+    def handle_event(self, event):
+        """Invalidate the cache entry targeted by a docker event."""
+        if event.get('Type', 'container') != 'container':
+            return
+        if event.get('Action', event.get('status')) in INVALIDATE_EVENTS:
+            container_id = event.get('id') or event.get('Actor', {}).get('ID')
+            if container_id:
+                self.invalidate(container_id)
+
+    def get_many(self, docker, container_ids):
+        """Return the HostConfig of the given containers.
+
+        Only the containers missing from the cache are inspected. The
+        entries of the other containers are kept, as a stopped container
+        may be started again; entries are only dropped once their container
+        is gone, on a delete, a destroy event or an inspect returning 404.
+        """
+        container_ids = set(container_ids)
+        with self._lock:
+            missing = container_ids - set(self._host_configs)
+
+        for container_id in missing:
+            LOG.debug('Inspecting HostConfig of container %s', container_id)
+            try:
+                inspect = docker.inspect_container(container_id)
+            except errors.APIError as api_error:
+                if api_error.status_code == 404:
+                    # The container is gone since it was listed.
+                    self.invalidate(container_id)
+                    continue
+                raise
+            self.set(container_id, inspect['HostConfig'])
+
+        with self._lock:
+            return {container_id: dict(self._host_configs[container_id])
+                    for container_id in container_ids
+                    if container_id in self._host_configs}
@@ -14,35 +14,177 @@ import re
 import six
 import sys
 import tarfile
+import threading
+import time
 
 import docker
 from docker import errors
+from eventlet import queue
+from oslo_log import log as logging
 from oslo_utils import encodeutils
 
 from zun.common import exception
+from zun.common.i18n import _
+from zun.common import singleton
 import zun.conf
 
 CONF = zun.conf.CONF
+LOG = logging.getLogger(__name__)
 
 
-@contextlib.contextmanager
-def docker_client():
+def new_docker_client():
     client_kwargs = dict()
     if not CONF.docker.api_insecure:
         client_kwargs['ca_cert'] = CONF.docker.ca_file
         client_kwargs['client_key'] = CONF.docker.key_file
         client_kwargs['client_cert'] = CONF.docker.key_file
 
+    return DockerHTTPClient(
+        CONF.docker.api_url,
+        CONF.docker.docker_remote_api_version,
+        CONF.docker.default_timeout,
+        **client_kwargs
+    )
+
+
+@six.add_metaclass(singleton.Singleton)
+class DockerClientPool(object):
+    """Process-wide pool of keep-alive docker API clients.
+
+    Each client owns a requests session, so it is checked out by a single
+    green thread at a time. Idle clients are reused most-recently-used
+    first, which keeps the warm connections busy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = queue.LifoQueue()
+        self._size = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'health_check_failures': 0,
+        }
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+        stats['idle'] = self._idle.qsize()
+        return stats
+
+    def _record(self, key, value=1):
+        with self._lock:
+            self._stats[key] += value
+
+    def _create(self):
+        with self._lock:
+            if self._size >= CONF.docker.client_pool_size:
+                return None
+            self._size += 1
+            self._stats['misses'] += 1
+        try:
+            return new_docker_client()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+            raise
+
+    def _discard(self, client):
+        with self._lock:
+            self._size -= 1
+        try:
+            client.close()
+        except Exception:
+            LOG.debug('Failed to close docker API client', exc_info=True)
+
+    def _is_healthy(self, client, idle_since):
+        interval = CONF.docker.client_health_check_interval
+        if time.time() - idle_since < interval:
+            return True
+        try:
+            client.ping()
+            return True
+        except Exception as e:
+            LOG.warning('Discarding unhealthy docker API client: %s',
+                        six.text_type(e))
+            self._record('health_check_failures')
+            return False
+
+    def get(self):
+        while True:
+            try:
+                client, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                client = self._create()
+                if client is not None:
+                    return client
+                client, idle_since = self._wait()
+            if self._is_healthy(client, idle_since):
+                self._record('hits')
+                return client
+            self._discard(client)
+
+    def _wait(self):
+        start = time.time()
+        try:
+            item = self._idle.get(timeout=CONF.docker.client_pool_timeout)
+        except queue.Empty:
+            raise exception.DockerError(error_msg=_(
+                'Timed out waiting for a free docker API client'))
+        wait_time = time.time() - start
+        with self._lock:
+            self._stats['waits'] += 1
+            self._stats['wait_time'] += wait_time
+            self._stats['max_wait_time'] = max(
+                self._stats['max_wait_time'], wait_time)
+        return item
+
+    def put(self, client, discard=False):
+        if discard or self._size > CONF.docker.client_pool_size:
+            self._discard(client)
+        else:
+            self._idle.put((client, time.time()))
+
+    def clear(self):
+        while True:
+            try:
+                client, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(client)
+
+
+@contextlib.contextmanager
+def docker_client():
+    pooled = CONF.docker.client_pool_size > 0
+    if pooled:
+        pool = DockerClientPool()
+        client = pool.get()
+    else:
+        client = new_docker_client()
+
+    # NOTE(zun): A client that failed below the docker API level (e.g. a
+    # broken connection) is not returned to the pool.
+    discard = False
     try:
-        yield DockerHTTPClient(
-            CONF.docker.api_url,
-            CONF.docker.docker_remote_api_version,
-            CONF.docker.default_timeout,
-            **client_kwargs
-        )
+        yield client
     except errors.APIError as e:
         desired_exc = exception.DockerError(error_msg=six.text_type(e))
         six.reraise(type(desired_exc), desired_exc, sys.exc_info()[2])
+    except exception.ZunException:
+        raise
+    except Exception:
+        discard = True
+        raise
+    finally:
+        if pooled:
+            pool.put(client, discard=discard)
+        else:
+            client.close()
 
 
 class DockerHTTPClient(docker.APIClient):
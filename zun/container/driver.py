@@ -20,6 +20,7 @@ from oslo_utils import units
 from zun.common.i18n import _
 import zun.conf
 from zun.container.os_capability.linux import os_capability_linux
+from zun.image import digest
 from zun import objects
 
 LOG = logging.getLogger(__name__)
@@ -84,6 +85,15 @@ class ContainerDriver(object):
         """Show the details of a container."""
         raise NotImplementedError()
 
+    def watch_events(self, since=None):
+        """Yield the lifecycle events of the containers on this host.
+
+        Each event is a dict with the 'uuid' of the container, the 'action'
+        ('start', 'die', 'pause', 'unpause', 'oom' or 'destroy') and the
+        'time' of the event, which can be passed back as since to resume.
+        """
+        raise NotImplementedError()
+
     def reboot(self, context, container):
         """Reboot a container."""
         raise NotImplementedError()
@@ -198,6 +208,10 @@ class ContainerDriver(object):
     def get_available_nodes(self):
         pass
 
+    def get_local_images(self):
+        """Return the repo:tag of the images present on this host."""
+        raise NotImplementedError()
+
     def get_available_resources(self, node):
         numa_topo_obj = self.get_host_numa_topology()
         node.numa_topology = numa_topo_obj
@@ -222,6 +236,14 @@ class ContainerDriver(object):
         cpu_used = self.get_cpu_used()
         node.cpu_used = cpu_used
         node.labels = labels
+        try:
+            images = self.get_local_images()
+        except NotImplementedError:
+            node.image_digest = None
+        else:
+            node.image_digest = digest.ImageDigest.build(
+                images,
+                CONF.compute.image_digest_false_positive_rate).to_string()
 
     def node_is_available(self, nodename):
         """Return whether this compute service manages a particular node."""
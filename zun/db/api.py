@@ -135,6 +135,21 @@ def update_container(context, container_id, values):
         context, container_id, values)
 
 
+@profiler.trace("db")
+def bulk_update_containers(context, values_by_uuid):
+    """Update properties of several containers at once.
+
+    :context: Request context
+    :values_by_uuid: A dict of the properties to be updated keyed by the
+                     uuid of each container. The uuid and the name of a
+                     container cannot be updated this way.
+    :returns: The number of updated containers. The containers which no
+              longer exist are skipped.
+    """
+    return _get_dbdriver_instance().bulk_update_containers(
+        context, values_by_uuid)
+
+
 @profiler.trace("db")
 def destroy_zun_service(host, binary):
     """Destroys a zun_service record.
@@ -247,6 +262,22 @@ def update_image(image_id, values):
     return _get_dbdriver_instance().update_image(image_id, values)
 
 
+@profiler.trace("db")
+def update_image_warm_status(image_uuid, host, status):
+    """Set the pre-pull status of an image on a host.
+
+    The status of the image on the other hosts is left untouched.
+
+    :param image_uuid: The uuid of an image.
+    :param host: The host pre-pulling the image.
+    :param status: The pre-pull status of the image on the host.
+    :returns: An Image.
+    :raises: ImageNotFound
+    """
+    return _get_dbdriver_instance().update_image_warm_status(
+        image_uuid, host, status)
+
+
 @profiler.trace("db")
 def list_images(context, filters=None,
                 limit=None, marker=None,
@@ -15,25 +15,49 @@
 """etcd storage backend."""
 
 from datetime import datetime
+import random
+import time
+
 import etcd
 from oslo_concurrency import lockutils
 from oslo_log import log
 from oslo_serialization import jsonutils as json
+from oslo_utils import excutils
 from oslo_utils import strutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import six
+from six.moves.urllib import parse
 
 from zun.common import exception
 from zun.common.i18n import _
 from zun.common import singleton
 import zun.conf
+from zun.db.etcd import cache
 from zun.db.etcd import models
 
 
 LOG = log.getLogger(__name__)
 CONF = zun.conf.CONF
 
+CONTAINER_INDEX_PATH = '/container_indexes'
+# The indexed container fields, the most selective first.
+CONTAINER_INDEX_FIELDS = ('name', 'host', 'status', 'project_id')
+# Above this number of indexed containers, a scan of '/containers' is
+# cheaper than reading the containers one by one.
+MAX_INDEX_FETCH = 500
+
+# The paths served by the cache when it is enabled.
+CACHED_PATHS = ('/containers', '/compute_nodes', '/zun_services')
+
+CONTAINER_NAME_PATH = '/container_names'
+IMAGE_TAG_PATH = '/image_tags'
+# Seconds before the reservation of a name expires unless the resource
+# holding it was saved.
+RESERVATION_TTL = 60
+# Initial upper bound of the random wait before a compare-and-swap retry.
+CAS_BACKOFF = 0.01
+
 
 def get_connection():
     connection = EtcdAPI(host=CONF.etcd.etcd_host,
@@ -64,6 +88,54 @@ def add_identity_filter(query, value):
         raise exception.InvalidIdentity(identity=value)
 
 
+def _index_value(value):
+    if value is None:
+        return 'null'
+    if not isinstance(value, six.string_types):
+        value = six.text_type(value)
+    return '=' + parse.quote(value.encode('utf-8'), safe='')
+
+
+def _container_index_key(field, value, uuid=None):
+    key = '%s/%s/%s' % (CONTAINER_INDEX_PATH, field, _index_value(value))
+    if uuid is not None:
+        key += '/' + uuid
+    return key
+
+
+def _container_name_key(project_id, name):
+    scope = CONF.compute.unique_container_name_scope
+    if scope == 'project':
+        prefix = 'project/' + _index_value(project_id)
+    elif scope == 'global':
+        prefix = 'global'
+    else:
+        return None
+    return '%s/%s/%s' % (CONTAINER_NAME_PATH, prefix,
+                         _index_value(name.lower()))
+
+
+def _image_tag_key(project_id, repo, tag):
+    return '%s/%s/%s/%s' % (IMAGE_TAG_PATH, _index_value(project_id),
+                            _index_value(repo), _index_value(tag))
+
+
+def _changed_index_fields(old_value, new_value):
+    return [f for f in CONTAINER_INDEX_FIELDS
+            if old_value.get(f) != new_value.get(f)]
+
+
+def _sort_value(value, is_time=False):
+    if value is not None and is_time:
+        # The timestamps are ISO 8601 strings in etcd but datetimes in the
+        # objects passed as markers.
+        if not isinstance(value, datetime):
+            value = timeutils.parse_isotime(value)
+        value = timeutils.normalize_time(value)
+    # None sorts after every value instead of failing to compare.
+    return (value is None, value)
+
+
 def translate_etcd_result(etcd_result, model_type):
     """Translate etcd unicode result to etcd models."""
     try:
@@ -95,18 +167,110 @@ class EtcdAPI(object):
 
     def __init__(self, host, port):
         self.client = etcd.Client(host=host, port=port)
+        self._container_indexes_built = False
+        self._cache = None
+        if CONF.etcd.etcd_cache_enabled:
+            self._cache = cache.EtcdCache(self.client, CACHED_PATHS)
+
+    def _read(self, key):
+        """Read a key from the cache when it is current, else from etcd."""
+        if self._cache is not None and self._cache.serves(key):
+            return self._cache.read(key)
+        return self.client.read(key)
+
+    def _read_children(self, path, filters=None):
+        """Return the keys under a path.
+
+        The cache only returns the keys matching the filters, so that the
+        others are not decoded. The keys read from etcd are not filtered.
+        """
+        if self._cache is not None and self._cache.serves(path):
+            return self._cache.list(path, filters)
+        return getattr(self.client.read(path), 'children', None)
+
+    def _cache_write(self, result):
+        if self._cache is not None:
+            self._cache.record(result)
 
     @lockutils.synchronized('etcd-client')
     def clean_all_zun_data(self):
         try:
+            self._container_indexes_built = False
             for d in self.client.read('/').children:
-                if d.key in ('/containers',):
+                if d.key in ('/containers', CONTAINER_INDEX_PATH,
+                             CONTAINER_NAME_PATH, IMAGE_TAG_PATH):
                     self.client.delete(d.key, recursive=True)
         except etcd.EtcdKeyNotFound as e:
             LOG.error('Error occurred while cleaning zun data: %s',
                       six.text_type(e))
             raise
 
+    def _cas_update(self, key, modify, before_update=None):
+        """Update the value of a key with compare-and-swap writes.
+
+        modify is called with the current value of the key and returns its
+        new value. When another client modified the key meanwhile, the write
+        fails on the modification index and modify is called again on the
+        fresh value, up to etcd_write_retries times.
+
+        :returns: the written etcd result and the previous value.
+        """
+        retries = CONF.etcd.etcd_write_retries
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(random.uniform(0, CAS_BACKOFF * 2 ** attempt))
+            target = self.client.read(key)
+            old_value = json.loads(target.value)
+            new_value = modify(dict(old_value))
+            if before_update is not None:
+                before_update(old_value, new_value)
+            target.value = json.dump_as_bytes(new_value)
+            try:
+                self._cache_write(self.client.update(target))
+            except etcd.EtcdCompareFailed:
+                LOG.debug('%s was modified concurrently, retrying', key)
+                continue
+            return target, old_value
+        raise exception.ConcurrentUpdateConflict(key=key)
+
+    def _reserve(self, key, owner):
+        """Atomically reserve a unique key for the resource owner.
+
+        The reservation expires after RESERVATION_TTL seconds unless it is
+        confirmed, so that a client dying before saving its resource does
+        not hold the key forever.
+
+        :returns: whether the key is reserved for owner.
+        """
+        for attempt in range(CONF.etcd.etcd_write_retries + 1):
+            try:
+                self.client.write(key, owner, ttl=RESERVATION_TTL,
+                                  prevExist=False)
+                return True
+            except etcd.EtcdAlreadyExist:
+                pass
+            try:
+                return self.client.read(key).value == owner
+            except etcd.EtcdKeyNotFound:
+                # Released or expired meanwhile, try again.
+                continue
+        raise exception.ConcurrentUpdateConflict(key=key)
+
+    def _confirm_reservation(self, key, owner):
+        try:
+            # Writing the key again without a ttl makes it permanent.
+            self.client.write(key, owner, prevValue=owner)
+        except (etcd.EtcdCompareFailed, etcd.EtcdKeyNotFound):
+            LOG.warning('The reservation of %(key)s by %(owner)s expired '
+                        'before it was confirmed',
+                        {'key': key, 'owner': owner})
+
+    def _release(self, key, owner):
+        try:
+            self.client.delete(key, prevValue=owner)
+        except (etcd.EtcdCompareFailed, etcd.EtcdKeyNotFound):
+            pass
+
     def _add_tenant_filters(self, context, filters):
         filters = filters or {}
         if context.is_admin and context.all_tenants:
@@ -120,33 +284,63 @@ class EtcdAPI(object):
         return filters
 
     def _filter_resources(self, resources, filters):
-        for c in list(resources):
-            for k, v in filters.items():
-                if c.get(k) != v:
-                    resources.remove(c)
-                    break
-
-        return resources
-
-    def _process_list_result(self, res_list, limit=None, sort_key=None):
+        return [r for r in resources
+                if all(r.get(k) == v for k, v in filters.items())]
+
+    def _filter_updated_since(self, resources, since):
+        since = timeutils.normalize_time(since)
+        filtered = []
+        for r in resources:
+            changed_at = r.get('updated_at') or r.get('created_at')
+            if changed_at is None or timeutils.normalize_time(
+                    timeutils.parse_isotime(changed_at)) >= since:
+                filtered.append(r)
+        return filtered
+
+    def _process_list_result(self, res_list, limit=None, sort_key=None,
+                             sort_dir=None, marker=None):
+        """Sort, paginate and limit a list of resources.
+
+        The resources are sorted by sort_key then by uuid, so that the
+        pages following a marker neither skip nor repeat resources.
+        """
         if len(res_list) == 0:
             return []
-        sorted_res_list = res_list
-        if sort_key:
-            if not hasattr(res_list[0], sort_key):
-                raise exception.InvalidParameterValue(
-                    err='Container has no attribute: %s' % sort_key)
-            sorted_res_list = sorted(res_list, key=lambda k: k.get(sort_key))
+        if sort_key and not hasattr(res_list[0], sort_key):
+            raise exception.InvalidParameterValue(
+                err='Container has no attribute: %s' % sort_key)
+        sort_keys = [sort_key] if sort_key else []
+        if hasattr(res_list[0], 'uuid') and 'uuid' not in sort_keys:
+            sort_keys.append('uuid')
+
+        time_keys = set()
+        if marker is not None:
+            time_keys = set(k for k in sort_keys
+                            if isinstance(getattr(marker, k, None), datetime))
+
+        def key(resource):
+            return [_sort_value(getattr(resource, k), k in time_keys)
+                    for k in sort_keys]
+
+        reverse = sort_dir == 'desc'
+        sorted_res_list = sorted(res_list, key=key, reverse=reverse)
+        if marker is not None and sort_keys:
+            marker_key = key(marker)
+            if reverse:
+                sorted_res_list = [r for r in sorted_res_list
+                                   if key(r) < marker_key]
+            else:
+                sorted_res_list = [r for r in sorted_res_list
+                                   if key(r) > marker_key]
 
         if limit:
             sorted_res_list = sorted_res_list[0:limit]
 
         return sorted_res_list
 
-    def list_containers(self, context, filters=None, limit=None,
-                        marker=None, sort_key=None, sort_dir=None):
+    def _scan_containers(self):
         try:
-            res = getattr(self.client.read('/containers'), 'children', None)
+            res = self._read_children('/containers')
         except etcd.EtcdKeyNotFound:
             # Before the first container been created, path '/containers'
             # does not exist.
@@ -157,15 +351,89 @@ class EtcdAPI(object):
                 six.text_type(e))
             raise
 
+        return [translate_etcd_result(c, 'container') for c in res
+                if c.value is not None]
+
+    def _read_containers(self, uuids):
         containers = []
-        for c in res:
-            if c.value is not None:
-                containers.append(translate_etcd_result(c, 'container'))
-        filters = self._add_tenant_filters(context, filters)
+        for uuid in uuids:
+            try:
+                res = self.client.read('/containers/' + uuid)
+            except etcd.EtcdKeyNotFound:
+                # A stale index entry of a deleted container.
+                continue
+            containers.append(translate_etcd_result(res, 'container'))
+        return containers
+
+    def _read_container_index(self, field, value):
+        try:
+            res = self.client.read(_container_index_key(field, value))
+        except etcd.EtcdKeyNotFound:
+            return set()
+        return set(json.loads(c.value)['uuid'] for c in res.children
+                   if c.value is not None)
+
+    def _write_container_indexes(self, values, fields=CONTAINER_INDEX_FIELDS):
+        entry = json.dump_as_bytes({'uuid': values['uuid']})
+        for field in fields:
+            self.client.write(_container_index_key(
+                field, values.get(field), values['uuid']), entry)
+
+    def _delete_container_indexes(self, values,
+                                  fields=CONTAINER_INDEX_FIELDS):
+        for field in fields:
+            try:
+                self.client.delete(_container_index_key(
+                    field, values.get(field), values['uuid']))
+            except etcd.EtcdKeyNotFound:
+                pass
+
+    @lockutils.synchronized('etcd_container_index')
+    def _build_container_indexes(self):
+        if self._container_indexes_built:
+            return
+        try:
+            self.client.read(CONTAINER_INDEX_PATH + '/built')
+        except etcd.EtcdKeyNotFound:
+            # NOTE(zun): The containers created meanwhile write their own
+            # index entries, scanning once is enough.
+            containers = self._scan_containers()
+            LOG.info('Building the etcd indexes of %d containers',
+                     len(containers))
+            for container in containers:
+                self._write_container_indexes(container.as_dict())
+            self.client.write(CONTAINER_INDEX_PATH + '/built',
+                              timeutils.utcnow().isoformat())
+        self._container_indexes_built = True
+
+    def _find_containers(self, filters):
+        """Return the containers which may match the filters.
+
+        The first indexed field found in the filters narrows down the
+        containers to read, the caller still has to filter them.
+        """
+        if self._cache is not None and self._cache.serves('/containers'):
+            return [translate_etcd_result(c, 'container')
+                    for c in self._cache.list('/containers', filters)]
+        for field in CONTAINER_INDEX_FIELDS:
+            if field not in filters:
+                continue
+            self._build_container_indexes()
+            uuids = self._read_container_index(field, filters[field])
+            if len(uuids) <= MAX_INDEX_FETCH:
+                return self._read_containers(sorted(uuids))
+            break
+        return self._scan_containers()
+
+    def list_containers(self, context, filters=None, limit=None,
+                        marker=None, sort_key=None, sort_dir=None):
+        filters = self._add_tenant_filters(context, dict(filters or {}))
+        containers = self._find_containers(filters)
         filtered_containers = self._filter_resources(
             containers, filters)
         return self._process_list_result(filtered_containers,
-                                         limit=limit, sort_key=sort_key)
+                                         limit=limit, sort_key=sort_key,
+                                         sort_dir=sort_dir, marker=marker)
 
     def _validate_unique_container_name(self, context, name):
         if not CONF.compute.unique_container_name_scope:
@@ -191,27 +459,46 @@ class EtcdAPI(object):
             raise exception.ContainerAlreadyExists(field='name',
                                                    value=lowername)
 
-    @lockutils.synchronized('etcd_container')
+    def _reserve_container_name(self, project_id, name, uuid):
+        key = _container_name_key(project_id, name)
+        if key is not None and not self._reserve(key, uuid):
+            raise exception.ContainerAlreadyExists(field='name',
+                                                   value=name.lower())
+        return key
+
     def create_container(self, context, container_data):
         # ensure defaults are present for new containers
         if not container_data.get('uuid'):
             container_data['uuid'] = uuidutils.generate_uuid()
 
+        name_key = None
         if container_data.get('name'):
+            # NOTE(zun): The containers created before the name
+            # reservations have none, they are still looked up.
             self._validate_unique_container_name(context,
                                                  container_data['name'])
+            name_key = self._reserve_container_name(
+                container_data.get('project_id', context.project_id),
+                container_data['name'], container_data['uuid'])
 
         container = models.Container(container_data)
+        # NOTE(zun): The index entries are written before and deleted after
+        # the container, the lookups filter out the stale ones.
         try:
-            container.save()
+            self._write_container_indexes(container.as_dict())
+            self._cache_write(container.save())
         except Exception:
-            raise
+            with excutils.save_and_reraise_exception():
+                if name_key is not None:
+                    self._release(name_key, container.uuid)
 
+        if name_key is not None:
+            self._confirm_reservation(name_key, container.uuid)
         return container
 
     def get_container_by_uuid(self, context, container_uuid):
         try:
-            res = self.client.read('/containers/' + container_uuid)
+            res = self._read('/containers/' + container_uuid)
             container = translate_etcd_result(res, 'container')
             filtered_containers = self._filter_resources(
                 [container], self._add_tenant_filters(context, {}))
@@ -247,15 +534,40 @@ class EtcdAPI(object):
 
         return containers[0]
 
-    @lockutils.synchronized('etcd_container')
     def destroy_container(self, context, container_uuid):
         container = self.get_container_by_uuid(context, container_uuid)
-        self.client.delete('/containers/' + container.uuid)
+        self._cache_write(self.client.delete('/containers/' + container.uuid))
+        self._delete_container_indexes(container.as_dict())
+        if container.name:
+            name_key = _container_name_key(container.project_id,
+                                           container.name)
+            if name_key is not None:
+                self._release(name_key, container.uuid)
+
+    def _update_container_value(self, container_uuid, values):
+        """Write values into a container and maintain its indexes.
+
+        :returns: the written etcd result, the previous and the new value.
+        """
+        def modify(value):
+            value.update(values)
+            return value
+
+        def before_update(old_value, new_value):
+            # NOTE(zun): An update losing the race to another writer may
+            # leave a new index entry behind, the lookups filter it out
+            # like the other stale ones.
+            self._write_container_indexes(
+                new_value, _changed_index_fields(old_value, new_value))
+
+        target, old_value = self._cas_update(
+            '/containers/' + container_uuid, modify, before_update)
+        new_value = json.loads(target.value)
+        self._delete_container_indexes(
+            old_value, _changed_index_fields(old_value, new_value))
+        return target, old_value, new_value
 
-    @lockutils.synchronized('etcd_container')
     def update_container(self, context, container_uuid, values):
-        # NOTE(yuywz): Update would fail if any other client
-        # write '/containers/$CONTAINER_UUID' in the meanwhile
         if 'uuid' in values:
             msg = _("Cannot overwrite UUID for an existing Container.")
             raise exception.InvalidParameterValue(err=msg)
@@ -263,34 +575,69 @@ class EtcdAPI(object):
         if 'name' in values:
             self._validate_unique_container_name(context, values['name'])
 
+        name_key = None
         try:
-            target_uuid = self.get_container_by_uuid(
-                context, container_uuid).uuid
-            target = self.client.read('/containers/' + target_uuid)
-            target_value = json.loads(target.value)
-            target_value.update(values)
-            target.value = json.dump_as_bytes(target_value)
-            self.client.update(target)
-        except etcd.EtcdKeyNotFound:
-            raise exception.ContainerNotFound(container=container_uuid)
+            container = self.get_container_by_uuid(context, container_uuid)
+            if values.get('name') and (
+                    values['name'].lower() != (container.name or '').lower()):
+                name_key = self._reserve_container_name(
+                    container.project_id, values['name'], container.uuid)
+            target, old_value, new_value = self._update_container_value(
+                container.uuid, values)
         except Exception as e:
+            if name_key is not None:
+                self._release(name_key, container.uuid)
+            if isinstance(e, etcd.EtcdKeyNotFound):
+                raise exception.ContainerNotFound(container=container_uuid)
             LOG.error('Error occurred while updating container: %s',
                       six.text_type(e))
             raise
 
+        if name_key is not None:
+            self._confirm_reservation(name_key, container.uuid)
+        if old_value.get('name') and (
+                old_value['name'].lower() !=
+                (new_value.get('name') or '').lower()):
+            old_name_key = _container_name_key(old_value.get('project_id'),
+                                               old_value['name'])
+            if old_name_key is not None:
+                self._release(old_name_key, container.uuid)
+
         return translate_etcd_result(target, 'container')
 
-    @lockutils.synchronized('etcd_zunservice')
+    def bulk_update_containers(self, context, values_by_uuid):
+        for values in values_by_uuid.values():
+            if 'uuid' in values or 'name' in values:
+                msg = _("Cannot update the UUID or the name of containers "
+                        "in bulk.")
+                raise exception.InvalidParameterValue(err=msg)
+
+        # NOTE(zun): The etcd v2 API has no multi-key transaction, each
+        # container is written by its own compare-and-swap. They skip the
+        # read of the container done by update_container for the renames.
+        count = 0
+        for container_uuid, values in values_by_uuid.items():
+            if not values:
+                continue
+            try:
+                self._update_container_value(container_uuid, values)
+            except etcd.EtcdKeyNotFound:
+                LOG.debug('Container %s was deleted before its update',
+                          container_uuid)
+                continue
+            count += 1
+        return count
+
     def create_zun_service(self, values):
         values['created_at'] = datetime.isoformat(timeutils.utcnow())
         zun_service = models.ZunService(values)
-        zun_service.save()
+        self._cache_write(zun_service.save())
         return zun_service
 
     def list_zun_services(self, filters=None, limit=None,
                           marker=None, sort_key=None, sort_dir=None):
         try:
-            res = getattr(self.client.read('/zun_services'), 'children', None)
+            res = self._read_children('/zun_services', filters)
         except etcd.EtcdKeyNotFound:
             LOG.error(
                 ("Path '/zun_services' does not exist, seems etcd server "
@@ -309,7 +656,7 @@ class EtcdAPI(object):
         if filters:
             services = self._filter_resources(services, filters)
         return self._process_list_result(
-            services, limit=limit, sort_key=sort_key)
+            services, limit=limit, sort_key=sort_key, sort_dir=sort_dir)
 
     def list_zun_services_by_binary(self, binary):
         services = self.list_zun_services(filters={'binary': binary})
@@ -318,7 +665,7 @@ class EtcdAPI(object):
     def get_zun_service(self, host, binary):
         try:
             service = None
-            res = self.client.read('/zun_services/' + host + '_' + binary)
+            res = self._read('/zun_services/' + host + '_' + binary)
             service = translate_etcd_result(res, 'zun_service')
         except etcd.EtcdKeyNotFound:
             raise exception.ZunServiceNotFound(host=host, binary=binary)
@@ -329,10 +676,10 @@ class EtcdAPI(object):
         finally:
             return service
 
-    @lockutils.synchronized('etcd_zunservice')
     def destroy_zun_service(self, host, binary):
         try:
-            self.client.delete('/zun_services/' + host + '_' + binary)
+            self._cache_write(self.client.delete(
+                '/zun_services/' + host + '_' + binary))
         except etcd.EtcdKeyNotFound:
             raise exception.ZunServiceNotFound(host=host, binary=binary)
         except Exception as e:
@@ -340,15 +687,14 @@ class EtcdAPI(object):
                       six.text_type(e))
             raise
 
-    @lockutils.synchronized('etcd_zunservice')
     def update_zun_service(self, host, binary, values):
-        try:
-            target = self.client.read('/zun_services/' + host + '_' + binary)
-            target_value = json.loads(target.value)
+        def modify(value):
             values['updated_at'] = datetime.isoformat(timeutils.utcnow())
-            target_value.update(values)
-            target.value = json.dump_as_bytes(target_value)
-            self.client.update(target)
+            value.update(values)
+            return value
+
+        try:
+            self._cas_update('/zun_services/' + host + '_' + binary, modify)
         except etcd.EtcdKeyNotFound:
             raise exception.ZunServiceNotFound(host=host, binary=binary)
         except Exception as e:
@@ -356,7 +702,6 @@ class EtcdAPI(object):
                       six.text_type(e))
             raise
 
-    @lockutils.synchronized('etcd_image')
     def pull_image(self, context, values):
         if not values.get('uuid'):
             values['uuid'] = uuidutils.generate_uuid()
@@ -367,22 +712,47 @@ class EtcdAPI(object):
         if image:
             raise exception.ImageAlreadyExists(repo=repo, tag=tag)
 
+        tag_key = _image_tag_key(values.get('project_id'), repo, tag)
+        if not self._reserve(tag_key, values['uuid']):
+            raise exception.ImageAlreadyExists(repo=repo, tag=tag)
         image = models.Image(values)
-        image.save()
+        try:
+            image.save()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._release(tag_key, image.uuid)
+        self._confirm_reservation(tag_key, image.uuid)
         return image
 
-    @lockutils.synchronized('etcd_image')
     def update_image(self, image_uuid, values):
         if 'uuid' in values:
             msg = _('Cannot overwrite UUID for an existing image.')
             raise exception.InvalidParameterValue(err=msg)
 
+        def modify(value):
+            value.update(values)
+            return value
+
         try:
-            target = self.client.read('/images/' + image_uuid)
-            target_value = json.loads(target.value)
-            target_value.update(values)
-            target.value = json.dump_as_bytes(target_value)
-            self.client.update(target)
+            target = self._cas_update('/images/' + image_uuid, modify)[0]
+        except etcd.EtcdKeyNotFound:
+            raise exception.ImageNotFound(image=image_uuid)
+        except Exception as e:
+            LOG.error('Error occurred while updating image: %s',
+                      six.text_type(e))
+            raise
+
+        return translate_etcd_result(target, 'image')
+
+    def update_image_warm_status(self, image_uuid, host, status):
+        def modify(value):
+            warm_status = dict(value.get('warm_status') or {})
+            warm_status[host] = status
+            value['warm_status'] = warm_status
+            return value
+
+        try:
+            target = self._cas_update('/images/' + image_uuid, modify)[0]
         except etcd.EtcdKeyNotFound:
             raise exception.ImageNotFound(image=image_uuid)
         except Exception as e:
@@ -414,7 +784,8 @@ class EtcdAPI(object):
         filtered_images = self._filter_resources(images, filters)
 
         return self._process_list_result(filtered_images,
-                                         limit=limit, sort_key=sort_key)
+                                         limit=limit, sort_key=sort_key,
+                                         sort_dir=sort_dir, marker=marker)
 
     def get_image_by_uuid(self, context, image_uuid):
         try:
@@ -440,8 +811,8 @@ class EtcdAPI(object):
             return None
         return images[0]
 
-    def list_resource_classes(self, context, filters=None, limit=None,
-                              marker=None, sort_key=None, sort_dir=None):
+    def list_resource_classes(self, context, limit=None, marker=None,
+                              sort_key=None, sort_dir=None, filters=None):
         try:
             res = getattr(self.client.read('/resource_classes'),
                           'children', None)
@@ -464,9 +835,9 @@ class EtcdAPI(object):
                 resource_classes, filters)
 
         return self._process_list_result(
-            resource_classes, limit=limit, sort_key=sort_key)
+            resource_classes, limit=limit, sort_key=sort_key,
+            sort_dir=sort_dir, marker=marker)
 
-    @lockutils.synchronized('etcd_resource_class')
     def create_resource_class(self, context, values):
         resource_class = models.ResourceClass(values)
         resource_class.save()
@@ -512,22 +883,22 @@ class EtcdAPI(object):
 
         return rcs[0]
 
-    @lockutils.synchronized('etcd_resource_class')
     def destroy_resource_class(self, context, uuid):
         resource_class = self._get_resource_class_by_uuid(context, uuid)
         self.client.delete('/resource_classes/' + resource_class.uuid)
 
-    @lockutils.synchronized('etcd_resource_class')
     def update_resource_class(self, context, uuid, values):
         if 'uuid' in values:
             msg = _("Cannot override UUID for an existing resource class.")
             raise exception.InvalidParameterValue(err=msg)
+
+        def modify(value):
+            value.update(values)
+            return value
+
         try:
-            target = self.client.read('/resource_classes/' + uuid)
-            target_value = json.loads(target.value)
-            target_value.update(values)
-            target.value = json.dump_as_bytes(target_value)
-            self.client.update(target)
+            target = self._cas_update('/resource_classes/' + uuid,
+                                      modify)[0]
         except etcd.EtcdKeyNotFound:
             raise exception.ResourceClassNotFound(resource_class=uuid)
         except Exception as e:
@@ -559,7 +930,7 @@ class EtcdAPI(object):
     def _get_compute_node_by_uuid(self, context, uuid):
         try:
             compute_node = None
-            res = self.client.read('/compute_nodes/' + uuid)
+            res = self._read('/compute_nodes/' + uuid)
             compute_node = translate_etcd_result(res, 'compute_node')
         except etcd.EtcdKeyNotFound:
             raise exception.ComputeNodeNotFound(compute_node=uuid)
@@ -573,7 +944,7 @@ class EtcdAPI(object):
     def get_compute_node(self, context, node_uuid):
         try:
             node = None
-            res = self.client.read('/compute_nodes/' + node_uuid)
+            res = self._read('/compute_nodes/' + node_uuid)
             node = translate_etcd_result(res, 'compute_node')
         except etcd.EtcdKeyNotFound:
             raise exception.ComputeNodeNotFound(compute_node=node_uuid)
@@ -583,18 +954,19 @@ class EtcdAPI(object):
             raise
         return node
 
-    @lockutils.synchronized('etcd_computenode')
     def update_compute_node(self, context, node_uuid, values):
         if 'uuid' in values:
             msg = _('Cannot overwrite UUID for an existing node.')
             raise exception.InvalidParameterValue(err=msg)
 
+        def modify(value):
+            values['updated_at'] = datetime.isoformat(timeutils.utcnow())
+            value.update(values)
+            return value
+
         try:
-            target = self.client.read('/compute_nodes/' + node_uuid)
-            target_value = json.loads(target.value)
-            target_value.update(values)
-            target.value = json.dumps(target_value)
-            self.client.update(target)
+            target = self._cas_update('/compute_nodes/' + node_uuid,
+                                      modify)[0]
         except etcd.EtcdKeyNotFound:
             raise exception.ComputeNodeNotFound(compute_node=node_uuid)
         except Exception as e:
@@ -604,24 +976,25 @@ class EtcdAPI(object):
             raise
         return translate_etcd_result(target, 'compute_node')
 
-    @lockutils.synchronized('etcd_computenode')
     def create_compute_node(self, context, values):
         values['created_at'] = datetime.isoformat(timeutils.utcnow())
         if not values.get('uuid'):
             values['uuid'] = uuidutils.generate_uuid()
         compute_node = models.ComputeNode(values)
-        compute_node.save()
+        self._cache_write(compute_node.save())
         return compute_node
 
-    @lockutils.synchronized('etcd_compute_node')
     def destroy_compute_node(self, context, node_uuid):
         compute_node = self._get_compute_node_by_uuid(context, node_uuid)
-        self.client.delete('/compute_nodes/' + compute_node.uuid)
+        self._cache_write(self.client.delete(
+            '/compute_nodes/' + compute_node.uuid))
 
     def list_compute_nodes(self, context, filters=None, limit=None,
                            marker=None, sort_key=None, sort_dir=None):
+        filters = dict(filters or {})
+        updated_since = filters.pop('updated_since', None)
         try:
-            res = getattr(self.client.read('/compute_nodes'), 'children', None)
+            res = self._read_children('/compute_nodes', filters)
         except etcd.EtcdKeyNotFound:
             return []
         except Exception as e:
@@ -634,7 +1007,11 @@ class EtcdAPI(object):
         for c in res:
             if c.value is not None:
                 compute_nodes.append(translate_etcd_result(c, 'compute_node'))
+        if updated_since is not None:
+            compute_nodes = self._filter_updated_since(compute_nodes,
+                                                       updated_since)
         if filters:
             compute_nodes = self._filter_resources(compute_nodes, filters)
         return self._process_list_result(compute_nodes, limit=limit,
-                                         sort_key=sort_key)
+                                         sort_key=sort_key, sort_dir=sort_dir,
+                                         marker=marker)
@@ -0,0 +1,221 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+In-process cache of the etcd keys read the most by the etcd backend.
+
+The keys under a cached path are loaded by a recursive read on the first
+use of the path, then kept current by a watch. The watch resumes from the
+etcd index of the last change it saw, so that a watch issued again after a
+disconnection misses no change. The reads go to the etcd server until a
+path is loaded, and while its watch is failing.
+"""
+
+import collections
+import threading
+import time
+
+import etcd
+from oslo_log import log as logging
+from oslo_serialization import jsonutils as json
+import six
+
+from zun.common import utils
+import zun.conf
+
+CONF = zun.conf.CONF
+LOG = logging.getLogger(__name__)
+
+DELETE_ACTIONS = ('delete', 'compareAndDelete', 'expire')
+MAX_RETRY_INTERVAL = 30
+
+
+class CachedNode(collections.namedtuple(
+        'CachedNode', ['key', 'value', 'modifiedIndex', 'data'])):
+    """A cached key, data being its decoded value.
+
+    A node without value records a key deleted by this process, until the
+    watch sees the deletion.
+    """
+
+
+class EtcdCache(object):
+    """Cache of the keys under some etcd paths."""
+
+    def __init__(self, client, paths):
+        self.client = client
+        self.paths = tuple(paths)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._nodes = {}
+        self._index = {}
+        self._current = {}
+        self._stopped = False
+        self._stats = {'hits': 0, 'misses': 0, 'events': 0, 'loads': 0}
+
+    def _path_of(self, key):
+        for path in self.paths:
+            if key == path or key.startswith(path + '/'):
+                return path
+        return None
+
+    def serves(self, key):
+        """Whether the cache is current for a key or a cached path.
+
+        The path of the key is loaded and watched on its first use.
+        """
+        path = self._path_of(key)
+        if path is None:
+            return False
+        if path not in self._index:
+            with self._load_lock:
+                if path not in self._index:
+                    try:
+                        self._load(path)
+                    except etcd.EtcdException as e:
+                        LOG.warning('Failed to load %(path)s in the etcd '
+                                    'cache: %(error)s',
+                                    {'path': path, 'error': six.text_type(e)})
+                        return False
+                    utils.spawn_n(self._watch, path)
+        with self._lock:
+            served = self._current[path]
+            self._stats['hits' if served else 'misses'] += 1
+        return served
+
+    def read(self, key):
+        """Return the cached node of a key, like etcd.Client.read."""
+        with self._lock:
+            node = self._nodes[self._path_of(key)].get(key)
+        if node is None or node.value is None:
+            raise etcd.EtcdKeyNotFound(payload={'cause': key})
+        return node
+
+    def list(self, path, filters=None):
+        """Return the cached nodes under a path.
+
+        Only the nodes whose decoded value equals the filters are returned.
+        """
+        filters = filters or {}
+        with self._lock:
+            nodes = list(self._nodes[path].values())
+        return [n for n in nodes if n.value is not None and
+                all(n.data.get(k) == v for k, v in filters.items())]
+
+    def record(self, result):
+        """Apply the result of a write of this process.
+
+        The reads following a write see it without waiting for the watch.
+        """
+        path = self._path_of(result.key)
+        with self._lock:
+            if path not in self._nodes:
+                return
+            if result.action in DELETE_ACTIONS:
+                node = self._nodes[path].get(result.key)
+                if node is None or node.modifiedIndex < result.modifiedIndex:
+                    self._nodes[path][result.key] = CachedNode(
+                        result.key, None, result.modifiedIndex, None)
+            else:
+                self._set(self._nodes[path], result)
+
+    def _set(self, nodes, result):
+        node = nodes.get(result.key)
+        if node is None or node.modifiedIndex < result.modifiedIndex:
+            nodes[result.key] = CachedNode(
+                result.key, result.value, result.modifiedIndex,
+                json.loads(result.value))
+
+    def _load(self, path):
+        try:
+            res = self.client.read(path, recursive=True)
+            index = res.etcd_index
+            leaves = [n for n in res.leaves if not n.dir]
+        except etcd.EtcdKeyNotFound as e:
+            index = (e.payload or {}).get('index', 0)
+            leaves = []
+        nodes = {}
+        for leaf in leaves:
+            self._set(nodes, leaf)
+        with self._lock:
+            self._nodes[path] = nodes
+            self._index[path] = index
+            self._current[path] = True
+            self._stats['loads'] += 1
+        LOG.debug('Loaded %(count)d keys of %(path)s at etcd index %(index)d',
+                  {'count': len(nodes), 'path': path, 'index': index})
+
+    def _watch_once(self, path):
+        res = self.client.read(path, recursive=True, wait=True,
+                               waitIndex=self._index[path] + 1,
+                               timeout=CONF.etcd.etcd_cache_watch_timeout)
+        with self._lock:
+            self._stats['events'] += 1
+            nodes = self._nodes[path]
+            if res.action in DELETE_ACTIONS and res.dir:
+                for key in [k for k in nodes
+                            if k.startswith(res.key + '/')]:
+                    del nodes[key]
+            elif res.action in DELETE_ACTIONS:
+                node = nodes.get(res.key)
+                if node is None or node.modifiedIndex <= res.modifiedIndex:
+                    nodes.pop(res.key, None)
+            elif not res.dir:
+                self._set(nodes, res)
+            self._index[path] = max(self._index[path], res.modifiedIndex)
+
+    def _watch(self, path):
+        failures = 0
+        reload = False
+        while not self._stopped:
+            try:
+                if reload:
+                    self._load(path)
+                    reload = False
+                self._watch_once(path)
+            except etcd.EtcdWatchTimedOut:
+                pass
+            except etcd.EtcdEventIndexCleared:
+                # NOTE(zun): etcd only keeps the last 1000 events, the
+                # changes since the index of the cache are lost.
+                LOG.info('The etcd events of %s since index %d were '
+                         'cleared, loading it again', path,
+                         self._index[path])
+                self._set_current(path, False)
+                reload = True
+                continue
+            except Exception as e:
+                failures += 1
+                self._set_current(path, False)
+                LOG.warning('Failed to watch %(path)s for the etcd cache: '
+                            '%(error)s', {'path': path,
+                                          'error': six.text_type(e)})
+                time.sleep(min(2 ** failures, MAX_RETRY_INTERVAL))
+                continue
+            failures = 0
+            self._set_current(path, True)
+
+    def _set_current(self, path, current):
+        with self._lock:
+            self._current[path] = current
+
+    def stop(self):
+        self._stopped = True
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['keys'] = sum(len(nodes) for nodes in self._nodes.values())
+            stats['paths'] = {path: {'index': self._index[path],
+                                     'current': self._current[path]}
+                              for path in self._index}
+            return stats
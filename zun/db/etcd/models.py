@@ -45,14 +45,6 @@ class Base(object):
 
         return d
 
-    def path_already_exist(self, client, path):
-        try:
-            client.read(path)
-        except etcd.EtcdKeyNotFound:
-            return False
-
-        return True
-
     def update(self, values):
         """Make the model object behave like a dict."""
         for k, v in values.items():
@@ -64,11 +56,12 @@ class Base(object):
         client = session.client
         path = self.etcd_path(self.uuid)
 
-        if self.path_already_exist(client, path):
+        try:
+            result = client.write(path, json.dump_as_bytes(self.as_dict()),
+                                  prevExist=False)
+        except etcd.EtcdAlreadyExist:
             raise exception.ResourceExists(name=getattr(self, '__class__'))
-
-        client.write(path, json.dump_as_bytes(self.as_dict()))
-        return
+        return result
 
 
 class ZunService(Base):
@@ -102,12 +95,13 @@ class ZunService(Base):
         client = session.client
         path = self.etcd_path(self.host + '_' + self.binary)
 
-        if self.path_already_exist(client, path):
+        try:
+            result = client.write(path, json.dump_as_bytes(self.as_dict()),
+                                  prevExist=False)
+        except etcd.EtcdAlreadyExist:
             raise exception.ZunServiceAlreadyExists(host=self.host,
                                                     binary=self.binary)
-
-        client.write(path, json.dump_as_bytes(self.as_dict()))
-        return
+        return result
 
 
 class Container(Base):
@@ -237,9 +231,10 @@ class ComputeNode(Base):
             session = db.api.get_connection()
         client = session.client
         path = self.etcd_path(self.uuid)
-        if self.path_already_exist(client, path):
+        try:
+            result = client.write(path, json.dump_as_bytes(self.as_dict()),
+                                  prevExist=False)
+        except etcd.EtcdAlreadyExist:
             raise exception.ComputeNodeAlreadyExists(
                 field='UUID', value=self.uuid)
-
-        client.write(path, json.dump_as_bytes(self.as_dict()))
-        return
+        return result
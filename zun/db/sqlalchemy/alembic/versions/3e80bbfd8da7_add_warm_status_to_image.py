@@ -0,0 +1,37 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""add warm_status to image
+
+Revision ID: 3e80bbfd8da7
+Revises: 5056c495abc2
+Create Date: 2017-09-20 10:12:43.381224
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3e80bbfd8da7'
+down_revision = '5056c495abc2'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+import zun
+
+
+def upgrade():
+    op.add_column('image',
+                  sa.Column('warm_status',
+                            zun.db.sqlalchemy.models.JSONEncodedDict(),
+                            nullable=True))
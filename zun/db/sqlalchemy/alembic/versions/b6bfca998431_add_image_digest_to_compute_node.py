@@ -0,0 +1,33 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add image digest to compute node
+
+Revision ID: b6bfca998431
+Revises: 3e80bbfd8da7
+Create Date: 2017-09-26 14:05:17.529014
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b6bfca998431'
+down_revision = '3e80bbfd8da7'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('compute_node',
+                  sa.Column('image_digest', sa.Text(), nullable=True))
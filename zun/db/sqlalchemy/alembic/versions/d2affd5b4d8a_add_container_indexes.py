@@ -0,0 +1,40 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add container indexes
+
+Revision ID: d2affd5b4d8a
+Revises: b6bfca998431
+Create Date: 2017-09-28 10:21:44.183540
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'd2affd5b4d8a'
+down_revision = 'b6bfca998431'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+
+def upgrade():
+    # NOTE(zun): The prefix lengths keep the keys of the indexes within
+    # the 767 bytes allowed by InnoDB for utf8 columns.
+    op.create_index('container_host_status_idx', 'container',
+                    ['host', 'status'], mysql_length={'host': 200})
+    op.create_index('container_project_id_name_idx', 'container',
+                    ['project_id', 'name'],
+                    mysql_length={'project_id': 64, 'name': 128})
+    op.create_index('container_status_task_state_idx', 'container',
+                    ['status', 'task_state'])
+    op.create_index('container_name_idx', 'container', ['name'])
@@ -93,6 +93,26 @@ def add_identity_filter(query, value):
         raise exception.InvalidIdentity(identity=value)
 
 
+def _add_keyset_bound(query, model, sort_keys, sort_dir, marker):
+    """Bound the query by the marker on its first sort key.
+
+    The rows following the marker in the (k1, k2) order are the rows with
+    k1 > v1 or with k1 = v1 and k2 > v2, which paginate_query filters. The
+    redundant k1 >= v1 bound lets the database range scan an index on k1
+    instead of evaluating the disjunction on every row.
+    """
+    if len(sort_keys) < 2 or sort_dir not in (None, 'asc', 'desc'):
+        return query
+    column = model.__table__.columns.get(sort_keys[0])
+    value = getattr(marker, sort_keys[0], None)
+    if (column is None or value is None or
+            isinstance(column.type, sa.Boolean)):
+        return query
+    if sort_dir == 'desc':
+        return query.filter(column <= value)
+    return query.filter(column >= value)
+
+
 def _paginate_query(model, limit=None, marker=None, sort_key=None,
                     sort_dir=None, query=None, default_sort_key='id'):
     if not query:
@@ -100,6 +120,8 @@ def _paginate_query(model, limit=None, marker=None, sort_key=None,
     sort_keys = [default_sort_key]
     if sort_key and sort_key not in sort_keys:
         sort_keys.insert(0, sort_key)
+    if marker is not None:
+        query = _add_keyset_bound(query, model, sort_keys, sort_dir, marker)
     try:
         query = db_utils.paginate_query(query, model, limit, sort_keys,
                                         marker=marker, sort_dir=sort_dir)
@@ -238,6 +260,33 @@ class Connection(object):
             ref.update(values)
         return ref
 
+    def bulk_update_containers(self, context, values_by_uuid):
+        groups = []
+        for container_uuid, values in values_by_uuid.items():
+            if 'uuid' in values or 'name' in values:
+                msg = _("Cannot update the UUID or the name of containers "
+                        "in bulk.")
+                raise exception.InvalidParameterValue(err=msg)
+            if not values:
+                continue
+            for group_values, uuids in groups:
+                if group_values == values:
+                    uuids.append(container_uuid)
+                    break
+            else:
+                groups.append((values, [container_uuid]))
+
+        # NOTE(zun): The containers updated with the same values, e.g. the
+        # ones whose status changed to Stopped, share a single UPDATE.
+        count = 0
+        session = get_session()
+        with session.begin():
+            for values, uuids in groups:
+                query = model_query(models.Container, session=session)
+                query = query.filter(models.Container.uuid.in_(uuids))
+                count += query.update(values, synchronize_session=False)
+        return count
+
     def destroy_zun_service(self, host, binary):
         session = get_session()
         with session.begin():
@@ -340,11 +389,26 @@ class Connection(object):
             ref.update(values)
         return ref
 
+    def update_image_warm_status(self, image_uuid, host, status):
+        session = get_session()
+        with session.begin():
+            query = model_query(models.Image, session=session)
+            query = add_identity_filter(query, image_uuid)
+            try:
+                ref = query.with_lockmode('update').one()
+            except NoResultFound:
+                raise exception.ImageNotFound(image=image_uuid)
+
+            warm_status = dict(ref.warm_status or {})
+            warm_status[host] = status
+            ref.warm_status = warm_status
+        return ref
+
     def _add_image_filters(self, query, filters):
         if filters is None:
             filters = {}
 
-        filter_names = ['repo', 'project_id', 'user_id', 'size']
+        filter_names = ['repo', 'tag', 'project_id', 'user_id', 'size']
         for name in filter_names:
             if name in filters:
                 query = query.filter_by(**{name: filters[name]})
@@ -670,6 +734,12 @@ class Connection(object):
             if name in filters:
                 query = query.filter_by(**{name: filters[name]})
 
+        if 'updated_since' in filters:
+            since = timeutils.normalize_time(filters['updated_since'])
+            query = query.filter(sa.or_(
+                models.ComputeNode.updated_at >= since,
+                models.ComputeNode.created_at >= since))
+
         return query
 
     def list_compute_nodes(self, context, filters=None, limit=None,
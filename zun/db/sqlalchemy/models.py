@@ -123,6 +123,12 @@ class Container(Base):
     __tablename__ = 'container'
     __table_args__ = (
         schema.UniqueConstraint('uuid', name='uniq_container0uuid'),
+        Index('container_host_status_idx', 'host', 'status',
+              mysql_length={'host': 200}),
+        Index('container_project_id_name_idx', 'project_id', 'name',
+              mysql_length={'project_id': 64, 'name': 128}),
+        Index('container_status_task_state_idx', 'status', 'task_state'),
+        Index('container_name_idx', 'name'),
         table_args()
     )
     id = Column(Integer, primary_key=True)
@@ -175,6 +181,7 @@ class Image(Base):
     repo = Column(String(255))
     tag = Column(String(255))
     size = Column(String(255))
+    warm_status = Column(JSONEncodedDict)
 
 
 class ResourceProvider(Base):
@@ -290,6 +297,7 @@ class ComputeNode(Base):
     os = Column(String(64), nullable=True)
     kernel_version = Column(String(128), nullable=True)
     labels = Column(JSONEncodedDict)
+    image_digest = Column(Text, nullable=True)
 
 
 class Capsule(Base):
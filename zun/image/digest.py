@@ -0,0 +1,117 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compact digest of the images present on a compute host.
+
+The digest is a bloom filter of the repo:tag of every local image. It is
+reported with the compute node so that the scheduler can tell which hosts
+most likely hold the image of a container without listing their images.
+"""
+
+import base64
+import hashlib
+import math
+import struct
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+VERSION = 'v1'
+MIN_SIZE = 64
+DEFAULT_REGISTRY_PREFIXES = ('docker.io/', 'index.docker.io/')
+
+
+def split_reference(reference):
+    """Split a repo[:tag] image reference into a (repo, tag) tuple.
+
+    Unlike a split on the first colon, the port of a registry is kept in
+    the repo.
+    """
+    repo, sep, tag = reference.rpartition(':')
+    if not sep or '/' in tag:
+        return reference, 'latest'
+    return repo, tag
+
+
+def normalize(repo, tag=None):
+    """Return the key identifying an image in the digest."""
+    for prefix in DEFAULT_REGISTRY_PREFIXES:
+        if repo.startswith(prefix):
+            repo = repo[len(prefix):]
+            break
+    if repo.startswith('library/'):
+        repo = repo[len('library/'):]
+    return '%s:%s' % (repo, tag or 'latest')
+
+
+class ImageDigest(object):
+    """Bloom filter of image references.
+
+    Lookups never miss an image which was added, but may report an image
+    which was not with the false positive rate the digest was built for.
+    """
+
+    def __init__(self, size, hash_count, bits=None):
+        self.size = size
+        self.hash_count = hash_count
+        self.bits = bytearray(bits or (size + 7) // 8)
+
+    @classmethod
+    def build(cls, references, false_positive_rate):
+        """Build a digest sized for the given repo:tag references."""
+        references = set(references)
+        count = max(len(references), 1)
+        size = int(math.ceil(-count * math.log(false_positive_rate) /
+                             math.log(2) ** 2))
+        size = max(size, MIN_SIZE)
+        hash_count = max(1, int(round(size / float(count) * math.log(2))))
+        digest = cls(size, hash_count)
+        for reference in references:
+            digest.add(*split_reference(reference))
+        return digest
+
+    def _positions(self, repo, tag):
+        key = normalize(repo, tag).encode('utf-8')
+        h1, h2 = struct.unpack('>QQ', hashlib.md5(key).digest())
+        h2 |= 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, repo, tag=None):
+        for position in self._positions(repo, tag):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def contains(self, repo, tag=None):
+        return all(self.bits[position // 8] & (1 << (position % 8))
+                   for position in self._positions(repo, tag))
+
+    def to_string(self):
+        return '%s:%d:%d:%s' % (
+            VERSION, self.hash_count, self.size,
+            base64.b64encode(bytes(self.bits)).decode('ascii'))
+
+    @classmethod
+    def from_string(cls, value):
+        """Parse a serialized digest, returning None when it is invalid."""
+        try:
+            version, hash_count, size, bits = value.split(':', 3)
+            if version != VERSION:
+                raise ValueError('unsupported version %s' % version)
+            digest = cls(int(size), int(hash_count),
+                         base64.b64decode(bits.encode('ascii')))
+            if len(digest.bits) != (digest.size + 7) // 8:
+                raise ValueError('size mismatch')
+        except (AttributeError, TypeError, ValueError) as e:
+            LOG.warning('Ignoring an invalid image digest: %s', e)
+            return None
+        return digest
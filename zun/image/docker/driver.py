@@ -82,6 +82,17 @@ class DockerDriver(driver.ContainerImageDriver):
             msg = _('Cannot download image from docker: {0}')
             raise exception.ZunException(msg.format(e))
 
+    def has_image(self, context, repo, tag):
+        if self._search_image_on_host(repo, utils.parse_tag_name(tag)):
+            return True
+        registry = repo.split('/', 1)[0] if '/' in repo else None
+        if registry and ('.' in registry or ':' in registry or
+                         registry == 'localhost'):
+            # Only docker hub can be searched, the image is assumed to be
+            # in the registry it is pulled from.
+            return True
+        return super(DockerDriver, self).has_image(context, repo, tag)
+
     def search_image(self, context, repo, tag, exact_match):
         with docker_utils.docker_client() as docker:
             try:
@@ -12,9 +12,14 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import contextlib
+import copy
 import six
 import sys
+import threading
+import time
 
+import eventlet
 from oslo_log import log as logging
 import stevedore
 
@@ -57,18 +62,276 @@ def load_image_driver(image_driver=None):
         sys.exit(1)
 
 
+class _Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+        self.interrupted = False
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """Share the result of a call among its concurrent duplicates.
+
+    The first caller of a key runs the call while the callers arriving
+    before it completes wait for it and get a copy of its result, or its
+    exception re-raised. They make the call again if the first caller is
+    interrupted. Nothing is cached once the call is completed.
+
+    :param share: a callable called by the first caller with the result and
+                  the number of waiters, before they get the result.
+    """
+
+    def __init__(self, share=None):
+        self._lock = threading.Lock()
+        self._share = share
+        self._flights = {}
+        self._stats = {'calls': 0, 'coalesced': 0}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            self._stats['calls'] += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats['coalesced'] += 1
+                flight.waiters += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                leader = True
+
+        if not leader:
+            LOG.debug('Waiting for the in-progress call %s', key)
+            flight.done.wait()
+            if flight.interrupted:
+                return self.do(key, func, *args, **kwargs)
+            if flight.exc_info is not None:
+                six.reraise(*flight.exc_info)
+            return copy.deepcopy(flight.result)
+
+        try:
+            flight.result = func(*args, **kwargs)
+            with self._lock:
+                del self._flights[key]
+            if self._share and flight.waiters:
+                self._share(flight.result, flight.waiters)
+            return copy.deepcopy(flight.result)
+        except Exception:
+            flight.exc_info = sys.exc_info()
+            raise
+        except BaseException:
+            # The first caller was interrupted, e.g. by its own timeout, the
+            # waiters make the call again rather than share the interruption.
+            flight.interrupted = True
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights),
+                        waiting=sum(flight.waiters
+                                    for flight in self._flights.values()))
+
+    def clear_stats(self):
+        with self._lock:
+            self._stats = {'calls': 0, 'coalesced': 0}
+
+
+def _share_pulled_image(result, count):
+    image, _image_loaded = result
+    image_driver = get_image_driver(image['driver'])
+    for _i in range(count):
+        image_driver.acquire_image(image)
+
+
+# Pulls and loads of the same image by the containers created concurrently
+# on this host are done once. Every caller of a shared pull releases the
+# pulled image.
+_pulls = SingleFlight(share=_share_pulled_image)
+_loads = SingleFlight()
+
+
+def get_pull_stats():
+    """Return the counters of the image pulls and loads of this process."""
+    return {'pulls': _pulls.get_stats(), 'loads': _loads.get_stats()}
+
+
+# The image drivers are stateless, a single instance of every driver is
+# shared by the requests of the process.
+_image_drivers = {}
+_image_drivers_lock = threading.Lock()
+_image_driver_stats = {}
+
+
+def get_image_driver(image_driver):
+    """Return the shared instance of an image driver, loading it once."""
+    driver = _image_drivers.get(image_driver)
+    if driver is None:
+        with _image_drivers_lock:
+            driver = _image_drivers.get(image_driver)
+            if driver is None:
+                driver = load_image_driver(image_driver)
+                _image_drivers[image_driver] = driver
+    return driver
+
+
+def init_image_drivers():
+    """Load the configured image drivers, replacing the loaded ones.
+
+    This is called when the service starts, so that the first requests do
+    not pay for loading the drivers, and when its configuration is reloaded.
+    A driver failing to load on reload keeps the loaded drivers in use.
+    """
+    names = set(CONF.image_driver_list)
+    names.add(CONF.sandbox_image_driver)
+    try:
+        drivers = {name: load_image_driver(name) for name in names}
+    except SystemExit:
+        if not _image_drivers:
+            raise
+        LOG.error('Keeping the image drivers %s loaded',
+                  ', '.join(sorted(_image_drivers)))
+        return
+    with _image_drivers_lock:
+        _image_drivers.clear()
+        _image_drivers.update(drivers)
+
+
+@contextlib.contextmanager
+def _record_call(driver, operation):
+    start = time.time()
+    error = False
+    try:
+        yield
+    except exception.ImageNotFound:
+        raise
+    except Exception:
+        error = True
+        raise
+    finally:
+        elapsed = time.time() - start
+        with _image_drivers_lock:
+            stats = _image_driver_stats.setdefault(
+                (driver, operation),
+                {'calls': 0, 'errors': 0, 'total_time': 0.0,
+                 'max_time': 0.0})
+            stats['calls'] += 1
+            stats['errors'] += int(error)
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+
+
+def get_image_driver_stats():
+    """Return the call counts and latencies of the image drivers."""
+    with _image_drivers_lock:
+        return {'%s.%s' % key: dict(stats)
+                for key, stats in _image_driver_stats.items()}
+
+
 def pull_image(context, repo, tag, image_pull_policy='always',
                image_driver=None):
+    """Pull an image, sharing the concurrent pulls of the same image.
+
+    Only the pulls of the same project with the same pull policy are
+    shared, since an image name can resolve to a private image of the
+    project. The caller releases the image with release_image once it is
+    loaded.
+    """
+    key = (image_driver.lower() if image_driver else None,
+           context.project_id if context else None,
+           repo, tuple(tag) if isinstance(tag, list) else tag,
+           image_pull_policy)
+    return _pulls.do(key, _pull_image, context, repo, tag,
+                     image_pull_policy, image_driver)
+
+
+def load_image(container_driver, path):
+    """Load an image into the container runtime.
+
+    Concurrent loads of the same image path are done once.
+    """
+    return _loads.do(path, container_driver.load_image, path)
+
+
+def release_image(image):
+    """Release an image returned by pull_image once it is loaded."""
+    if image.get('driver'):
+        get_image_driver(image['driver']).release_image(image)
+
+
+def _call_with_deadline(driver, operation, func, *args):
+    timeout = CONF.image_driver_timeout or None
+    try:
+        with eventlet.Timeout(timeout):
+            with _record_call(driver, operation):
+                return func(*args)
+    except eventlet.Timeout:
+        raise exception.ZunException(
+            _('Image driver %(driver)s did not complete %(operation)s in '
+              '%(timeout)s seconds') % {'driver': driver,
+                                        'operation': operation,
+                                        'timeout': timeout})
+
+
+def _lookup_image(context, repo, tag, driver):
+    try:
+        return _call_with_deadline(driver, 'has_image',
+                                   get_image_driver(driver).has_image,
+                                   context, repo, tag)
+    except Exception as e:
+        LOG.warning('Cannot look image %(repo)s up in image driver '
+                    '%(driver)s: %(error)s',
+                    {'repo': repo, 'driver': driver,
+                     'error': six.text_type(e)})
+        return None
+
+
+def _order_by_lookup(context, repo, tag, image_driver_list):
+    """Order the drivers to pull an image from by looking it up in all.
+
+    The lookups run concurrently. The first driver, in list order, which
+    confirms having the image is returned first without waiting for the
+    next lookups, followed by the drivers whose lookup failed and the
+    drivers which were not waited for. The drivers which confirmed not
+    having the image are left out.
+    """
+    lookups = [(driver, eventlet.spawn(_lookup_image, context, repo, tag,
+                                       driver))
+               for driver in image_driver_list]
+    unknown = []
+    for i, (driver, lookup) in enumerate(lookups):
+        found = lookup.wait()
+        if found:
+            for _driver, pending in lookups[i + 1:]:
+                pending.kill()
+            return [driver] + unknown + [d for d, _l in lookups[i + 1:]]
+        if found is None:
+            unknown.append(driver)
+    return unknown
+
+
+def _pull_image(context, repo, tag, image_pull_policy, image_driver):
     if image_driver:
         image_driver_list = [image_driver.lower()]
     else:
         image_driver_list = CONF.image_driver_list
+    if (CONF.image_pull_hedging and len(image_driver_list) > 1 and
+            image_pull_policy != 'never'):
+        image_driver_list = _order_by_lookup(context, repo, tag,
+                                             image_driver_list)
 
+    image = None
     for driver in image_driver_list:
         try:
-            image_driver = load_image_driver(driver)
-            image, image_loaded = image_driver.pull_image(
-                context, repo, tag, image_pull_policy)
+            image_driver = get_image_driver(driver)
+            with _record_call(driver, 'pull_image'):
+                image, image_loaded = image_driver.pull_image(
+                    context, repo, tag, image_pull_policy)
             if image:
                 image['driver'] = driver.split('.')[0]
                 break
@@ -83,23 +346,38 @@ def pull_image(context, repo, tag, image_pull_policy='always',
     return image, image_loaded
 
 
+def _search_in_driver(context, repo, tag, exact_match, driver):
+    try:
+        return _call_with_deadline(driver, 'search_image',
+                                   get_image_driver(driver).search_image,
+                                   context, repo, tag, exact_match)
+    except Exception as e:
+        LOG.exception('Unknown exception occurred while searching '
+                      'for image: %s', six.text_type(e))
+        raise exception.ZunException(six.text_type(e))
+
+
 def search_image(context, image_name, image_driver, image_tag, exact_match):
-    images = []
+    """Search an image in the image drivers concurrently."""
     repo, tag = image_name, image_tag
     if image_driver:
         image_driver_list = [image_driver.lower()]
     else:
         image_driver_list = CONF.image_driver_list
-    for driver in image_driver_list:
-        try:
-            image_driver = load_image_driver(driver)
-            imgs = image_driver.search_image(context, repo, tag,
-                                             exact_match)
-            images.extend(imgs)
-        except Exception as e:
-            LOG.exception('Unknown exception occurred while searching '
-                          'for image: %s', six.text_type(e))
-            raise exception.ZunException(six.text_type(e))
+    if len(image_driver_list) == 1:
+        return list(_search_in_driver(context, repo, tag, exact_match,
+                                      image_driver_list[0]))
+
+    searches = [eventlet.spawn(_search_in_driver, context, repo, tag,
+                               exact_match, driver)
+                for driver in image_driver_list]
+    images = []
+    try:
+        for search in searches:
+            images.extend(search.wait())
+    finally:
+        for search in searches:
+            search.kill()
     return images
 
 
@@ -141,10 +419,20 @@ class ContainerImageDriver(object):
         """Pull an image."""
         raise NotImplementedError()
 
+    def acquire_image(self, image):
+        """Keep the files of a pulled image for one more user."""
+
+    def release_image(self, image):
+        """Release the files of a pulled image once it is loaded."""
+
     def search_image(self, context, repo, tag, exact_match):
         """Search an image."""
         raise NotImplementedError()
 
+    def has_image(self, context, repo, tag):
+        """Check whether an image can be pulled with this driver."""
+        return bool(self.search_image(context, repo, tag, True))
+
     def create_image(self, context, image_name):
         """Create an image."""
         raise NotImplementedError()
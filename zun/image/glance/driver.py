@@ -11,7 +11,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import hashlib
+from docker import errors
 import os
 import six
 
@@ -22,7 +22,9 @@ from zun.common import exception
 from zun.common.i18n import _
 from zun.common import utils as common_utils
 import zun.conf
+from zun.container.docker import utils as docker_utils
 from zun.image import driver
+from zun.image.glance import image_cache
 from zun.image.glance import utils
 
 CONF = zun.conf.CONF
@@ -30,10 +32,20 @@ CONF = zun.conf.CONF
 LOG = logging.getLogger(__name__)
 
 
+def _image_checksum(image_meta):
+    """Return the hash algorithm and the checksum to verify an image."""
+    algorithm = CONF.glance.image_checksum_algorithm
+    if (algorithm != 'md5' and
+            getattr(image_meta, 'os_hash_algo', None) == algorithm):
+        return algorithm, image_meta.os_hash_value
+    return 'md5', image_meta.checksum
+
+
 class GlanceDriver(driver.ContainerImageDriver):
 
     def __init__(self):
         super(GlanceDriver, self).__init__()
+        self.image_cache = image_cache.ImageCacheManager()
 
     def _search_image_on_host(self, context, repo, tag):
         LOG.debug('Searching for image %s:%s locally', repo, tag)
@@ -48,31 +60,58 @@ class GlanceDriver(driver.ContainerImageDriver):
             out_path = os.path.join(images_directory,
                                     image_meta.id + '.tar')
             if os.path.isfile(out_path):
-                return {
+                # Keep the image until the caller releases it.
+                self.image_cache.acquire(image_meta.id)
+                self.image_cache.touch(image_meta.id, repo, tag)
+                algorithm, checksum = _image_checksum(image_meta)
+                image = {
                     'image': repo,
                     'path': out_path,
-                    'checksum': image_meta.checksum}
+                    'id': image_meta.id,
+                    'checksum_algorithm': algorithm,
+                    'checksum': checksum}
+                cached = self.image_cache.get(image_meta.id)
+                if cached and cached.get('manifest_repo_tag'):
+                    image['manifest_repo_tag'] = cached['manifest_repo_tag']
+                return image
             else:
+                return self._search_loaded_image(repo, image_meta.id)
+
+    def _search_loaded_image(self, repo, image_id):
+        """Find an image loaded into docker without keeping its tarball."""
+        loaded = self.image_cache.get_loaded(image_id)
+        if not loaded:
+            return None
+        name = '%s:%s' % tuple(loaded['manifest_repo_tag'])
+        with docker_utils.docker_client() as docker:
+            try:
+                docker_image = docker.inspect_image(name)
+            except errors.NotFound:
+                LOG.debug('Image %s is no longer loaded in docker', name)
+                self.image_cache.remove_loaded(image_id)
                 return None
+        if docker_image['Id'] != loaded['docker_image_id']:
+            # The tag was moved to another image meanwhile.
+            LOG.debug('Image %s was replaced in docker', name)
+            self.image_cache.remove_loaded(image_id)
+            return None
+        return {'image': repo, 'path': None,
+                'manifest_repo_tag': loaded['manifest_repo_tag']}
 
     def pull_image(self, context, repo, tag, image_pull_policy):
         # TODO(shubhams): glance driver does not handle tags
         #              once metadata is stored in db then handle tags
         image_loaded = False
         image = self._search_image_on_host(context, repo, tag)
+        if image and not image['path']:
+            # The image was verified when it was loaded into docker.
+            LOG.debug('Image %s already loaded in docker', repo)
+            image_loaded = True
+            return image, image_loaded
         if image:
-            image_path = image['path']
-            image_checksum = image['checksum']
-            md5sum = hashlib.md5()
-            with open(image_path, 'rb') as fd:
-                while True:
-                    # read 10MB of data each time
-                    data = fd.read(10 * 1024 * 1024)
-                    if not data:
-                        break
-                    md5sum.update(data)
-            md5sum = md5sum.hexdigest()
-            if md5sum == image_checksum:
+            if self.image_cache.verify(image['id'],
+                                       image['checksum_algorithm'],
+                                       image['checksum']):
                 image_loaded = True
                 return image, image_loaded
 
@@ -85,6 +124,9 @@ class GlanceDriver(driver.ContainerImageDriver):
                 message = _('Image %s not present with pull policy of Never'
                             ) % repo
                 raise exception.ImageNotFound(message)
+        if image:
+            # The cached image is downloaded again.
+            self.release_image(image)
 
         LOG.debug('Pulling image from glance %s', repo)
         try:
@@ -98,19 +140,117 @@ class GlanceDriver(driver.ContainerImageDriver):
         except Exception as e:
             msg = _('Cannot download image from glance: {0}')
             raise exception.ZunException(msg.format(e))
+        algorithm, expected_checksum = _image_checksum(image_meta)
+        if CONF.glance.direct_load:
+            return self._load_image_directly(
+                repo, tag, image_meta, image_chunks, algorithm,
+                expected_checksum)
         try:
             images_directory = CONF.glance.images_directory
             fileutils.ensure_tree(images_directory)
             out_path = os.path.join(images_directory, image_meta.id + '.tar')
-            with open(out_path, 'wb') as fd:
-                for chunk in image_chunks:
-                    fd.write(chunk)
+            checksum, repo_tag = utils.write_image(
+                image_chunks, out_path, algorithm, expected_checksum)
+        except exception.ImageChecksumMismatch:
+            raise
         except Exception as e:
             msg = _('Error occurred while writing image: {0}')
             raise exception.ZunException(msg.format(e))
         LOG.debug('Image %(repo)s was downloaded to path : %(path)s',
                   {'repo': repo, 'path': out_path})
-        return {'image': repo, 'path': out_path}, image_loaded
+        self.image_cache.acquire(image_meta.id)
+        self.image_cache.add(image_meta.id, repo, tag,
+                             manifest_repo_tag=repo_tag)
+        self.image_cache.set_checksum(image_meta.id, algorithm, checksum)
+        image = {'image': repo, 'path': out_path, 'id': image_meta.id}
+        if repo_tag:
+            image['manifest_repo_tag'] = repo_tag
+        return image, image_loaded
+
+    def _should_keep_image(self, image_meta):
+        if not CONF.glance.direct_load_keep_images:
+            return False
+        max_size = CONF.glance.image_cache_max_size * 1024 * 1024
+        return not max_size or (image_meta.size or 0) <= max_size
+
+    def _load_image_directly(self, repo, tag, image_meta, image_chunks,
+                             algorithm, expected_checksum):
+        """Stream an image from glance into docker load.
+
+        The image is also written to the images directory when the image
+        cache can keep it.
+        """
+        out_path = None
+        if self._should_keep_image(image_meta):
+            images_directory = CONF.glance.images_directory
+            fileutils.ensure_tree(images_directory)
+            out_path = os.path.join(images_directory, image_meta.id + '.tar')
+        LOG.debug('Loading image %s from glance into docker', repo)
+        try:
+            with docker_utils.docker_client() as docker:
+                checksum, repo_tag = utils.load_image_stream(
+                    image_chunks, docker.load_image, out_path, algorithm,
+                    expected_checksum, CONF.glance.direct_load_buffer_chunks)
+        except exception.ImageChecksumMismatch as e:
+            # Do not leave the unverified image for a later pull to use.
+            if e.kwargs.get('repo_tag'):
+                self._remove_loaded_image(e.kwargs['repo_tag'])
+            raise
+        except exception.DockerError:
+            raise
+        except Exception as e:
+            msg = _('Error occurred while loading image: {0}')
+            raise exception.ZunException(msg.format(e))
+        if not repo_tag and not out_path:
+            # Without a tarball, the manifest is the only place to find
+            # the repository and tag the image was loaded as.
+            raise exception.ZunException(
+                _('Cannot find the repository and tag of image %s in its '
+                  'manifest') % repo)
+        image = {'image': repo, 'path': out_path}
+        if out_path:
+            self.image_cache.acquire(image_meta.id)
+            self.image_cache.add(image_meta.id, repo, tag,
+                                 manifest_repo_tag=repo_tag)
+            self.image_cache.set_checksum(image_meta.id, algorithm, checksum)
+            image['id'] = image_meta.id
+        else:
+            self._record_loaded_image(image_meta.id, repo_tag)
+        if repo_tag:
+            image['manifest_repo_tag'] = repo_tag
+        return image, True
+
+    def _record_loaded_image(self, image_id, repo_tag):
+        """Remember an image loaded without a tarball for the next pulls."""
+        image = '%s:%s' % tuple(repo_tag)
+        try:
+            with docker_utils.docker_client() as docker:
+                docker_image = docker.inspect_image(image)
+        except Exception as e:
+            LOG.warning('Failed to inspect the loaded image %(image)s: '
+                        '%(error)s', {'image': image, 'error': e})
+            return
+        self.image_cache.add_loaded(image_id, repo_tag,
+                                    docker_image['Id'])
+
+    def _remove_loaded_image(self, repo_tag):
+        image = '%s:%s' % tuple(repo_tag)
+        LOG.warning('Removing image %s loaded with a mismatched checksum',
+                    image)
+        try:
+            with docker_utils.docker_client() as docker:
+                docker.remove_image(image, force=True)
+        except Exception as e:
+            LOG.warning('Failed to remove image %(image)s: %(error)s',
+                        {'image': image, 'error': e})
+
+    def acquire_image(self, image):
+        if image.get('id'):
+            self.image_cache.acquire(image['id'])
+
+    def release_image(self, image):
+        if image.get('id'):
+            self.image_cache.release(image['id'])
 
     def search_image(self, context, repo, tag, exact_match):
         # TODO(mkrai): glance driver does not handle tags
@@ -0,0 +1,398 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Manages the glance image tarballs cached in the images directory.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_utils import fileutils
+import six
+
+from zun.common import singleton
+import zun.conf
+
+CONF = zun.conf.CONF
+LOG = logging.getLogger(__name__)
+
+INDEX_FILE = '.image_cache_index.json'
+IMAGE_SUFFIX = '.tar'
+CHUNK_SIZE = 10 * 1024 * 1024
+
+
+def _image_path(directory, image_id):
+    return os.path.join(directory, image_id + IMAGE_SUFFIX)
+
+
+def _image_key(repo, tag):
+    """Return a hashable key of an image.
+
+    The tag of a container is a list, the tag parsed from an image name is
+    a string.
+    """
+    if tag is None:
+        return repo, None
+    if isinstance(tag, six.string_types):
+        return repo, (tag,)
+    return repo, tuple(tag)
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime, stat.st_ino]
+
+
+def compute_checksum(path, algorithm='md5'):
+    hasher = hashlib.new(algorithm)
+    with open(path, 'rb') as fd:
+        while True:
+            data = fd.read(CHUNK_SIZE)
+            if not data:
+                break
+            hasher.update(data)
+            # Let the other green threads run between two chunks.
+            time.sleep(0)
+    return hasher.hexdigest()
+
+
+@six.add_metaclass(singleton.Singleton)
+class ImageCacheManager(object):
+    """LRU cache of the glance image tarballs downloaded on this host.
+
+    Every cached image has an entry in an index persisted next to the
+    tarballs, recording its size, the time it was downloaded and the time
+    it was last used. The images directory is only scanned when there is no
+    usable index. Images used by the containers of this host are pinned and
+    never evicted, as are the images acquired until they are loaded.
+
+    The index also records the checksum of the images which were verified,
+    along with their size, modification time and inode, so that an image
+    is only hashed again when its file changed.
+
+    The images loaded directly into docker without keeping their tarball
+    are only remembered by this process, along with the docker image they
+    were loaded as.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._directory = None
+        self._entries = {}
+        self._in_use = set()
+        self._acquired = {}
+        self._loaded = {}
+        self._verify_stats = {'hashed': 0, 'skipped': 0, 'corrupted': 0}
+
+    def _load(self):
+        directory = CONF.glance.images_directory
+        if directory == self._directory:
+            return
+        self._directory = directory
+        self._entries = {}
+        index_path = os.path.join(directory, INDEX_FILE)
+        try:
+            with open(index_path, 'rb') as fd:
+                self._entries = jsonutils.load(fd)
+            return
+        except (IOError, OSError):
+            pass
+        except ValueError:
+            LOG.warning('Ignoring the corrupted image cache index %s',
+                        index_path)
+
+        if not os.path.isdir(directory):
+            return
+        LOG.info('Building the image cache index of %s', directory)
+        for filename in os.listdir(directory):
+            if not filename.endswith(IMAGE_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(directory, filename))
+            except OSError:
+                continue
+            self._entries[filename[:-len(IMAGE_SUFFIX)]] = {
+                'size': stat.st_size,
+                'created_at': stat.st_mtime,
+                'last_used': stat.st_mtime,
+                'repo': None,
+                'tag': None}
+        self._save()
+
+    def _save(self):
+        fileutils.ensure_tree(self._directory)
+        index_path = os.path.join(self._directory, INDEX_FILE)
+        tmp_path = index_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as fd:
+                jsonutils.dump(self._entries, fd)
+            os.rename(tmp_path, index_path)
+        except (IOError, OSError) as e:
+            LOG.warning('Failed to save the image cache index %(path)s: '
+                        '%(error)s', {'path': index_path,
+                                      'error': six.text_type(e)})
+
+    def _is_pinned(self, entry):
+        return _image_key(entry.get('repo'), entry.get('tag')) in self._in_use
+
+    def _remove(self, image_id):
+        self._entries.pop(image_id, None)
+        try:
+            os.remove(_image_path(self._directory, image_id))
+        except OSError as e:
+            if os.path.exists(_image_path(self._directory, image_id)):
+                LOG.warning('Failed to remove the cached image %(image)s: '
+                            '%(error)s', {'image': image_id,
+                                          'error': six.text_type(e)})
+
+    def get(self, image_id):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(image_id)
+            return dict(entry) if entry else None
+
+    def add(self, image_id, repo=None, tag=None, manifest_repo_tag=None):
+        """Index a downloaded image then enforce the cache quotas.
+
+        :param manifest_repo_tag: the [repo, tag] found in the manifest of
+                                  the image tarball.
+        """
+        with self._lock:
+            self._load()
+            try:
+                size = os.path.getsize(_image_path(self._directory, image_id))
+            except OSError:
+                LOG.warning('Image %s is not in the images directory',
+                            image_id)
+                return
+            now = time.time()
+            self._entries[image_id] = {'size': size,
+                                       'created_at': now,
+                                       'last_used': now,
+                                       'repo': repo,
+                                       'tag': tag}
+            if manifest_repo_tag:
+                self._entries[image_id]['manifest_repo_tag'] = list(
+                    manifest_repo_tag)
+            self._evict(keep=image_id)
+            self._save()
+
+    def touch(self, image_id, repo=None, tag=None):
+        """Record that a cached image was used."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(image_id)
+            if entry is None:
+                self.add(image_id, repo=repo, tag=tag)
+                return
+            entry['last_used'] = time.time()
+            if repo is not None:
+                entry['repo'], entry['tag'] = repo, tag
+            self._save()
+
+    def remove(self, image_id):
+        with self._lock:
+            self._load()
+            self._remove(image_id)
+            self._save()
+
+    def verify(self, image_id, algorithm, checksum):
+        """Check that a cached image matches the expected checksum.
+
+        The image is hashed outside of the lock, only when it has no
+        verified checksum recorded for its current file.
+        """
+        with self._lock:
+            self._load()
+            path = _image_path(self._directory, image_id)
+            entry = self._entries.get(image_id)
+            verified = entry.get('verified') if entry else None
+        try:
+            stat_key = _stat_key(path)
+        except OSError:
+            return False
+        if (verified and verified['stat'] == stat_key and
+                verified['algorithm'] == algorithm):
+            with self._lock:
+                self._verify_stats['skipped'] += 1
+            return verified['checksum'] == checksum
+
+        LOG.debug('Computing the %(algorithm)s checksum of image %(image)s',
+                  {'algorithm': algorithm, 'image': image_id})
+        actual = compute_checksum(path, algorithm)
+        with self._lock:
+            self._verify_stats['hashed'] += 1
+            self._record_checksum(image_id, path, algorithm, actual,
+                                  stat_key)
+        return actual == checksum
+
+    def set_checksum(self, image_id, algorithm, checksum):
+        """Record the checksum of an image which was just written."""
+        with self._lock:
+            self._load()
+            path = _image_path(self._directory, image_id)
+            try:
+                stat_key = _stat_key(path)
+            except OSError:
+                return
+            self._record_checksum(image_id, path, algorithm, checksum,
+                                  stat_key)
+
+    def _record_checksum(self, image_id, path, algorithm, checksum,
+                         stat_key):
+        entry = self._entries.get(image_id)
+        try:
+            # Do not record a checksum computed on a file which was
+            # replaced meanwhile.
+            if entry is None or _stat_key(path) != stat_key:
+                return
+        except OSError:
+            return
+        entry['verified'] = {'algorithm': algorithm,
+                             'checksum': checksum,
+                             'stat': stat_key}
+        self._save()
+
+    def scrub(self):
+        """Re-hash the verified images and remove the corrupted ones."""
+        with self._lock:
+            self._load()
+            directory = self._directory
+            verified = {image_id: dict(entry['verified'])
+                        for image_id, entry in self._entries.items()
+                        if entry.get('verified')}
+        corrupted = []
+        for image_id, record in verified.items():
+            path = _image_path(directory, image_id)
+            try:
+                if _stat_key(path) != record['stat']:
+                    # Changed since verified, the next use verifies it.
+                    continue
+                actual = compute_checksum(path, record['algorithm'])
+            except (IOError, OSError):
+                continue
+            if actual != record['checksum']:
+                corrupted.append(image_id)
+
+        if corrupted:
+            LOG.warning('Removing the corrupted cached images %s',
+                        ', '.join(corrupted))
+            with self._lock:
+                self._verify_stats['corrupted'] += len(corrupted)
+                for image_id in corrupted:
+                    # Skip the images downloaded again meanwhile.
+                    entry = self._entries.get(image_id)
+                    if entry and entry.get('verified') == verified[image_id]:
+                        self._remove(image_id)
+                self._save()
+        return corrupted
+
+    def set_in_use(self, images):
+        """Pin the images used by containers.
+
+        :param images: an iterable of (repo, tag) pairs, the tag being a
+                       string or a list of strings.
+        """
+        with self._lock:
+            self._in_use = set(_image_key(repo, tag) for repo, tag in images)
+
+    def add_loaded(self, image_id, manifest_repo_tag, docker_image_id):
+        """Record an image loaded into docker without a cached tarball."""
+        with self._lock:
+            self._loaded[image_id] = {
+                'manifest_repo_tag': list(manifest_repo_tag),
+                'docker_image_id': docker_image_id}
+
+    def get_loaded(self, image_id):
+        with self._lock:
+            loaded = self._loaded.get(image_id)
+            return dict(loaded) if loaded else None
+
+    def remove_loaded(self, image_id):
+        with self._lock:
+            self._loaded.pop(image_id, None)
+
+    def acquire(self, image_id):
+        """Protect a cached image from eviction until it is released."""
+        with self._lock:
+            self._acquired[image_id] = self._acquired.get(image_id, 0) + 1
+
+    def release(self, image_id):
+        """Release an image acquired with acquire()."""
+        with self._lock:
+            count = self._acquired.get(image_id, 0) - 1
+            if count > 0:
+                self._acquired[image_id] = count
+            else:
+                self._acquired.pop(image_id, None)
+
+    def _evict(self, keep=None):
+        max_age = CONF.glance.image_cache_max_age
+        max_size = CONF.glance.image_cache_max_size * 1024 * 1024
+        now = time.time()
+        evicted = []
+        candidates = sorted(
+            (entry['last_used'], image_id)
+            for image_id, entry in self._entries.items()
+            if (image_id != keep and image_id not in self._acquired and
+                not self._is_pinned(entry)))
+
+        if max_age:
+            for last_used, image_id in list(candidates):
+                if now - last_used > max_age:
+                    self._remove(image_id)
+                    evicted.append(image_id)
+                    candidates.remove((last_used, image_id))
+
+        if max_size:
+            total = sum(entry['size'] for entry in self._entries.values())
+            for last_used, image_id in candidates:
+                if total <= max_size:
+                    break
+                total -= self._entries[image_id]['size']
+                self._remove(image_id)
+                evicted.append(image_id)
+            if total > max_size:
+                LOG.warning('The images in use exceed the image cache '
+                            'size of %d MB', CONF.glance.image_cache_max_size)
+
+        if evicted:
+            LOG.info('Evicted the cached images %s', ', '.join(evicted))
+        return evicted
+
+    def evict(self):
+        """Remove the least recently used images exceeding the quotas."""
+        with self._lock:
+            self._load()
+            for image_id in list(self._entries):
+                if not os.path.exists(_image_path(self._directory, image_id)):
+                    del self._entries[image_id]
+            evicted = self._evict()
+            self._save()
+            return evicted
+
+    def get_stats(self):
+        with self._lock:
+            self._load()
+            return {
+                'images': len(self._entries),
+                'size': sum(e['size'] for e in self._entries.values()),
+                'pinned': len([e for e in self._entries.values()
+                               if self._is_pinned(e)]),
+                'verify': dict(self._verify_stats),
+            }
@@ -0,0 +1,111 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Caches the metadata of the glance images looked up by the image driver.
+"""
+
+import threading
+import time
+
+import six
+
+from zun.common import singleton
+import zun.conf
+
+CONF = zun.conf.CONF
+
+# Lookups cached per scope.
+BY_ID = 'id'
+BY_NAME = 'name'
+ALL = 'all'
+
+MAX_ENTRIES = 4096
+
+
+@six.add_metaclass(singleton.Singleton)
+class ImageMetadataCache(object):
+    """TTL cache of glance image lookups.
+
+    The lookups are cached per scope, the project and role of the request,
+    since glance images can be private to a project. Images are indexed by
+    id and by name, the list of all the docker images of a scope is cached
+    for substring searches. Lookups which found no image are cached too,
+    for a shorter time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._stats = {'hits': 0, 'misses': 0, 'negative_hits': 0}
+
+    @staticmethod
+    def scope(context):
+        return (getattr(context, 'project_id', None),
+                bool(getattr(context, 'is_admin', False)))
+
+    def get(self, scope, kind, key=None):
+        """Return whether the lookup is cached and its cached result."""
+        with self._lock:
+            entry = self._entries.get((scope, kind, key))
+            if entry is None or entry[0] < time.time():
+                self._stats['misses'] += 1
+                return False, None
+            self._stats['hits'] += 1
+            if not entry[1]:
+                self._stats['negative_hits'] += 1
+            return True, entry[1]
+
+    def set(self, scope, kind, key, value):
+        ttl = CONF.glance.image_metadata_cache_ttl
+        if not value:
+            ttl = min(ttl, CONF.glance.image_metadata_negative_cache_ttl)
+        if ttl <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            if len(self._entries) >= MAX_ENTRIES:
+                self._purge(now)
+            self._entries[(scope, kind, key)] = (now + ttl, value)
+            if kind != BY_ID and value:
+                for image in value:
+                    self._entries[(scope, BY_ID, image.id)] = (now + ttl,
+                                                               image)
+
+    def _purge(self, now):
+        for key, entry in list(self._entries.items()):
+            if entry[0] < now:
+                del self._entries[key]
+        if len(self._entries) >= MAX_ENTRIES:
+            oldest = sorted(self._entries,
+                            key=lambda k: self._entries[k][0])
+            for key in oldest[:len(oldest) // 2]:
+                del self._entries[key]
+
+    def invalidate(self, scope=None):
+        """Drop the cached lookups of a scope, or of every scope."""
+        with self._lock:
+            if scope is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == scope]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats = {'hits': 0, 'misses': 0, 'negative_hits': 0}
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
@@ -13,25 +13,60 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import hashlib
+import os
+import sys
+import tarfile
+import tempfile
+import threading
+
+import eventlet
+from eventlet import queue
 from glanceclient.common import exceptions as glance_exceptions
+from oslo_serialization import jsonutils
 from oslo_utils import uuidutils
+import six
 
 from zun.common import clients
 from zun.common import exception
+from zun.image.glance import metadata_cache
 
 from oslo_log import log as logging
 
 LOG = logging.getLogger(__name__)
 
+# Size of the reads done by the tar parser of the image stream.
+TAR_BUFFER_SIZE = 1024 * 1024
+
+
+# The glance clients of the recent requests, by token and project.
+_glance_clients = collections.OrderedDict()
+_glance_clients_lock = threading.Lock()
+GLANCE_CLIENT_CACHE_SIZE = 32
+
 
 def create_glanceclient(context):
     """Creates glance client object.
 
+        The client is reused by the requests having the same credentials.
+
         :param context: context to create client object
         :returns: Glance client object
     """
+    key = (context.auth_token, context.project_id, context.user_id)
+    with _glance_clients_lock:
+        glance = _glance_clients.pop(key, None)
+        if glance is not None:
+            _glance_clients[key] = glance
+            return glance
     osc = clients.OpenStackClients(context)
-    return osc.glance()
+    glance = osc.glance()
+    with _glance_clients_lock:
+        _glance_clients[key] = glance
+        while len(_glance_clients) > GLANCE_CLIENT_CACHE_SIZE:
+            _glance_clients.popitem(last=False)
+    return glance
 
 
 def find_image(context, image_ident, image_tag):
@@ -61,47 +96,75 @@ def find_image(context, image_ident, image_tag):
     return match[0]
 
 
-def find_images(context, image_ident, exact_match):
+def _get_image(context, image_id):
     glance = create_glanceclient(context)
+    try:
+        image = glance.images.get(image_id)
+    except glance_exceptions.NotFound:
+        return None
+    return image if image.container_format == 'docker' else None
+
+
+def find_images(context, image_ident, exact_match):
+    cache = metadata_cache.ImageMetadataCache()
+    scope = cache.scope(context)
     if uuidutils.is_uuid_like(image_ident):
-        images = []
-        try:
-            image = glance.images.get(image_ident)
-            if image.container_format == 'docker':
-                images.append(image)
-        except glance_exceptions.NotFound:
-            # ignore exception
-            pass
-    else:
+        cached, image = cache.get(scope, metadata_cache.BY_ID, image_ident)
+        if not cached:
+            image = _get_image(context, image_ident)
+            cache.set(scope, metadata_cache.BY_ID, image_ident, image)
+        return [image] if image else []
+
+    if exact_match:
+        cached, images = cache.get(scope, metadata_cache.BY_NAME,
+                                   image_ident)
+        if not cached:
+            glance = create_glanceclient(context)
+            filters = {'container_format': 'docker', 'name': image_ident}
+            images = [i for i in glance.images.list(filters=filters)
+                      if i.name == image_ident]
+            cache.set(scope, metadata_cache.BY_NAME, image_ident, images)
+        return list(images or [])
+
+    cached, images = cache.get(scope, metadata_cache.ALL)
+    if not cached:
+        glance = create_glanceclient(context)
         filters = {'container_format': 'docker'}
         images = list(glance.images.list(filters=filters))
-        if exact_match:
-            images = [i for i in images if i.name == image_ident]
-        else:
-            images = [i for i in images if image_ident in i.name]
+        cache.set(scope, metadata_cache.ALL, None, images)
+    return [i for i in images or [] if image_ident in (i.name or '')]
+
 
-    return images
+def _invalidate_metadata():
+    # The images of other projects are affected too if they are shared.
+    metadata_cache.ImageMetadataCache().invalidate()
 
 
 def create_image(context, image_name):
     """Create an image."""
     glance = create_glanceclient(context)
-    return glance.images.create(name=image_name)
+    image = glance.images.create(name=image_name)
+    _invalidate_metadata()
+    return image
 
 
 def update_image(context, img_id, disk_format,
                  container_format, tags):
     """Update an image (container format, disk format & tags)"""
     glance = create_glanceclient(context)
-    return glance.images.update(img_id, disk_format=disk_format,
-                                container_format=container_format, tags=tags)
+    image = glance.images.update(img_id, disk_format=disk_format,
+                                 container_format=container_format, tags=tags)
+    _invalidate_metadata()
+    return image
 
 
 def upload_image_data(context, img_id, data):
     """Upload an image."""
     LOG.debug('Upload image %s ', img_id)
     glance = create_glanceclient(context)
-    return glance.images.upload(img_id, data)
+    result = glance.images.upload(img_id, data)
+    _invalidate_metadata()
+    return result
 
 
 def download_image_in_chunks(context, img_id):
@@ -109,3 +172,201 @@ def download_image_in_chunks(context, img_id):
     LOG.debug('Download image %s', img_id)
     glance = create_glanceclient(context)
     return glance.images.data(img_id)
+
+
+class _ChunkReader(object):
+    """File-like object reading image chunks.
+
+    Every chunk is passed to the given sinks, e.g. written to a file and
+    hashed, as it is consumed, so that the image data can be parsed while
+    it is downloaded.
+    """
+
+    def __init__(self, chunks, sinks):
+        self._chunks = iter(chunks)
+        self._sinks = sinks
+        self._buffer = bytearray()
+
+    def _next_chunk(self):
+        for chunk in self._chunks:
+            if chunk:
+                for sink in self._sinks:
+                    sink(chunk)
+                return chunk
+        return b''
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._buffer.extend(chunk)
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def drain(self):
+        self._buffer = bytearray()
+        while self._next_chunk():
+            pass
+
+
+def _parse_manifest(data):
+    try:
+        repo_tag = jsonutils.loads(data)[0]['RepoTags'][0]
+    except (ValueError, LookupError, TypeError):
+        return None
+    repo, sep, tag = repo_tag.rpartition(':')
+    if not sep or '/' in tag:
+        return None
+    return [repo, tag]
+
+
+def _read_manifest_repo_tag(reader):
+    try:
+        with tarfile.open(fileobj=reader, mode='r|',
+                          bufsize=TAR_BUFFER_SIZE) as tar:
+            for member in tar:
+                if member.name == 'manifest.json':
+                    return _parse_manifest(tar.extractfile(member).read())
+    except tarfile.TarError as e:
+        LOG.warning('Cannot read the image tarball: %s', e)
+    return None
+
+
+def write_image(image_chunks, path, algorithm='md5', checksum=None):
+    """Write downloaded image data to a file in a single pass.
+
+    The data is written to a temporary file, hashed and parsed for the
+    RepoTags of its manifest as it streams in. The temporary file is
+    renamed to path once the whole image is written and matches the
+    expected checksum, if any.
+
+    :returns: the checksum of the image and its [repo, tag] as found in
+              its manifest, or None if the manifest could not be read.
+    """
+    hasher = hashlib.new(algorithm)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as image_file:
+            reader = _ChunkReader(image_chunks,
+                                  [image_file.write, hasher.update])
+            repo_tag = _read_manifest_repo_tag(reader)
+            reader.drain()
+        actual = hasher.hexdigest()
+        if checksum and actual != checksum:
+            raise exception.ImageChecksumMismatch(
+                image=os.path.basename(path), algorithm=algorithm)
+        os.rename(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return actual, repo_tag
+
+
+class _Cancelled(Exception):
+    pass
+
+
+_END = object()
+
+
+def load_image_stream(image_chunks, load, path=None, algorithm='md5',
+                      checksum=None, buffer_chunks=16):
+    """Feed downloaded image data into a load call as it streams in.
+
+    A green thread reads the image chunks, hashes them, parses the manifest
+    and, if path is set, writes them to a temporary file renamed to path
+    once complete. The chunks are handed to load through a queue holding at
+    most buffer_chunks chunks.
+
+    :param load: a callable consuming an iterable of chunks.
+    :returns: the checksum of the image and its [repo, tag] as found in
+              its manifest, or None if the manifest could not be read.
+    :raises ImageChecksumMismatch: once the image is loaded, if it does not
+              match checksum. The exception carries the [repo, tag] of the
+              loaded image as its repo_tag keyword argument.
+    """
+    buffer = queue.LightQueue(maxsize=buffer_chunks)
+    hasher = hashlib.new(algorithm)
+    cancelled = []
+    errors = []
+    image_file = tmp_path = None
+    if path:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                        prefix='.', suffix='.part')
+        image_file = os.fdopen(fd, 'wb')
+
+    def put(chunk):
+        if cancelled:
+            raise _Cancelled()
+        buffer.put(chunk)
+
+    def produce():
+        sinks = [hasher.update, put]
+        if image_file:
+            sinks.insert(0, image_file.write)
+        try:
+            reader = _ChunkReader(image_chunks, sinks)
+            repo_tag = _read_manifest_repo_tag(reader)
+            reader.drain()
+            return repo_tag
+        except _Cancelled:
+            return None
+        except Exception:
+            errors.append(sys.exc_info())
+            return None
+        finally:
+            if not cancelled:
+                buffer.put(_END)
+
+    def consume():
+        while True:
+            chunk = buffer.get()
+            if chunk is _END:
+                return
+            yield chunk
+
+    producer = eventlet.spawn(produce)
+    try:
+        load_error = None
+        try:
+            load(consume())
+        except Exception:
+            cancelled.append(True)
+            load_error = sys.exc_info()
+        # Unblock the producer if load stopped reading.
+        while not producer.dead:
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                eventlet.sleep(0)
+        if errors:
+            # A failed download is the cause of a failed load.
+            six.reraise(*errors[0])
+        if load_error:
+            six.reraise(*load_error)
+        repo_tag = producer.wait()
+        actual = hasher.hexdigest()
+        if checksum and actual != checksum:
+            raise exception.ImageChecksumMismatch(
+                image=os.path.basename(path or ''), algorithm=algorithm,
+                repo_tag=repo_tag)
+        if image_file:
+            image_file.close()
+            os.rename(tmp_path, path)
+    except Exception:
+        if image_file:
+            image_file.close()
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        raise
+    return actual, repo_tag
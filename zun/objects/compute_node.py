@@ -26,7 +26,8 @@ class ComputeNode(base.ZunPersistentObject, base.ZunObject):
     # Version 1.4: Add host operating system info
     # Version 1.5: Add host labels info
     # Version 1.6: Add mem_used to compute node
-    VERSION = '1.6'
+    # Version 1.7: Add image_digest
+    VERSION = '1.7'
 
     fields = {
         'uuid': fields.UUIDField(read_only=True, nullable=False),
@@ -47,6 +48,7 @@ class ComputeNode(base.ZunPersistentObject, base.ZunObject):
         'os': fields.StringField(nullable=True),
         'kernel_version': fields.StringField(nullable=True),
         'labels': fields.DictOfStringsField(nullable=True),
+        'image_digest': fields.StringField(nullable=True),
     }
 
     @staticmethod
@@ -40,7 +40,8 @@ class Container(base.ZunPersistentObject, base.ZunObject):
     # Version 1.18: Add auto_remove
     # Version 1.19: Add runtime column
     # Version 1.20: Add image_tag
-    VERSION = '1.20'
+    # Version 1.21: Add method 'bulk_save'
+    VERSION = '1.21'
 
     fields = {
         'id': fields.IntegerField(),
@@ -198,6 +199,27 @@ class Container(base.ZunPersistentObject, base.ZunObject):
 
         self.obj_reset_changes()
 
+    @base.remotable_classmethod
+    def bulk_save(cls, context, containers):
+        """Save the updates of several Containers at once.
+
+        The updates of all the containers are sent to the database together
+        instead of a call per container like save() does.
+
+        :param context: Security context.
+        :param containers: a list of :class:`Container` object.
+        """
+        updates = {}
+        for container in containers:
+            changes = container.obj_get_changes()
+            if changes:
+                updates[container.uuid] = changes
+        if updates:
+            dbapi.bulk_update_containers(context, updates)
+
+        for container in containers:
+            container.obj_reset_changes()
+
     @base.remotable
     def refresh(self, context=None):
         """Loads updates for this Container.
@@ -19,7 +19,8 @@ from zun.objects import base
 @base.ZunObjectRegistry.register
 class Image(base.ZunPersistentObject, base.ZunObject):
     # Version 1.0: Initial version
-    VERSION = '1.0'
+    # Version 1.1: Add warm_status field
+    VERSION = '1.1'
 
     fields = {
         'id': fields.IntegerField(),
@@ -30,6 +31,7 @@ class Image(base.ZunPersistentObject, base.ZunObject):
         'repo': fields.StringField(nullable=True),
         'tag': fields.StringField(nullable=True),
         'size': fields.StringField(nullable=True),
+        'warm_status': fields.DictOfStringsField(nullable=True),
     }
 
     @staticmethod
@@ -115,3 +117,14 @@ class Image(base.ZunPersistentObject, base.ZunObject):
         updates = self.obj_get_changes()
         dbapi.update_image(self.uuid, updates)
         self.obj_reset_changes()
+
+    @base.remotable
+    def update_warm_status(self, context, host, status):
+        """Set the pre-pull status of this image on a host.
+
+        :param context: Security context.
+        :param host: The host pre-pulling the image.
+        :param status: The pre-pull status of the image on the host.
+        """
+        db_image = dbapi.update_image_warm_status(self.uuid, host, status)
+        self._from_db_object(self, db_image)
@@ -14,15 +14,83 @@
 Filter support
 """
 
+import threading
+import time
+
 from oslo_log import log as logging
+import six
 
+from zun.common import singleton
+import zun.conf
 from zun.scheduler import loadables
 
+CONF = zun.conf.CONF
 LOG = logging.getLogger(__name__)
 
+# Number of hosts a filter has to have seen before its statistics are used
+# to order it.
+MIN_HOSTS_FOR_ORDERING = 100
+
+
+@six.add_metaclass(singleton.Singleton)
+class FilterStatistics(object):
+    """Process-wide timing and rejection counters of the filters.
+
+    Each scheduler process, e.g. each API worker, keeps its own counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, hosts_in, hosts_out, elapsed):
+        with self._lock:
+            stats = self._stats.setdefault(
+                name, {'calls': 0, 'hosts': 0, 'rejected': 0, 'time': 0.0})
+            stats['calls'] += 1
+            stats['hosts'] += hosts_in
+            stats['rejected'] += hosts_in - hosts_out
+            stats['time'] += elapsed
+
+    def rank(self, name):
+        """Return the expected time a filter spends per rejected host.
+
+        Filters which reject many hosts cheaply have the lowest rank. Filters
+        without enough statistics get a rank of 0, so that they run first
+        and get measured.
+        """
+        with self._lock:
+            stats = self._stats.get(name)
+            if not stats or stats['hosts'] < MIN_HOSTS_FOR_ORDERING:
+                return 0.0
+            if not stats['rejected']:
+                return float('inf')
+            return stats['time'] / stats['rejected']
+
+    def order(self, filters):
+        """Sort filters by rank, keeping the given order for equal ranks."""
+        return sorted(filters,
+                      key=lambda f: self.rank(f.__class__.__name__))
+
+    def get_stats(self):
+        with self._lock:
+            stats = {}
+            for name, s in self._stats.items():
+                stats[name] = dict(s)
+                stats[name]['selectivity'] = (
+                    float(s['rejected']) / s['hosts'] if s['hosts'] else 0.0)
+                stats[name]['cost_per_host'] = (
+                    s['time'] / s['hosts'] if s['hosts'] else 0.0)
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
 
 class BaseFilter(object):
     """Base class for all filter classes."""
+
     def _filter_one(self, obj, container, extra_spec):
         """Return True if it passes the filter, False otherwise."""
         return True
@@ -68,16 +136,22 @@ class BaseFilterHandler(loadables.BaseLoader):
         part_filter_results = []
         full_filter_results = []
         log_msg = "%(cls_name)s: (start: %(start)s, end: %(end)s)"
+        statistics = FilterStatistics()
+        if CONF.scheduler.adaptive_filter_ordering:
+            filters = statistics.order(filters)
         for filter_ in filters:
             if filter_.run_filter_for_index(index):
                 cls_name = filter_.__class__.__name__
                 start_count = len(list_objs)
+                start = time.time()
                 objs = filter_.filter_all(list_objs, container, extra_spec)
                 if objs is None:
                     LOG.debug("Filter %s says to stop filtering", cls_name)
                     return
                 list_objs = list(objs)
                 end_count = len(list_objs)
+                statistics.record(cls_name, start_count, end_count,
+                                  time.time() - start)
                 part_filter_results.append(log_msg % {"cls_name": cls_name,
                                                       "start": start_count,
                                                       "end": end_count})
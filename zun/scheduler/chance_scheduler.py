@@ -24,9 +24,8 @@ from zun.scheduler import driver
 class ChanceScheduler(driver.Scheduler):
     """Implements Scheduler as a random node selector."""
 
-    def _schedule(self, context):
+    def _schedule(self, hosts):
         """Picks a host that is up at random."""
-        hosts = self.hosts_up(context)
         if not hosts:
             msg = _("Is the appropriate service running?")
             raise exception.NoValidHost(reason=msg)
@@ -35,9 +34,10 @@ class ChanceScheduler(driver.Scheduler):
 
     def select_destinations(self, context, containers, extra_spec):
         """Selects random destinations."""
+        hosts = self.hosts_up(context)
         dests = []
         for container in containers:
-            host = self._schedule(context)
+            host = self._schedule(hosts)
             host_state = dict(host=host, nodename=None, limits=None)
             dests.append(host_state)
 
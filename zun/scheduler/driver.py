@@ -24,7 +24,6 @@ import abc
 import six
 
 from zun.api import servicegroup
-from zun import objects
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -34,13 +33,11 @@ class Scheduler(object):
     def __init__(self):
         self.servicegroup_api = servicegroup.ServiceGroup()
 
-    def hosts_up(self, context):
+    def hosts_up(self, context, use_cache=True):
         """Return the list of hosts that have a running service."""
 
-        services = objects.ZunService.list_by_binary(context, 'zun-compute')
-        return [service.host
-                for service in services
-                if self.servicegroup_api.service_is_up(service)]
+        return self.servicegroup_api.get_up_hosts(context, 'zun-compute',
+                                                  use_cache=use_cache)
 
     @abc.abstractmethod
     def select_destinations(self, context, containers, extra_spec):
@@ -13,20 +13,25 @@
 """
 The FilterScheduler is for scheduling container to a host according to
 your filters configured.
-You can customize this scheduler by specifying your own Host Filters.
+You can customize this scheduler by specifying your own Host Filters and
+Weighing Functions.
 """
 import random
 
+from oslo_log import log as logging
+from oslo_utils import excutils
+
 from zun.common import exception
 from zun.common.i18n import _
 import zun.conf
-from zun import objects
 from zun.scheduler import driver
 from zun.scheduler import filters
-from zun.scheduler.host_state import HostState
+from zun.scheduler import host_state as host_state_cache
+from zun.scheduler import weights
 
 
 CONF = zun.conf.CONF
+LOG = logging.getLogger(__name__)
 
 
 class FilterScheduler(driver.Scheduler):
@@ -40,13 +45,14 @@ class FilterScheduler(driver.Scheduler):
         self.filter_cls_map = {cls.__name__: cls for cls in filter_classes}
         self.filter_obj_map = {}
         self.enabled_filters = self._choose_host_filters(self._load_filters())
-
-    def _schedule(self, context, container, extra_spec):
-        """Picks a host according to filters."""
-        hosts = self.hosts_up(context)
-        nodes = objects.ComputeNode.list(context)
-        nodes = [node for node in nodes if node.hostname in hosts]
-        host_states = self.get_all_host_state(nodes)
+        self.weight_handler = weights.HostWeightHandler()
+        weigher_classes = self.weight_handler.get_matching_classes(
+            CONF.scheduler.weight_classes)
+        self.weighers = [cls() for cls in weigher_classes]
+        self.host_state_cache = host_state_cache.HostStateCache()
+
+    def _schedule(self, context, container, extra_spec, host_states):
+        """Picks the heaviest host among the hosts passing the filters."""
         hosts = self.filter_handler.get_filtered_objects(self.enabled_filters,
                                                          host_states,
                                                          container,
@@ -55,17 +61,39 @@ class FilterScheduler(driver.Scheduler):
             msg = _("Is the appropriate service running?")
             raise exception.NoValidHost(reason=msg)
 
-        return random.choice(hosts)
+        weighed_hosts = self.weight_handler.get_weighed_objects(
+            self.weighers, hosts, container, extra_spec,
+            count=CONF.scheduler.host_subset_size)
+        LOG.debug("Weighed %(hosts)s", {'hosts': weighed_hosts})
+        if len(weighed_hosts) == 1:
+            return weighed_hosts[0].obj
+        return random.choice(weighed_hosts).obj
 
     def select_destinations(self, context, containers, extra_spec):
-        """Selects destinations by filters."""
-        dests = []
-        for container in containers:
-            host = self._schedule(context, container, extra_spec)
-            host_state = dict(host=host.hostname, nodename=None,
-                              limits=host.limits)
-            dests.append(host_state)
+        """Selects destinations by filters.
 
+        All the containers of a request are placed against one snapshot of
+        the host states. The resources of each selected host are consumed in
+        place, so that the following containers of the request see them. If
+        a container of the request cannot be placed, the resources consumed
+        by the whole request are given back.
+        """
+        host_states = self.get_all_host_state(context)
+        selected = []
+        try:
+            for container in containers:
+                host = self._schedule(context, container, extra_spec,
+                                      host_states)
+                generation = self.host_state_cache.consume(host, container)
+                selected.append((host, container, generation))
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                for host, container, generation in selected:
+                    self.host_state_cache.release(host, container,
+                                                  generation)
+
+        dests = [dict(host=host.hostname, nodename=None, limits=host.limits)
+                 for host, container, generation in selected]
         if len(dests) < 1:
             reason = _('There are not enough hosts available.')
             raise exception.NoValidHost(reason=reason)
@@ -101,15 +129,6 @@ class FilterScheduler(driver.Scheduler):
     def _load_filters(self):
         return CONF.scheduler.enabled_filters
 
-    def get_all_host_state(self, nodes):
-        host_states = []
-        for node in nodes:
-            host_state = HostState(node.hostname)
-            host_state.mem_total = node.mem_total
-            host_state.mem_used = node.mem_used
-            host_state.cpus = node.cpus
-            host_state.cpu_used = node.cpu_used
-            host_state.numa_topology = node.numa_topology
-            host_state.labels = node.labels
-            host_states.append(host_state)
-        return host_states
+    def get_all_host_state(self, context):
+        hosts = self.hosts_up(context)
+        return self.host_state_cache.get_all_host_states(context, hosts)
@@ -10,6 +10,21 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+import threading
+import time
+
+from oslo_log import log as logging
+import six
+
+from zun.common import singleton
+import zun.conf
+from zun.image import digest
+from zun import objects
+
+CONF = zun.conf.CONF
+LOG = logging.getLogger(__name__)
+
 
 class HostState(object):
     """Mutable and immutable information tracked for a host.
@@ -28,6 +43,165 @@ class HostState(object):
         self.cpus = 0
         self.cpu_used = 0
         self.numa_topology = None
+        self.labels = None
+        self.total_containers = 0
+        self.image_digest = None
+
+        self._image_digest_str = None
 
         # Resource oversubscription values for the compute host:
         self.limits = {}
+
+        # Incremented each time the state is refreshed from the database.
+        self.generation = 0
+
+    def update_from_compute_node(self, compute_node):
+        """Update information about a host from a ComputeNode object."""
+        self.generation += 1
+        self.mem_total = compute_node.mem_total
+        self.mem_used = compute_node.mem_used
+        self.cpus = compute_node.cpus
+        self.cpu_used = compute_node.cpu_used
+        self.numa_topology = compute_node.numa_topology
+        self.labels = compute_node.labels
+        self.total_containers = compute_node.total_containers
+        image_digest = None
+        if compute_node.obj_attr_is_set('image_digest'):
+            image_digest = compute_node.image_digest
+        if image_digest != self._image_digest_str:
+            # Only parse the digests which changed since the last refresh.
+            self._image_digest_str = image_digest
+            self.image_digest = None
+            if image_digest:
+                self.image_digest = digest.ImageDigest.from_string(
+                    image_digest)
+
+    def consume_from_request(self, container):
+        """Virtually consume the resources requested by a container."""
+        if container.memory:
+            self.mem_used += int(container.memory[:-1])
+        if container.cpu:
+            self.cpu_used += container.cpu
+        self.total_containers += 1
+
+    def release_from_request(self, container):
+        """Give back the resources virtually consumed by a container."""
+        if container.memory:
+            self.mem_used -= int(container.memory[:-1])
+        if container.cpu:
+            self.cpu_used -= container.cpu
+        self.total_containers -= 1
+
+    def __repr__(self):
+        return ("%(host)s ram: %(free_ram)sMB cpu: %(free_cpu)s" %
+                {'host': self.hostname,
+                 'free_ram': self.mem_total - self.mem_used,
+                 'free_cpu': self.cpus - self.cpu_used})
+
+
+def _node_changed_at(compute_node):
+    for field in ('updated_at', 'created_at'):
+        if compute_node.obj_attr_is_set(field) and \
+                getattr(compute_node, field) is not None:
+            return getattr(compute_node, field)
+    return None
+
+
+@six.add_metaclass(singleton.Singleton)
+class HostStateCache(object):
+    """Process-wide cache of the HostState of every compute node.
+
+    Only the compute nodes changed since the newest change seen so far are
+    read from the database on a refresh. Every host_state_full_refresh_interval
+    seconds all compute nodes are reloaded so that deleted nodes are dropped
+    and resources consumed by failed placements are given back.
+
+    The timestamps of the compute nodes come from the clock of each compute
+    host, so a refresh also reads the nodes changed up to
+    host_state_refresh_overlap seconds before the newest change seen. Those
+    are only applied if their own timestamp changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._host_states = {}
+        self._node_changed_at = {}
+        self._last_changed_at = None
+        self._last_full_refresh = None
+
+    def _full_refresh_due(self):
+        interval = CONF.scheduler.host_state_full_refresh_interval
+        return (self._last_full_refresh is None or interval <= 0 or
+                time.time() - self._last_full_refresh >= interval)
+
+    def _refresh(self, context):
+        if self._full_refresh_due() or self._last_changed_at is None:
+            refreshed_at = time.time()
+            nodes = objects.ComputeNode.list(context)
+            self._host_states = {}
+            self._node_changed_at = {}
+            self._last_changed_at = None
+            self._last_full_refresh = refreshed_at
+        else:
+            overlap = datetime.timedelta(
+                seconds=CONF.scheduler.host_state_refresh_overlap)
+            nodes = objects.ComputeNode.list(
+                context,
+                filters={'updated_since': self._last_changed_at - overlap})
+        LOG.debug('Refreshing the host states of %d compute nodes',
+                  len(nodes))
+
+        for node in nodes:
+            changed_at = _node_changed_at(node)
+            host_state = self._host_states.get(node.hostname)
+            if host_state is None:
+                host_state = HostState(node.hostname)
+                self._host_states[node.hostname] = host_state
+            elif (changed_at is not None and
+                    changed_at == self._node_changed_at.get(node.hostname)):
+                # Unchanged, keep the resources consumed since it was read.
+                continue
+            host_state.update_from_compute_node(node)
+            self._node_changed_at[node.hostname] = changed_at
+            if changed_at is not None and (self._last_changed_at is None or
+                                           changed_at > self._last_changed_at):
+                self._last_changed_at = changed_at
+
+    def get_all_host_states(self, context, hosts=None):
+        """Return the refreshed HostState of the given hosts."""
+        with self._lock:
+            self._refresh(context)
+            if hosts is None:
+                return list(self._host_states.values())
+            return [self._host_states[host] for host in hosts
+                    if host in self._host_states]
+
+    def consume(self, host_state, container):
+        """Account a placement decision in the cached host state.
+
+        :returns: the generation of the host state, to be given back to
+                  release().
+        """
+        with self._lock:
+            host_state.consume_from_request(container)
+            return host_state.generation
+
+    def release(self, host_state, container, generation):
+        """Roll back a placement decision accounted by consume().
+
+        A host state refreshed since the placement no longer includes it,
+        so nothing is given back.
+        """
+        with self._lock:
+            if host_state.generation != generation:
+                LOG.debug('Host state of %s was refreshed since the '
+                          'placement, not releasing it', host_state.hostname)
+                return
+            host_state.release_from_request(container)
+
+    def clear(self):
+        with self._lock:
+            self._host_states = {}
+            self._node_changed_at = {}
+            self._last_changed_at = None
+            self._last_full_refresh = None
@@ -0,0 +1,35 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+CPU Weigher.  Weigh hosts by their CPU usage.
+
+The default is to pack containers onto the hosts with the fewest free vcpus.
+If you prefer spreading containers, set the 'cpu_weight_multiplier' option
+to a positive number and the weighing has the opposite effect of the default.
+"""
+
+import zun.conf
+from zun.scheduler import weights
+
+CONF = zun.conf.CONF
+
+
+class CPUWeigher(weights.BaseHostWeigher):
+
+    def weight_multiplier(self):
+        """Override the weight multiplier."""
+        return CONF.scheduler.cpu_weight_multiplier
+
+    def _weigh_object(self, host_state, container, extra_spec):
+        """Higher weights win.  Positive multipliers spread containers."""
+        return host_state.cpus - host_state.cpu_used
@@ -0,0 +1,47 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Image Locality Weigher.  Weigh hosts by whether they hold the container image.
+
+The compute nodes report a digest of their local images. The default favors
+the hosts which already hold the image of the container, so that scaling out
+does not pull the image on cold hosts. Hosts without a digest are weighed as
+if they do not hold the image. Set the 'image_locality_weight_multiplier'
+option to 0 to ignore image locality.
+"""
+
+import zun.conf
+from zun.image import digest
+from zun.scheduler import weights
+
+CONF = zun.conf.CONF
+
+
+class ImageLocalityWeigher(weights.BaseHostWeigher):
+
+    def weight_multiplier(self):
+        """Override the weight multiplier."""
+        return CONF.scheduler.image_locality_weight_multiplier
+
+    def _weigh_object(self, host_state, container, extra_spec):
+        """Higher weights win.  Hosts holding the image weigh 1."""
+        if host_state.image_digest is None or \
+                not container.obj_attr_is_set('image') or \
+                not container.image:
+            return 0.0
+        repo, tag = digest.split_reference(container.image)
+        if container.obj_attr_is_set('image_tag') and container.image_tag:
+            tag = container.image_tag[0]
+        if host_state.image_digest.contains(repo, tag):
+            return 1.0
+        return 0.0
@@ -12,13 +12,18 @@
 # limitations under the License.
 
 import functools
+import time
 
 from oslo_log import log
 from oslo_service import periodic_task
 
+from zun.common import consts
 from zun.common import context
+from zun.common import utils
 from zun.compute.compute_node_tracker import ComputeNodeTracker
+from zun.compute import manager
 from zun.container import driver
+from zun.image.glance import image_cache
 from zun import objects
 
 LOG = log.getLogger(__name__)
@@ -39,11 +44,43 @@ class ContainerStateSyncPeriodicJob(periodic_task.PeriodicTasks):
         self.driver = driver.load_container_driver(
             conf.container_driver)
         self.node_tracker = ComputeNodeTracker(self.host, self.driver)
+        self._last_runs = {}
         super(ContainerStateSyncPeriodicJob, self).__init__(conf)
 
+    def _is_due(self, task, interval, run_immediately=True):
+        """Whether a task is due, interval seconds after its last run.
+
+        A negative interval disables the task. A task which does not run
+        immediately first runs one interval after the service started.
+        """
+        if interval < 0:
+            return False
+        now = time.time()
+        last_run = self._last_runs.get(task)
+        if last_run is None and not run_immediately:
+            self._last_runs[task] = now
+            return False
+        if last_run is not None and now - last_run < interval:
+            return False
+        self._last_runs[task] = now
+        return True
+
+    def _should_sync_container_state(self):
+        if not manager.container_events_watched():
+            # Without the container events, the periodic sync is what keeps
+            # the container states up to date.
+            return True
+        # NOTE(zun): The container states are kept up to date from the
+        # container events, the full sync is only a low-frequency safety net.
+        return self._is_due('sync_container_state',
+                            self.conf.compute.sync_container_state_interval)
+
     @periodic_task.periodic_task(run_immediately=True)
     @set_context
     def sync_container_state(self, ctx):
+        if not self._should_sync_container_state():
+            return
+
         LOG.debug('Start syncing container states.')
 
         containers = objects.Container.list(ctx)
@@ -51,6 +88,36 @@ class ContainerStateSyncPeriodicJob(periodic_task.PeriodicTasks):
 
         LOG.debug('Complete syncing container states.')
 
+    @periodic_task.periodic_task(run_immediately=True)
+    @set_context
+    def manage_image_cache(self, ctx):
+        if not self._is_due('manage_image_cache',
+                            self.conf.glance.image_cache_manager_interval):
+            return
+
+        containers = objects.Container.list(ctx, filters={'host': self.host})
+        in_use = [(c.image, c.image_tag) for c in containers
+                  if c.image_driver == 'glance' and
+                  c.status != consts.DELETED]
+        if self.conf.sandbox_image_driver == 'glance':
+            in_use.append(utils.parse_image_name(self.conf.sandbox_image))
+        cache = image_cache.ImageCacheManager()
+        cache.set_in_use(in_use)
+        cache.evict()
+
+    @periodic_task.periodic_task(run_immediately=True)
+    @set_context
+    def scrub_image_cache(self, ctx):
+        # Do not hash every cached image when the service starts.
+        if not self._is_due('scrub_image_cache',
+                            self.conf.glance.image_cache_scrub_interval,
+                            run_immediately=False):
+            return
+
+        LOG.debug('Start scrubbing the image cache.')
+        image_cache.ImageCacheManager().scrub()
+        LOG.debug('Complete scrubbing the image cache.')
+
     @periodic_task.periodic_task(run_immediately=True)
     @set_context
     def inventory_host(self, ctx):
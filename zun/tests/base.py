@@ -23,6 +23,7 @@ from oslotest import base
 import pecan
 import testscenarios
 
+from zun.api import servicegroup
 from zun.common import context as zun_context
 import zun.conf
 from zun.objects import base as objects_base
@@ -90,6 +91,9 @@ class TestCase(base.BaseTestCase):
         self.policy = self.useFixture(policy_fixture.PolicyFixture())
         self.useFixture(conf_fixture.ConfFixture())
 
+        servicegroup.ServiceListCache().invalidate()
+        self.addCleanup(servicegroup.ServiceListCache().invalidate)
+
         self._base_test_obj_backup = copy.copy(
             objects_base.ZunObjectRegistry._registry._obj_classes)
         self.addCleanup(self._restore_obj_registry)
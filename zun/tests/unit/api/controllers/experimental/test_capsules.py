@@ -72,6 +72,9 @@ class TestCapsuleController(api_base.FunctionalTest):
         expected_container_num = 3
         self.assertEqual(len(return_value["containers_uuids"]),
                          expected_container_num)
+        capsule = mock_capsule_create.call_args[0][1]
+        self.assertEqual(2.0, capsule.cpu)
+        self.assertEqual('2048M', capsule.memory)
         self.assertEqual(return_value["meta_name"],
                          expected_meta_name)
         self.assertEqual(return_value["meta_labels"],
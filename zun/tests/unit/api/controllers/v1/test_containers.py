@@ -23,7 +23,7 @@ from zun.tests.unit.api import base as api_base
 from zun.tests.unit.db import utils
 from zun.tests.unit.objects import utils as obj_utils
 
-CURRENT_VERSION = "container 1.6"
+CURRENT_VERSION = "container 1.8"
 
 
 class TestContainerController(api_base.FunctionalTest):
@@ -256,7 +256,7 @@ class TestContainerController(api_base.FunctionalTest):
         # get all containers
         container = objects.Container.list(self.context)[0]
         container.status = 'Stopped'
-        mock_container_show.return_value = container
+        container.save(self.context)
         response = self.app.get('/v1/containers/')
         self.assertEqual(200, response.status_int)
         self.assertEqual(2, len(response.json))
@@ -312,7 +312,7 @@ class TestContainerController(api_base.FunctionalTest):
         # get all containers
         container = objects.Container.list(self.context)[0]
         container.status = 'Stopped'
-        mock_container_show.return_value = container
+        container.save(self.context)
         response = self.app.get('/v1/containers/')
         self.assertEqual(200, response.status_int)
         self.assertEqual(2, len(response.json))
@@ -351,7 +351,7 @@ class TestContainerController(api_base.FunctionalTest):
         # get all containers
         container = objects.Container.list(self.context)[0]
         container.status = 'Stopped'
-        mock_container_show.return_value = container
+        container.save(self.context)
         response = self.app.get('/v1/containers/')
         self.assertEqual(200, response.status_int)
         self.assertEqual(2, len(response.json))
@@ -389,7 +389,7 @@ class TestContainerController(api_base.FunctionalTest):
         # get all containers
         container = objects.Container.list(self.context)[0]
         container.status = 'Stopped'
-        mock_container_show.return_value = container
+        container.save(self.context)
         response = self.app.get('/v1/containers/')
         self.assertEqual(200, response.status_int)
         self.assertEqual(2, len(response.json))
@@ -432,7 +432,7 @@ class TestContainerController(api_base.FunctionalTest):
         # get all containers
         container = objects.Container.list(self.context)[0]
         container.status = 'Stopped'
-        mock_container_show.return_value = container
+        container.save(self.context)
         response = self.app.get('/v1/containers/')
         self.assertEqual(200, response.status_int)
         self.assertEqual(2, len(response.json))
@@ -475,7 +475,7 @@ class TestContainerController(api_base.FunctionalTest):
         # get all containers
         container = objects.Container.list(self.context)[0]
         container.status = 'Stopped'
-        mock_container_show.return_value = container
+        container.save(self.context)
         response = self.app.get('/v1/containers/')
         self.assertEqual(200, response.status_int)
         self.assertEqual(2, len(response.json))
@@ -517,7 +517,7 @@ class TestContainerController(api_base.FunctionalTest):
         # get all containers
         container = objects.Container.list(self.context)[0]
         container.status = 'Stopped'
-        mock_container_show.return_value = container
+        container.save(self.context)
         response = self.app.get('/v1/containers/')
         self.assertEqual(200, response.status_int)
         self.assertEqual(2, len(response.json))
@@ -560,7 +560,7 @@ class TestContainerController(api_base.FunctionalTest):
         # get all containers
         container = objects.Container.list(self.context)[0]
         container.status = 'Stopped'
-        mock_container_show.return_value = container
+        container.save(self.context)
         response = self.app.get('/v1/containers/')
         self.assertEqual(200, response.status_int)
         self.assertEqual(2, len(response.json))
@@ -602,7 +602,7 @@ class TestContainerController(api_base.FunctionalTest):
         # get all containers
         container = objects.Container.list(self.context)[0]
         container.status = 'Stopped'
-        mock_container_show.return_value = container
+        container.save(self.context)
         response = self.app.get('/v1/containers/')
         self.assertEqual(200, response.status_int)
         self.assertEqual(2, len(response.json))
@@ -764,30 +764,55 @@ class TestContainerController(api_base.FunctionalTest):
         self.assertEqual(container_list[-1].uuid,
                          actual_containers[0].get('uuid'))
 
-    @patch('zun.compute.api.API.container_show')
+    @patch('zun.compute.api.API.container_show_many')
     @patch('zun.objects.Container.list')
-    def test_get_all_containers_with_exception(self, mock_container_list,
-                                               mock_container_show):
+    def test_get_all_containers_without_refresh(self, mock_container_list,
+                                                mock_container_show_many):
         test_container = utils.get_test_container()
         containers = [objects.Container(self.context, **test_container)]
         mock_container_list.return_value = containers
-        mock_container_show.side_effect = Exception
 
         headers = {'OpenStack-API-Version': CURRENT_VERSION}
         response = self.app.get('/v1/containers/', headers=headers)
 
-        mock_container_list.assert_called_once_with(mock.ANY,
-                                                    1000, None, 'id', 'asc',
-                                                    filters=None)
+        self.assertEqual(200, response.status_int)
+        self.assertFalse(mock_container_show_many.called)
+        actual_containers = response.json['containers']
+        self.assertEqual(1, len(actual_containers))
+        self.assertEqual(test_container['status'],
+                         actual_containers[0].get('status'))
+
+    @patch('zun.compute.api.API.container_show_many')
+    @patch('zun.objects.Container.list')
+    def test_get_all_containers_with_refresh(self, mock_container_list,
+                                             mock_container_show_many):
+        test_container = utils.get_test_container()
+        containers = [objects.Container(self.context, **test_container)]
+        mock_container_list.return_value = containers
+        refreshed = objects.Container(self.context, **test_container)
+        refreshed.status = consts.UNKNOWN
+        mock_container_show_many.return_value = [refreshed]
+
+        headers = {'OpenStack-API-Version': CURRENT_VERSION}
+        response = self.app.get('/v1/containers/?refresh=True',
+                                headers=headers)
+
+        mock_container_show_many.assert_called_once_with(mock.ANY,
+                                                         containers)
         self.assertEqual(200, response.status_int)
         actual_containers = response.json['containers']
         self.assertEqual(1, len(actual_containers))
         self.assertEqual(test_container['uuid'],
                          actual_containers[0].get('uuid'))
-
         self.assertEqual(consts.UNKNOWN,
                          actual_containers[0].get('status'))
 
+    def test_get_all_containers_with_invalid_refresh(self):
+        headers = {'OpenStack-API-Version': CURRENT_VERSION}
+        self.assertRaises(AppError, self.app.get,
+                          '/v1/containers/?refresh=invalid',
+                          headers=headers)
+
     @patch('zun.compute.api.API.container_show')
     @patch('zun.objects.Container.get_by_uuid')
     def test_get_one_by_uuid(self, mock_container_get_by_uuid,
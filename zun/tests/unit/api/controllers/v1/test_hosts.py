@@ -17,6 +17,7 @@ from oslo_utils import uuidutils
 
 from zun import objects
 from zun.objects import numa
+from zun.scheduler import base_filters
 from zun.tests.unit.api import base as api_base
 from zun.tests.unit.db import utils
 
@@ -88,6 +89,28 @@ class TestHostController(api_base.FunctionalTest):
         self.assertEqual(test_host['uuid'],
                          response.json['uuid'])
 
+    def test_get_scheduler_filters(self):
+        self.config(enabled_filters=['CPUFilter', 'RamFilter'],
+                    adaptive_filter_ordering=True, group='scheduler')
+        statistics = base_filters.FilterStatistics()
+        statistics.clear()
+        self.addCleanup(statistics.clear)
+        statistics.record('CPUFilter', 1000, 950, 0.01)
+        statistics.record('RamFilter', 1000, 500, 0.01)
+        extra_environ = {'HTTP_ACCEPT': 'application/json'}
+        headers = {'OpenStack-API-Version': 'container 1.7'}
+        response = self.app.get('/v1/hosts/scheduler_filters',
+                                extra_environ=extra_environ,
+                                headers=headers)
+
+        self.assertEqual(200, response.status_int)
+        self.assertTrue(response.json['adaptive_ordering'])
+        filters = response.json['filters']
+        self.assertEqual(['RamFilter', 'CPUFilter'],
+                         [f['name'] for f in filters])
+        self.assertEqual(500, filters[0]['rejected'])
+        self.assertEqual(0.05, filters[1]['selectivity'])
+
 
 class TestHostEnforcement(api_base.FunctionalTest):
 
@@ -113,3 +136,11 @@ class TestHostEnforcement(api_base.FunctionalTest):
         self._common_policy_check(
             'host:get', self.get_json, '/hosts/%s' % '12345678',
             expect_errors=True, extra_environ=extra_environ, headers=headers)
+
+    def test_policy_disallow_get_scheduler_filters(self):
+        extra_environ = {'HTTP_ACCEPT': 'application/json'}
+        headers = {'OpenStack-API-Version': 'container 1.7'}
+        self._common_policy_check(
+            'host:scheduler_filters', self.get_json,
+            '/hosts/scheduler_filters', expect_errors=True,
+            extra_environ=extra_environ, headers=headers)
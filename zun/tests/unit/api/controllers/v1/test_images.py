@@ -18,6 +18,7 @@ from oslo_utils import uuidutils
 
 from zun.common import exception
 from zun import objects
+from zun.objects import numa
 from zun.tests.unit.api import base as api_base
 from zun.tests.unit.db import utils
 
@@ -187,6 +188,94 @@ class TestImageController(api_base.FunctionalTest):
                                     "Invalid input for query parameters"):
             self.app.get('/v1/images/redis/search?image_driver=wrong')
 
+    def _fake_compute_nodes(self):
+        nodes = []
+        for i, labels in enumerate([{'zone': 'edge'}, {}]):
+            node = utils.get_test_compute_node(
+                uuid=uuidutils.generate_uuid(), hostname='host%d' % i,
+                labels=labels)
+            node['numa_topology'] = numa.NUMATopology._from_dict(
+                node['numa_topology'])
+            nodes.append(objects.ComputeNode(self.context, **node))
+        return nodes
+
+    @patch('zun.compute.api.API.image_warm')
+    @patch('zun.objects.ComputeNode.list')
+    def test_warm_images(self, mock_list_nodes, mock_image_warm):
+        mock_list_nodes.return_value = self._fake_compute_nodes()
+        utils.create_test_image(context=self.context, repo='cirros',
+                                tag='latest')
+        utils.create_test_image(context=self.context, repo='nginx',
+                                tag='1.13', uuid=uuidutils.generate_uuid(),
+                                warm_status={'host1': 'ready'})
+        params = ('{"images": ["cirros", "nginx:1.13"], '
+                  '"labels": {"zone": "edge"}}')
+        headers = {'OpenStack-API-Version': 'container 1.8'}
+        response = self.app.post('/v1/images/warm', params=params,
+                                 headers=headers,
+                                 content_type='application/json')
+
+        self.assertEqual(202, response.status_int)
+        images = response.json['images']
+        self.assertEqual([('cirros', 'latest'), ('nginx', '1.13')],
+                         [(i['repo'], i['tag']) for i in images])
+        self.assertEqual([{'host0': 'pending'},
+                          {'host0': 'pending', 'host1': 'ready'}],
+                         [i['warm_status'] for i in images])
+        mock_image_warm.assert_called_once_with(mock.ANY, mock.ANY,
+                                                ['host0'])
+        self.assertEqual(2, len(mock_image_warm.call_args[0][1]))
+
+    @patch('zun.compute.api.API.image_warm')
+    @patch('zun.objects.ComputeNode.list')
+    def test_warm_images_not_found(self, mock_list_nodes, mock_image_warm):
+        mock_list_nodes.return_value = self._fake_compute_nodes()
+        # The image of another project is neither warmed nor updated.
+        utils.create_test_image(context=self.context, repo='cirros',
+                                tag='latest', project_id='other_project',
+                                warm_status={'host0': 'ready'})
+        params = '{"images": ["cirros", "nginx:1.13"]}'
+        headers = {'OpenStack-API-Version': 'container 1.8'}
+        response = self.app.post('/v1/images/warm', params=params,
+                                 headers=headers,
+                                 content_type='application/json',
+                                 expect_errors=True)
+        self.assertEqual(404, response.status_int)
+        self.assertFalse(mock_image_warm.called)
+        admin_context = self.context.elevated()
+        admin_context.all_tenants = True
+        images = objects.Image.list(admin_context)
+        self.assertEqual([('cirros', {'host0': 'ready'})],
+                         [(i.repo, i.warm_status) for i in images])
+
+    @patch('zun.compute.api.API.image_warm')
+    @patch('zun.objects.ComputeNode.list')
+    def test_warm_images_unknown_host(self, mock_list_nodes,
+                                      mock_image_warm):
+        mock_list_nodes.return_value = self._fake_compute_nodes()
+        params = '{"images": ["cirros"], "hosts": ["unknown"]}'
+        headers = {'OpenStack-API-Version': 'container 1.8'}
+        response = self.app.post('/v1/images/warm', params=params,
+                                 headers=headers,
+                                 content_type='application/json',
+                                 expect_errors=True)
+        self.assertEqual(404, response.status_int)
+        self.assertFalse(mock_image_warm.called)
+
+    @patch('zun.compute.api.API.image_warm')
+    @patch('zun.objects.ComputeNode.list')
+    def test_warm_images_no_matching_host(self, mock_list_nodes,
+                                          mock_image_warm):
+        mock_list_nodes.return_value = self._fake_compute_nodes()
+        params = '{"images": ["cirros"], "labels": {"zone": "core"}}'
+        headers = {'OpenStack-API-Version': 'container 1.8'}
+        response = self.app.post('/v1/images/warm', params=params,
+                                 headers=headers,
+                                 content_type='application/json',
+                                 expect_errors=True)
+        self.assertEqual(400, response.status_int)
+        self.assertFalse(mock_image_warm.called)
+
 
 class TestImageEnforcement(api_base.FunctionalTest):
 
@@ -211,3 +300,12 @@ class TestImageEnforcement(api_base.FunctionalTest):
             params=params,
             content_type='application/json',
             expect_errors=True)
+
+    def test_policy_disallow_warm(self):
+        params = '{"images": ["foo"]}'
+        headers = {'OpenStack-API-Version': 'container 1.8'}
+        self._common_policy_check(
+            'image:warm', self.app.post, '/v1/images/warm',
+            params=params, headers=headers,
+            content_type='application/json',
+            expect_errors=True)
@@ -0,0 +1,71 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from zun.api import servicegroup
+from zun import objects
+from zun.tests import base
+
+
+class TestServiceListCache(base.TestCase):
+
+    def setUp(self):
+        super(TestServiceListCache, self).setUp()
+        self.cache = servicegroup.ServiceListCache()
+        self.services = [objects.ZunService(host='host1'),
+                         objects.ZunService(host='host2')]
+
+    @mock.patch.object(objects.ZunService, 'list_by_binary')
+    def test_list_by_binary_cached(self, mock_list):
+        mock_list.return_value = self.services
+        self.cache.list_by_binary(self.context, 'zun-compute')
+        result = self.cache.list_by_binary(self.context, 'zun-compute')
+        self.assertEqual(self.services, result)
+        mock_list.assert_called_once_with(self.context, 'zun-compute')
+        self.assertIn('zun-compute', self.cache.get_stats()['staleness'])
+
+    @mock.patch.object(objects.ZunService, 'list_by_binary')
+    def test_list_by_binary_bypass_cache(self, mock_list):
+        mock_list.return_value = self.services
+        self.cache.list_by_binary(self.context, 'zun-compute')
+        self.cache.list_by_binary(self.context, 'zun-compute',
+                                  use_cache=False)
+        self.assertEqual(2, mock_list.call_count)
+
+    @mock.patch.object(objects.ZunService, 'list_by_binary')
+    def test_list_by_binary_cache_disabled(self, mock_list):
+        self.config(service_list_cache_ttl=0)
+        mock_list.return_value = self.services
+        self.cache.list_by_binary(self.context, 'zun-compute')
+        self.cache.list_by_binary(self.context, 'zun-compute')
+        self.assertEqual(2, mock_list.call_count)
+
+    @mock.patch.object(objects.ZunService, 'list_by_binary')
+    def test_invalidate(self, mock_list):
+        mock_list.return_value = self.services
+        self.cache.list_by_binary(self.context, 'zun-compute')
+        self.cache.invalidate('zun-compute')
+        self.cache.list_by_binary(self.context, 'zun-compute')
+        self.assertEqual(2, mock_list.call_count)
+
+    @mock.patch.object(servicegroup.ServiceGroup, 'service_is_up')
+    @mock.patch.object(objects.ZunService, 'list_by_binary')
+    def test_get_up_hosts_evaluates_liveness(self, mock_list, mock_is_up):
+        mock_list.return_value = self.services
+        mock_is_up.side_effect = [True, True, True, False]
+        servicegroup_api = servicegroup.ServiceGroup()
+        self.assertEqual(['host1', 'host2'],
+                         servicegroup_api.get_up_hosts(self.context))
+        self.assertEqual(['host1'],
+                         servicegroup_api.get_up_hosts(self.context))
+        mock_list.assert_called_once_with(self.context, 'zun-compute')
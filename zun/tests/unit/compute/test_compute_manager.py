@@ -21,6 +21,7 @@ from zun.common import exception
 from zun.compute import claims
 from zun.compute import compute_node_tracker
 from zun.compute import manager
+from zun.compute import work_scheduler
 import zun.conf
 from zun.objects.container import Container
 from zun.objects.image import Image
@@ -53,6 +54,57 @@ class TestManager(base.TestCase):
         self.assertEqual("Creation Failed", container.status_reason)
         self.assertIsNone(container.task_state)
 
+    def test_watch_container_events_not_supported(self):
+        watched = []
+
+        def watch_events(since=None):
+            watched.append(manager.container_events_watched())
+            raise NotImplementedError()
+
+        with mock.patch.object(self.compute_manager.driver, 'watch_events',
+                               side_effect=watch_events):
+            self.compute_manager._watch_container_events()
+        self.assertEqual([True], watched)
+        self.assertFalse(manager.container_events_watched())
+
+    @mock.patch.object(Container, 'save')
+    @mock.patch.object(Container, 'get_by_uuid')
+    def test_handle_container_event(self, mock_get, mock_save):
+        container = Container(self.context, **utils.get_test_container(
+            host=self.compute_manager.host, task_state=None))
+        container.obj_reset_changes()
+        mock_get.return_value = container
+        self.compute_manager._handle_container_event(
+            self.context, {'uuid': container.uuid, 'action': 'die'})
+        self.assertEqual(consts.STOPPED, container.status)
+        mock_save.assert_called_once_with(self.context)
+
+    @mock.patch.object(Container, 'save')
+    @mock.patch.object(Container, 'get_by_uuid')
+    def test_handle_container_event_unchanged(self, mock_get, mock_save):
+        container = Container(self.context, **utils.get_test_container(
+            host=self.compute_manager.host, task_state=None,
+            status=consts.RUNNING, status_reason=None))
+        container.obj_reset_changes()
+        mock_get.return_value = container
+        self.compute_manager._handle_container_event(
+            self.context, {'uuid': container.uuid, 'action': 'start'})
+        mock_save.assert_not_called()
+
+    @mock.patch.object(Container, 'save')
+    @mock.patch.object(Container, 'get_by_uuid')
+    def test_handle_container_event_task_in_progress(self, mock_get,
+                                                     mock_save):
+        container = Container(self.context, **utils.get_test_container(
+            host=self.compute_manager.host,
+            task_state=consts.CONTAINER_STOPPING))
+        container.obj_reset_changes()
+        mock_get.return_value = container
+        self.compute_manager._handle_container_event(
+            self.context, {'uuid': container.uuid, 'action': 'die'})
+        self.assertEqual(consts.RUNNING, container.status)
+        mock_save.assert_not_called()
+
     @mock.patch.object(Container, 'save')
     @mock.patch('zun.image.driver.pull_image')
     @mock.patch.object(fake_driver, 'create')
@@ -307,6 +359,18 @@ class TestManager(base.TestCase):
         self.compute_manager.container_show(self.context, container)
         mock_show.assert_called_once_with(self.context, container)
 
+    @mock.patch.object(Container, 'save')
+    @mock.patch.object(fake_driver, 'show')
+    def test_container_show_many(self, mock_show, mock_save):
+        container1 = Container(self.context, **utils.get_test_container())
+        container2 = Container(self.context, **utils.get_test_container())
+        mock_show.side_effect = [container1, exception.DockerError]
+        containers = self.compute_manager.container_show_many(
+            self.context, [container1, container2])
+        self.assertEqual([container1, container2], containers)
+        self.assertEqual(consts.UNKNOWN, container2.status)
+        self.assertEqual(2, mock_show.call_count)
+
     @mock.patch.object(fake_driver, 'show')
     def test_container_show_failed(self, mock_show):
         container = Container(self.context, **utils.get_test_container())
@@ -526,10 +590,12 @@ class TestManager(base.TestCase):
                           self.compute_manager.container_resize,
                           self.context, container, "100", "100")
 
+    @mock.patch('zun.image.driver.release_image')
     @mock.patch.object(fake_driver, 'inspect_image')
     @mock.patch.object(Image, 'save')
     @mock.patch('zun.image.driver.pull_image')
-    def test_image_pull(self, mock_pull, mock_save, mock_inspect):
+    def test_image_pull(self, mock_pull, mock_save, mock_inspect,
+                        mock_release):
         image = Image(self.context, **utils.get_test_image())
         ret = {'image': 'repo', 'path': 'out_path', 'driver': 'glance'}
         mock_pull.return_value = ret, True
@@ -538,13 +604,15 @@ class TestManager(base.TestCase):
         mock_pull.assert_any_call(self.context, image.repo, image.tag)
         mock_save.assert_called_once()
         mock_inspect.assert_called_once_with(image.repo + ":" + image.tag)
+        mock_release.assert_called_once_with(ret)
 
+    @mock.patch('zun.image.driver.release_image')
     @mock.patch.object(fake_driver, 'load_image')
     @mock.patch.object(fake_driver, 'inspect_image')
     @mock.patch.object(Image, 'save')
     @mock.patch('zun.image.driver.pull_image')
     def test_image_pull_not_loaded(self, mock_pull, mock_save,
-                                   mock_inspect, mock_load):
+                                   mock_inspect, mock_load, mock_release):
         image = Image(self.context, **utils.get_test_image())
         repo_tag = image.repo + ":" + image.tag
         ret = {'image': 'repo', 'path': 'out_path', 'driver': 'glance'}
@@ -555,6 +623,65 @@ class TestManager(base.TestCase):
         mock_save.assert_called_once()
         mock_inspect.assert_called_once_with(repo_tag)
         mock_load.assert_called_once_with(ret['path'])
+        mock_release.assert_called_once_with(ret)
+
+    @mock.patch.object(fake_driver, 'load_image')
+    @mock.patch.object(Image, 'update_warm_status')
+    @mock.patch('zun.image.driver.pull_image')
+    def test_image_warm(self, mock_pull, mock_update_status, mock_load):
+        images = [Image(self.context, **utils.get_test_image(repo='image1')),
+                  Image(self.context, **utils.get_test_image(repo='image2'))]
+
+        def pull_image(context, repo, tag, image_pull_policy):
+            if repo == 'image2':
+                raise exception.ImageNotFound(image=repo)
+            return {'image': repo, 'path': 'out_path'}, False
+        mock_pull.side_effect = pull_image
+
+        for image in images:
+            self.compute_manager._warm_image(self.context, image)
+
+        mock_pull.assert_any_call(self.context, 'image1', 'latest',
+                                  'ifnotpresent')
+        mock_load.assert_called_once_with('out_path')
+        host = self.compute_manager.host
+        mock_update_status.assert_has_calls([
+            mock.call(self.context, host, 'pulling'),
+            mock.call(self.context, host, 'ready'),
+            mock.call(self.context, host, 'pulling'),
+            mock.call(self.context, host, 'failed')], any_order=True)
+        self.assertEqual(4, mock_update_status.call_count)
+
+    @mock.patch.object(work_scheduler.WorkScheduler, 'submit')
+    def test_image_warm_is_scheduled(self, mock_submit):
+        images = [Image(self.context, **utils.get_test_image(repo='image1')),
+                  Image(self.context, **utils.get_test_image(repo='image2'))]
+        self.compute_manager.image_warm(self.context, images)
+        mock_submit.assert_has_calls([
+            mock.call(work_scheduler.OP_PULL, work_scheduler.PRIORITY_LOW,
+                      self.compute_manager._warm_image, self.context,
+                      images[0]),
+            mock.call(work_scheduler.OP_PULL, work_scheduler.PRIORITY_LOW,
+                      self.compute_manager._warm_image, self.context,
+                      images[1])])
+        self.assertEqual(2, mock_submit.call_count)
+
+    @mock.patch.object(work_scheduler.WorkScheduler, 'submit')
+    def test_container_operations_are_scheduled(self, mock_submit):
+        container = Container(self.context, **utils.get_test_container())
+        self.compute_manager.container_stop(self.context, container, 10)
+        mock_submit.assert_called_once_with(
+            work_scheduler.OP_LIFECYCLE, work_scheduler.PRIORITY_HIGH,
+            self.compute_manager._do_container_stop, self.context,
+            container, 10)
+
+        mock_submit.reset_mock()
+        self.compute_manager.container_create(self.context, {}, [],
+                                              container)
+        mock_submit.assert_called_once_with(
+            work_scheduler.OP_CREATE, work_scheduler.PRIORITY_NORMAL,
+            self.compute_manager._do_container_create, self.context,
+            container, [], {})
 
     @mock.patch.object(fake_driver, 'execute_resize')
     def test_container_exec_resize(self, mock_resize):
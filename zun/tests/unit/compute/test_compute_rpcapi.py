@@ -41,3 +41,13 @@ class TestAPI(base.TestCase):
         self.assertRaises(exception.ContainerHostNotUp,
                           self.compute_rpcapi.container_delete,
                           self.context, test_container_obj, False)
+
+    def test_image_warm(self):
+        test_image = objects.Image(self.context, **utils.get_test_image())
+        with mock.patch.object(self.compute_rpcapi, '_client') as mock_client:
+            self.compute_rpcapi.image_warm(self.context, 'fake_host',
+                                           [test_image])
+        mock_client.prepare.assert_called_once_with(server='fake_host',
+                                                    version='1.3')
+        mock_client.prepare.return_value.cast.assert_called_once_with(
+            mock.ANY, 'image_warm', images=[test_image])
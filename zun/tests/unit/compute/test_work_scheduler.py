@@ -0,0 +1,140 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+from eventlet import event
+
+from zun.compute import work_scheduler
+from zun.tests import base
+
+
+class TestWorkScheduler(base.TestCase):
+
+    def setUp(self):
+        super(TestWorkScheduler, self).setUp()
+        self.scheduler = work_scheduler.WorkScheduler()
+        self.scheduler.clear()
+        self.addCleanup(self.scheduler.clear)
+        self.calls = []
+
+    def _record(self, name, wait=None):
+        if wait is not None:
+            wait.wait()
+        self.calls.append(name)
+
+    def _wait_idle(self):
+        for _ in range(100):
+            stats = self.scheduler.get_stats()
+            if not any(s['running'] or s['queued'] for s in stats.values()):
+                return
+            eventlet.sleep(0)
+        self.fail('The scheduled operations did not complete')
+
+    def test_concurrency_limit(self):
+        self.config(max_concurrent_pulls=1, group='compute')
+        release = event.Event()
+        self.scheduler.submit(work_scheduler.OP_PULL,
+                              work_scheduler.PRIORITY_NORMAL,
+                              self._record, 'first', wait=release)
+        self.scheduler.submit(work_scheduler.OP_PULL,
+                              work_scheduler.PRIORITY_NORMAL,
+                              self._record, 'second')
+        eventlet.sleep(0)
+        stats = self.scheduler.get_stats()[work_scheduler.OP_PULL]
+        self.assertEqual(1, stats['running'])
+        self.assertEqual(1, stats['queued'])
+        self.assertEqual([], self.calls)
+
+        release.send()
+        self._wait_idle()
+        self.assertEqual(['first', 'second'], self.calls)
+        stats = self.scheduler.get_stats()[work_scheduler.OP_PULL]
+        self.assertEqual(2, stats['started'])
+        self.assertEqual(2, stats['completed'])
+        self.assertGreater(stats['max_wait_time'], 0)
+
+    def test_priority(self):
+        self.config(max_concurrent_lifecycle_operations=1, group='compute')
+        release = event.Event()
+        self.scheduler.submit(work_scheduler.OP_LIFECYCLE,
+                              work_scheduler.PRIORITY_NORMAL,
+                              self._record, 'start', wait=release)
+        self.scheduler.submit(work_scheduler.OP_LIFECYCLE,
+                              work_scheduler.PRIORITY_NORMAL,
+                              self._record, 'pause')
+        self.scheduler.submit(work_scheduler.OP_LIFECYCLE,
+                              work_scheduler.PRIORITY_HIGH,
+                              self._record, 'stop')
+        release.send()
+        self._wait_idle()
+        self.assertEqual(['start', 'stop', 'pause'], self.calls)
+
+    def test_operation_classes_are_independent(self):
+        self.config(max_concurrent_pulls=1, group='compute')
+        release = event.Event()
+        self.scheduler.submit(work_scheduler.OP_PULL,
+                              work_scheduler.PRIORITY_LOW,
+                              self._record, 'pull', wait=release)
+        self.scheduler.submit(work_scheduler.OP_LIFECYCLE,
+                              work_scheduler.PRIORITY_HIGH,
+                              self._record, 'kill')
+        eventlet.sleep(0)
+        self.assertEqual(['kill'], self.calls)
+        release.send()
+        self._wait_idle()
+
+    def test_no_limit(self):
+        self.config(max_concurrent_creates=0, group='compute')
+        release = event.Event()
+        for i in range(5):
+            self.scheduler.submit(work_scheduler.OP_CREATE,
+                                  work_scheduler.PRIORITY_NORMAL,
+                                  self._record, i, wait=release)
+        eventlet.sleep(0)
+        stats = self.scheduler.get_stats()[work_scheduler.OP_CREATE]
+        self.assertEqual(5, stats['running'])
+        self.assertEqual(0, stats['queued'])
+        release.send()
+        self._wait_idle()
+
+    def test_failed_operation_releases_slot(self):
+        self.config(max_concurrent_pulls=1, group='compute')
+
+        def fail():
+            raise ValueError('boom')
+
+        self.scheduler.submit(work_scheduler.OP_PULL,
+                              work_scheduler.PRIORITY_NORMAL, fail)
+        self.scheduler.submit(work_scheduler.OP_PULL,
+                              work_scheduler.PRIORITY_NORMAL,
+                              self._record, 'after')
+        self._wait_idle()
+        self.assertEqual(['after'], self.calls)
+        stats = self.scheduler.get_stats()[work_scheduler.OP_PULL]
+        self.assertEqual(1, stats['failed'])
+        self.assertEqual(1, stats['completed'])
+
+    def test_dispatch_after_limit_raised(self):
+        self.config(max_concurrent_pulls=1, group='compute')
+        release = event.Event()
+        self.scheduler.submit(work_scheduler.OP_PULL,
+                              work_scheduler.PRIORITY_NORMAL,
+                              self._record, 'first', wait=release)
+        self.scheduler.submit(work_scheduler.OP_PULL,
+                              work_scheduler.PRIORITY_NORMAL,
+                              self._record, 'second')
+        self.config(max_concurrent_pulls=2, group='compute')
+        self.scheduler.dispatch()
+        eventlet.sleep(0)
+        self.assertEqual(['second'], self.calls)
+        release.send()
+        self._wait_idle()
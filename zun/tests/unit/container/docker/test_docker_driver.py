@@ -19,7 +19,9 @@ from zun.common import consts
 from zun import conf
 from zun.container.docker.driver import DockerDriver
 from zun.container.docker.driver import NovaDockerDriver
+from zun.container.docker import host_config_cache
 from zun.container.docker import utils as docker_utils
+from zun.image import digest
 from zun import objects
 from zun.tests.unit.container import base
 from zun.tests.unit.objects import utils as obj_utils
@@ -54,6 +56,15 @@ class TestDockerDriver(base.DriverTestCase):
             self.context)
         self.dfc_context_manager.__enter__.return_value = self.mock_docker
         self.addCleanup(dfc_patcher.stop)
+        self.addCleanup(host_config_cache.HostConfigCache().clear)
+
+    def test_get_local_images(self):
+        self.mock_docker.images.return_value = [
+            {'RepoTags': ['nginx:latest', 'nginx:1.13']},
+            {'RepoTags': ['<none>:<none>']},
+            {'RepoTags': None}]
+        self.assertEqual(['nginx:latest', 'nginx:1.13'],
+                         self.driver.get_local_images())
 
     def test_inspect_image_path_is_none(self):
         self.mock_docker.inspect_image = mock.Mock()
@@ -155,8 +166,23 @@ class TestDockerDriver(base.DriverTestCase):
         self.driver.list(self.context)
         self.mock_docker.list_containers.assert_called_once_with()
 
-    @mock.patch('zun.objects.container.Container.save')
-    def test_update_containers_states(self, mock_save):
+    @mock.patch('zun.objects.container.Container.bulk_save')
+    @mock.patch('zun.objects.container.Container.list_by_host')
+    def test_list_removed_containers(self, mock_list_by_host,
+                                     mock_bulk_save):
+        self.mock_docker.list_containers.return_value = []
+        removed_container = obj_utils.get_test_container(
+            self.context, status='Stopped', auto_remove=True)
+        mock_list_by_host.return_value = [
+            removed_container,
+            obj_utils.get_test_container(self.context, status='Stopped')]
+        self.driver.list(self.context)
+        self.assertEqual(consts.DELETED, removed_container.status)
+        mock_bulk_save.assert_called_once_with(self.context,
+                                               [removed_container])
+
+    @mock.patch('zun.objects.container.Container.bulk_save')
+    def test_update_containers_states(self, mock_bulk_save):
         mock_container = obj_utils.get_test_container(
             self.context, status='Running', host='host1')
         mock_container_2 = obj_utils.get_test_container(
@@ -170,6 +196,21 @@ class TestDockerDriver(base.DriverTestCase):
                 self.context, [mock_container])
             self.assertEqual(mock_container.host, 'host2')
             self.assertEqual(mock_container.status, 'Stopped')
+            mock_bulk_save.assert_called_once_with(self.context,
+                                                   [mock_container])
+
+    @mock.patch('zun.objects.container.Container.bulk_save')
+    def test_update_containers_states_unchanged(self, mock_bulk_save):
+        conf.CONF.set_override('host', 'host1')
+        mock_container = obj_utils.get_test_container(
+            self.context, status='Running', host='host1')
+        mock_container.obj_reset_changes()
+        with mock.patch.object(self.driver, 'list') as mock_list:
+            mock_list.return_value = [obj_utils.get_test_container(
+                self.context, status='Running')]
+            self.driver.update_containers_states(
+                self.context, [mock_container])
+        self.assertFalse(mock_bulk_save.called)
 
     def test_show_success(self):
         self.mock_docker.inspect_container = mock.Mock(
@@ -433,6 +474,71 @@ class TestDockerDriver(base.DriverTestCase):
         cpu_used = self.driver.get_cpu_used()
         self.assertEqual(1.0, cpu_used)
 
+    @mock.patch.object(docker_utils, 'new_docker_client')
+    def test_watch_events(self, mock_new_client):
+        mock_client = mock_new_client.return_value
+        mock_client.events.return_value = iter([
+            {'Type': 'container', 'Action': 'die', 'id': '123', 'time': 10,
+             'Actor': {'ID': '123',
+                       'Attributes': {'name': 'zun-' + 'a' * 36}}},
+            {'Type': 'container', 'Action': 'die', 'id': '456', 'time': 11,
+             'Actor': {'ID': '456',
+                       'Attributes': {'name': 'zun-sandbox-' + 'b' * 36}}},
+            {'Type': 'container', 'Action': 'start', 'id': '789',
+             'time': 12,
+             'Actor': {'ID': '789', 'Attributes': {'name': 'other'}}},
+        ])
+        events = list(self.driver.watch_events(since=5))
+        self.assertEqual([{'uuid': 'a' * 36, 'action': 'die', 'time': 10}],
+                         events)
+        self.assertEqual(5, mock_client.events.call_args[1]['since'])
+        mock_client.close.assert_called_once_with()
+
+    def test_get_cpu_used_from_cache(self):
+        self.mock_docker.containers = mock.Mock()
+        self.mock_docker.containers.return_value = [{'Id': '123456'},
+                                                    {'Id': '654321'}]
+        self.mock_docker.inspect_container = mock.Mock()
+        self.mock_docker.inspect_container.return_value = {
+            'HostConfig': {'NanoCpus': 0,
+                           'CpuPeriod': 100000,
+                           'CpuQuota': 50000}}
+        self.assertEqual(1.0, self.driver.get_cpu_used())
+        self.assertEqual(1.0, self.driver.get_cpu_used())
+        self.assertEqual(2, self.mock_docker.inspect_container.call_count)
+
+        self.driver._host_config_cache.update('123456', cpu_quota=100000)
+        self.assertEqual(1.5, self.driver.get_cpu_used())
+        self.assertEqual(2, self.mock_docker.inspect_container.call_count)
+
+        self.driver._host_config_cache.handle_event(
+            {'Type': 'container', 'Action': 'destroy', 'id': '654321'})
+        self.mock_docker.containers.return_value = [{'Id': '123456'}]
+        self.assertEqual(1.0, self.driver.get_cpu_used())
+        self.assertEqual(2, self.mock_docker.inspect_container.call_count)
+
+    def test_get_cpu_used_keeps_stopped_containers(self):
+        self.mock_docker.containers = mock.Mock()
+        self.mock_docker.containers.return_value = []
+        self.mock_docker.inspect_container = mock.Mock()
+        self.driver._host_config_cache.set(
+            '123456', {'NanoCpus': 0, 'CpuPeriod': 100000,
+                       'CpuQuota': 50000})
+        # The HostConfig stored at create is kept until the container runs.
+        self.assertEqual(0, self.driver.get_cpu_used())
+        self.mock_docker.containers.return_value = [{'Id': '123456'}]
+        self.assertEqual(0.5, self.driver.get_cpu_used())
+        self.assertFalse(self.mock_docker.inspect_container.called)
+
+    def test_get_cpu_used_container_gone(self):
+        self.mock_docker.containers = mock.Mock()
+        self.mock_docker.containers.return_value = [{'Id': '123456'}]
+        self.mock_docker.inspect_container = mock.Mock()
+        self.mock_docker.inspect_container.side_effect = errors.NotFound(
+            'not found', response=mock.Mock(status_code=404))
+        self.assertEqual(0, self.driver.get_cpu_used())
+        self.assertIsNone(self.driver._host_config_cache.get('123456'))
+
     def test_stats(self):
         self.mock_docker.stats = mock.Mock()
         mock_container = mock.MagicMock()
@@ -571,9 +677,12 @@ class TestNovaDockerDriver(base.DriverTestCase):
         'zun.container.docker.driver.DockerDriver.get_host_info')
     @mock.patch(
         'zun.container.docker.driver.DockerDriver.get_cpu_used')
-    def test_get_available_resources(self, mock_cpu_used, mock_info, mock_mem,
-                                     mock_output):
+    @mock.patch(
+        'zun.container.docker.driver.DockerDriver.get_local_images')
+    def test_get_available_resources(self, mock_images, mock_cpu_used,
+                                     mock_info, mock_mem, mock_output):
         self.driver = DockerDriver()
+        mock_images.return_value = ['nginx:1.13', 'localhost:5000/app:v1']
         mock_output.return_value = LSCPU_ON
         conf.CONF.set_override('floating_cpu_set', "0")
         mock_mem.return_value = (100 * units.Ki, 50 * units.Ki, 50 * units.Ki,
@@ -599,3 +708,6 @@ class TestNovaDockerDriver(base.DriverTestCase):
         self.assertEqual('CentOS', node_obj.os)
         self.assertEqual('3.10.0-123', node_obj.kernel_version)
         self.assertEqual({'dev.type': 'product'}, node_obj.labels)
+        image_digest = digest.ImageDigest.from_string(node_obj.image_digest)
+        self.assertTrue(image_digest.contains('nginx', '1.13'))
+        self.assertTrue(image_digest.contains('localhost:5000/app', 'v1'))
@@ -0,0 +1,81 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from docker import errors
+import mock
+
+from zun.common import exception
+from zun.container.docker import utils as docker_utils
+from zun.tests import base
+
+
+class TestDockerClientPool(base.TestCase):
+    def setUp(self):
+        super(TestDockerClientPool, self).setUp()
+        p = mock.patch.object(docker_utils, 'new_docker_client',
+                              side_effect=lambda: mock.MagicMock())
+        self.mock_new_client = p.start()
+        self.addCleanup(p.stop)
+        self.pool = docker_utils.DockerClientPool()
+        self.pool.clear()
+        self.addCleanup(self.pool.clear)
+
+    def test_docker_client_reuses_client(self):
+        self.config(client_health_check_interval=60, group='docker')
+        with docker_utils.docker_client() as first:
+            pass
+        with docker_utils.docker_client() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(1, self.mock_new_client.call_count)
+        second.ping.assert_not_called()
+
+    def test_docker_client_health_check(self):
+        self.config(client_health_check_interval=0, group='docker')
+        with docker_utils.docker_client() as first:
+            first.ping.side_effect = Exception('connection reset')
+        with docker_utils.docker_client() as second:
+            pass
+        self.assertIsNot(first, second)
+        first.close.assert_called_once_with()
+        self.assertEqual(2, self.mock_new_client.call_count)
+
+    def test_docker_client_api_error_keeps_client(self):
+        def raise_api_error():
+            with docker_utils.docker_client():
+                raise errors.APIError('404 Not Found')
+
+        self.assertRaises(exception.DockerError, raise_api_error)
+        self.assertEqual(1, self.pool.get_stats()['idle'])
+
+    def test_docker_client_connection_error_discards_client(self):
+        def raise_connection_error():
+            with docker_utils.docker_client():
+                raise IOError('broken pipe')
+
+        self.assertRaises(IOError, raise_connection_error)
+        stats = self.pool.get_stats()
+        self.assertEqual(0, stats['idle'])
+        self.assertEqual(0, stats['size'])
+
+    def test_docker_client_pool_timeout(self):
+        self.config(client_pool_size=1, client_pool_timeout=0,
+                    group='docker')
+        with docker_utils.docker_client():
+            self.assertRaises(exception.DockerError, self.pool.get)
+
+    def test_docker_client_pool_disabled(self):
+        self.config(client_pool_size=0, group='docker')
+        with docker_utils.docker_client() as client:
+            pass
+        client.close.assert_called_once_with()
+        self.assertEqual(0, self.pool.get_stats()['size'])
@@ -11,6 +11,7 @@
 #    under the License.
 
 """Tests for manipulating compute nodes via the DB API"""
+import datetime
 import json
 import mock
 from oslo_config import cfg
@@ -123,6 +124,36 @@ class DbComputeNodeTestCase(base.DbTestCase):
             filters={'hostname': node1.hostname})
         self.assertEqual([node1.uuid], [r.uuid for r in res])
 
+    def test_list_compute_nodes_updated_since(self):
+        node1 = utils.create_test_compute_node(
+            hostname='node-one',
+            uuid=uuidutils.generate_uuid(),
+            context=self.context,
+            created_at=datetime.datetime(2017, 1, 1))
+        node2 = utils.create_test_compute_node(
+            hostname='node-two',
+            uuid=uuidutils.generate_uuid(),
+            context=self.context,
+            created_at=datetime.datetime(2017, 1, 1),
+            updated_at=datetime.datetime(2017, 6, 1))
+        node3 = utils.create_test_compute_node(
+            hostname='node-three',
+            uuid=uuidutils.generate_uuid(),
+            context=self.context,
+            created_at=datetime.datetime(2017, 6, 1))
+
+        res = dbapi.list_compute_nodes(
+            self.context,
+            filters={'updated_since': datetime.datetime(2017, 3, 1)})
+        self.assertEqual(sorted([node2.uuid, node3.uuid]),
+                         sorted([r.uuid for r in res]))
+
+        res = dbapi.list_compute_nodes(
+            self.context,
+            filters={'updated_since': datetime.datetime(2017, 3, 1),
+                     'hostname': node1.hostname})
+        self.assertEqual([], [r.uuid for r in res])
+
     def test_destroy_compute_node(self):
         node = utils.create_test_compute_node(context=self.context)
         dbapi.destroy_compute_node(self.context, node.uuid)
@@ -184,7 +215,7 @@ class EtcdDbComputeNodeTestCase(base.DbTestCase):
                                                 mock_read):
         mock_read.side_effect = etcd.EtcdKeyNotFound
         utils.create_test_compute_node(context=self.context, hostname='123')
-        mock_read.side_effect = lambda *args: None
+        mock_write.side_effect = etcd.EtcdAlreadyExist
         self.assertRaises(exception.ResourceExists,
                           utils.create_test_compute_node,
                           context=self.context, hostname='123')
@@ -11,6 +11,8 @@
 #    under the License.
 
 """Tests for manipulating Containers via the DB API"""
+import re
+
 import mock
 
 import etcd
@@ -19,14 +21,18 @@ from oslo_config import cfg
 from oslo_serialization import jsonutils as json
 from oslo_utils import uuidutils
 import six
+import sqlalchemy as sa
 
+from zun.common import consts
+from zun.common import context as zun_context
 from zun.common import exception
 import zun.conf
 from zun.db import api as dbapi
 from zun.db.etcd.api import EtcdAPI as etcd_api
+from zun.db.sqlalchemy import api as sqla_api
+from zun import objects
 from zun.tests.unit.db import base
 from zun.tests.unit.db import utils
-from zun.tests.unit.db.utils import FakeEtcdMultipleResult
 from zun.tests.unit.db.utils import FakeEtcdResult
 
 CONF = zun.conf.CONF
@@ -143,6 +149,27 @@ class DbContainerTestCase(base.DbTestCase):
                           self.context,
                           sort_key='foo')
 
+    def test_list_containers_sorted_with_marker(self):
+        for i in range(7):
+            utils.create_test_container(
+                uuid=uuidutils.generate_uuid(), context=self.context,
+                name='container' + str(i), host='host' + str(i % 3))
+        for sort_dir in ('asc', 'desc'):
+            expected = [(r.host, r.id) for r in dbapi.list_containers(
+                self.context, sort_key='host', sort_dir=sort_dir)]
+            res = []
+            marker = None
+            while True:
+                page = dbapi.list_containers(
+                    self.context, limit=2, marker=marker, sort_key='host',
+                    sort_dir=sort_dir)
+                if not page:
+                    break
+                res.extend((r.host, r.id) for r in page)
+                marker = page[-1]
+            self.assertEqual(sorted(expected, reverse=sort_dir == 'desc'),
+                             res)
+
     def test_list_containers_with_filters(self):
         container1 = utils.create_test_container(
             name='container-one',
@@ -228,6 +255,32 @@ class DbContainerTestCase(base.DbTestCase):
                           dbapi.update_container, self.context,
                           container.id, {'uuid': ''})
 
+    def test_bulk_update_containers(self):
+        containers = [utils.create_test_container(
+            context=self.context, uuid=uuidutils.generate_uuid(),
+            name='cont%d' % i) for i in range(3)]
+        values_by_uuid = {
+            containers[0].uuid: {'status': 'Stopped'},
+            containers[1].uuid: {'status': 'Stopped'},
+            containers[2].uuid: {'status': 'Running', 'host': 'host2'},
+            uuidutils.generate_uuid(): {'status': 'Stopped'},
+        }
+        count = dbapi.bulk_update_containers(self.context, values_by_uuid)
+        self.assertEqual(3, count)
+        for container in containers:
+            res = dbapi.get_container_by_uuid(self.context, container.uuid)
+            self.assertEqual(values_by_uuid[container.uuid]['status'],
+                             res.status)
+            self.assertIsNotNone(res.updated_at)
+        res = dbapi.list_containers(self.context, filters={'host': 'host2'})
+        self.assertEqual([containers[2].uuid], [r.uuid for r in res])
+
+    def test_bulk_update_containers_name(self):
+        container = utils.create_test_container(context=self.context)
+        self.assertRaises(exception.InvalidParameterValue,
+                          dbapi.bulk_update_containers, self.context,
+                          {container.uuid: {'name': 'new_name'}})
+
 
 class EtcdDbContainerTestCase(base.DbTestCase):
 
@@ -248,7 +301,12 @@ class EtcdDbContainerTestCase(base.DbTestCase):
                           group="compute")
         mock_read.side_effect = etcd.EtcdKeyNotFound
         utils.create_test_container(context=self.context)
-        mock_read.side_effect = lambda *args: None
+
+        def write(key, *args, **kwargs):
+            if key.startswith('/containers/'):
+                raise etcd.EtcdAlreadyExist
+
+        mock_write.side_effect = write
         self.assertRaises(exception.ResourceExists,
                           utils.create_test_container,
                           context=self.context)
@@ -270,8 +328,7 @@ class EtcdDbContainerTestCase(base.DbTestCase):
     def test_get_container_by_name(self, mock_write, mock_read):
         mock_read.side_effect = etcd.EtcdKeyNotFound
         container = utils.create_test_container(context=self.context)
-        mock_read.side_effect = lambda *args: FakeEtcdMultipleResult(
-            [container.as_dict()])
+        mock_read.side_effect = utils.fake_etcd_read([container.as_dict()])
         res = dbapi.get_container_by_name(
             self.context, container.name)
         self.assertEqual(container.id, res.id)
@@ -298,8 +355,7 @@ class EtcdDbContainerTestCase(base.DbTestCase):
                 name='cont' + str(i))
             containers.append(container.as_dict())
             uuids.append(six.text_type(container['uuid']))
-        mock_read.side_effect = lambda *args: FakeEtcdMultipleResult(
-            containers)
+        mock_read.side_effect = utils.fake_etcd_read(containers)
         res = dbapi.list_containers(self.context)
         res_uuids = [r.uuid for r in res]
         self.assertEqual(sorted(uuids), sorted(res_uuids))
@@ -317,8 +373,7 @@ class EtcdDbContainerTestCase(base.DbTestCase):
                 name='cont' + str(i))
             containers.append(container.as_dict())
             uuids.append(six.text_type(container.uuid))
-        mock_read.side_effect = lambda *args: FakeEtcdMultipleResult(
-            containers)
+        mock_read.side_effect = utils.fake_etcd_read(containers)
         res = dbapi.list_containers(self.context, sort_key='uuid')
         res_uuids = [r.uuid for r in res]
         self.assertEqual(sorted(uuids), res_uuids)
@@ -342,7 +397,7 @@ class EtcdDbContainerTestCase(base.DbTestCase):
             uuid=uuidutils.generate_uuid(),
             context=self.context)
 
-        mock_read.side_effect = lambda *args: FakeEtcdMultipleResult(
+        mock_read.side_effect = utils.fake_etcd_read(
             [container1.as_dict(), container2.as_dict()])
 
         res = dbapi.list_containers(
@@ -371,7 +426,8 @@ class EtcdDbContainerTestCase(base.DbTestCase):
         mock_read.side_effect = lambda *args: FakeEtcdResult(
             container.as_dict())
         dbapi.destroy_container(self.context, container.uuid)
-        mock_delete.assert_called_once_with('/containers/%s' % container.uuid)
+        self.assertEqual(mock.call('/containers/%s' % container.uuid),
+                         mock_delete.call_args_list[0])
 
     @mock.patch.object(etcd_client, 'read')
     @mock.patch.object(etcd_client, 'write')
@@ -383,7 +439,8 @@ class EtcdDbContainerTestCase(base.DbTestCase):
         mock_read.side_effect = lambda *args: FakeEtcdResult(
             container.as_dict())
         dbapi.destroy_container(self.context, container.uuid)
-        mock_delete.assert_called_once_with('/containers/%s' % container.uuid)
+        self.assertEqual(mock.call('/containers/%s' % container.uuid),
+                         mock_delete.call_args_list[0])
 
     @mock.patch.object(etcd_client, 'read')
     def test_destroy_container_that_does_not_exist(self, mock_read):
@@ -422,7 +479,7 @@ class EtcdDbContainerTestCase(base.DbTestCase):
             uuid=uuidutils.generate_uuid(),
             context=self.context)
 
-        mock_read.side_effect = lambda *args: FakeEtcdMultipleResult(
+        mock_read.side_effect = utils.fake_etcd_read(
             [container1.as_dict(), container2.as_dict()])
         self.assertRaises(exception.ContainerAlreadyExists,
                           dbapi.update_container, self.context,
@@ -501,3 +558,312 @@ class EtcdDbContainerTestCase(base.DbTestCase):
         self.context.user_id = 'fake_user_1'
         utils.create_test_container(
             context=self.context, name='cont1', uuid=uuidutils.generate_uuid())
+
+
+class EtcdContainerIndexTestCase(base.DbTestCase):
+
+    def setUp(self):
+        cfg.CONF.set_override('db_type', 'etcd')
+        super(EtcdContainerIndexTestCase, self).setUp()
+        self.etcd = utils.FakeEtcdClient()
+        self.etcd.patch(self)
+        self.dbapi._container_indexes_built = False
+        self.addCleanup(setattr, self.dbapi, '_container_indexes_built',
+                        False)
+
+    def _create_containers(self, count, **kwargs):
+        return [utils.create_test_container(
+            context=self.context, uuid=uuidutils.generate_uuid(),
+            name='cont%d' % i, **kwargs) for i in range(count)]
+
+    def test_index_lookup_reads_matching_containers(self):
+        self._create_containers(5)
+        container = utils.create_test_container(
+            context=self.context, uuid=uuidutils.generate_uuid(),
+            name='web', host='host2')
+        self.etcd.reads = self.etcd.nodes_read = 0
+        res = dbapi.get_container_by_name(self.context, 'web')
+        self.assertEqual(container.uuid, res.uuid)
+        # The name index then the matching container.
+        self.assertEqual(2, self.etcd.reads)
+        self.assertEqual(2, self.etcd.nodes_read)
+
+        res = dbapi.list_containers(self.context, filters={'host': 'host2'})
+        self.assertEqual([container.uuid], [r.uuid for r in res])
+
+    def test_update_moves_index_entries(self):
+        container = self._create_containers(1)[0]
+        dbapi.update_container(self.context, container.uuid,
+                               {'host': 'host2', 'status': 'Stopped'})
+        self.assertEqual([], dbapi.list_containers(
+            self.context, filters={'host': 'localhost'}))
+        res = dbapi.list_containers(
+            self.context, filters={'host': 'host2', 'status': 'Stopped'})
+        self.assertEqual([container.uuid], [r.uuid for r in res])
+        self.assertNotIn('/container_indexes/host/=localhost/' +
+                         container.uuid, self.etcd.store)
+
+    def test_bulk_update_moves_index_entries(self):
+        containers = self._create_containers(3)
+        missing_uuid = uuidutils.generate_uuid()
+        count = dbapi.bulk_update_containers(self.context, {
+            containers[0].uuid: {'status': 'Stopped'},
+            containers[1].uuid: {'status': 'Stopped', 'host': 'host2'},
+            missing_uuid: {'status': 'Stopped'},
+        })
+        self.assertEqual(2, count)
+        self.assertNotIn('/containers/' + missing_uuid, self.etcd.store)
+        res = dbapi.list_containers(self.context,
+                                    filters={'status': 'Stopped'})
+        self.assertEqual(sorted([containers[0].uuid, containers[1].uuid]),
+                         sorted(r.uuid for r in res))
+        res = dbapi.list_containers(self.context, filters={'host': 'host2'})
+        self.assertEqual([containers[1].uuid], [r.uuid for r in res])
+        self.assertNotIn('/container_indexes/host/=localhost/' +
+                         containers[1].uuid, self.etcd.store)
+
+    def test_bulk_update_containers_name(self):
+        container = self._create_containers(1)[0]
+        self.assertRaises(exception.InvalidParameterValue,
+                          dbapi.bulk_update_containers, self.context,
+                          {container.uuid: {'name': 'new_name'}})
+
+    def test_destroy_deletes_index_entries(self):
+        container = self._create_containers(1)[0]
+        dbapi.destroy_container(self.context, container.uuid)
+        self.assertEqual(['/container_indexes/built'],
+                         [k for k in self.etcd.store
+                          if k.startswith('/container_indexes')])
+        self.assertRaises(exception.ContainerNotFound,
+                          dbapi.get_container_by_name, self.context,
+                          container.name)
+
+    def test_stale_index_entries_are_ignored(self):
+        container = self._create_containers(1)[0]
+        del self.etcd.store['/containers/' + container.uuid]
+        self.assertEqual([], dbapi.list_containers(self.context))
+
+    def test_build_indexes_of_existing_containers(self):
+        containers = self._create_containers(3)
+        for key in [k for k in self.etcd.store
+                    if k.startswith('/container_indexes')]:
+            del self.etcd.store[key]
+        self.dbapi._container_indexes_built = False
+        res = dbapi.list_containers(self.context,
+                                    filters={'name': containers[1].name})
+        self.assertEqual([containers[1].uuid], [r.uuid for r in res])
+        self.assertIn('/container_indexes/built', self.etcd.store)
+
+    def test_marker_pagination(self):
+        containers = self._create_containers(7)
+        uuids = sorted(c.uuid for c in containers)
+        page = dbapi.list_containers(self.context, limit=3)
+        self.assertEqual(uuids[:3], [r.uuid for r in page])
+        page = dbapi.list_containers(self.context, limit=3, marker=page[-1])
+        self.assertEqual(uuids[3:6], [r.uuid for r in page])
+        page = dbapi.list_containers(self.context, limit=3, marker=page[-1])
+        self.assertEqual(uuids[6:], [r.uuid for r in page])
+
+    def test_marker_pagination_sorted_desc(self):
+        self._create_containers(4)
+        page = dbapi.list_containers(self.context, limit=2, sort_key='name',
+                                     sort_dir='desc')
+        self.assertEqual(['cont3', 'cont2'], [r.name for r in page])
+        page = dbapi.list_containers(self.context, limit=2, sort_key='name',
+                                     sort_dir='desc', marker=page[-1])
+        self.assertEqual(['cont1', 'cont0'], [r.name for r in page])
+
+    def test_marker_pagination_sorted_by_created_at(self):
+        for i in range(4):
+            utils.create_test_container(
+                context=self.context, uuid=uuidutils.generate_uuid(),
+                name='cont%d' % i,
+                created_at='2018-01-0%dT00:00:00.000000' % (4 - i))
+        page = dbapi.list_containers(self.context, limit=2,
+                                     sort_key='created_at')
+        self.assertEqual(['cont3', 'cont2'], [r.name for r in page])
+        # The marker holds a datetime while etcd holds strings.
+        marker = objects.Container.get_by_uuid(self.context, page[-1].uuid)
+        page = dbapi.list_containers(self.context, limit=2,
+                                     sort_key='created_at', marker=marker)
+        self.assertEqual(['cont1', 'cont0'], [r.name for r in page])
+
+
+class EtcdContainerCompareAndSwapTestCase(base.DbTestCase):
+
+    def setUp(self):
+        cfg.CONF.set_override('db_type', 'etcd')
+        super(EtcdContainerCompareAndSwapTestCase, self).setUp()
+        self.etcd = utils.FakeEtcdClient()
+        self.etcd.patch(self)
+        self.addCleanup(setattr, self.dbapi, '_container_indexes_built',
+                        False)
+        # Concurrent writers all miss each other in the name lookup.
+        patcher = mock.patch.object(etcd_api,
+                                    '_validate_unique_container_name')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_container(self, **kwargs):
+        return utils.create_test_container(
+            context=self.context, uuid=uuidutils.generate_uuid(), **kwargs)
+
+    def test_create_container_reserves_name(self):
+        self._create_container(name='web')
+        self.assertRaises(exception.ContainerAlreadyExists,
+                          self._create_container, name='WEB')
+        self._create_container(name='web', project_id='other_project')
+
+    def test_create_container_reserves_name_globally(self):
+        CONF.set_override('unique_container_name_scope', 'global',
+                          group='compute')
+        self._create_container(name='web')
+        self.assertRaises(exception.ContainerAlreadyExists,
+                          self._create_container, name='web',
+                          project_id='other_project')
+
+    def test_failed_create_releases_name(self):
+        def write(key, *args, **kwargs):
+            if key.startswith('/containers/'):
+                raise etcd.EtcdException('etcd is down')
+            return self.etcd.write(key, *args, **kwargs)
+
+        with mock.patch.object(etcd_client, 'write', side_effect=write):
+            self.assertRaises(etcd.EtcdException, self._create_container,
+                              name='web')
+        self._create_container(name='web')
+
+    def test_rename_moves_reservation(self):
+        container = self._create_container(name='web')
+        dbapi.update_container(self.context, container.uuid, {'name': 'db'})
+        self.assertRaises(exception.ContainerAlreadyExists,
+                          self._create_container, name='db')
+        self._create_container(name='web')
+        # A change of case keeps the reservation.
+        dbapi.update_container(self.context, container.uuid, {'name': 'DB'})
+        self.assertRaises(exception.ContainerAlreadyExists,
+                          self._create_container, name='db')
+
+    def test_rename_to_reserved_name(self):
+        self._create_container(name='web')
+        container = self._create_container(name='db')
+        self.assertRaises(exception.ContainerAlreadyExists,
+                          dbapi.update_container, self.context,
+                          container.uuid, {'name': 'web'})
+        res = dbapi.get_container_by_uuid(self.context, container.uuid)
+        self.assertEqual('db', res.name)
+
+    def test_destroy_container_releases_name(self):
+        container = self._create_container(name='web')
+        dbapi.destroy_container(self.context, container.uuid)
+        self._create_container(name='web')
+        self.assertEqual(['/container_names/project/=fake_project/=web'],
+                         [k for k in self.etcd.store
+                          if k.startswith('/container_names')])
+
+    @mock.patch('time.sleep')
+    def test_update_container_retries_concurrent_write(self, mock_sleep):
+        container = self._create_container(name='web')
+        key = '/containers/' + container.uuid
+
+        def racing_update(result):
+            if mock_update.call_count == 1:
+                # Another client changes the container first.
+                value = json.loads(self.etcd.store[key])
+                value['status'] = 'Stopped'
+                self.etcd.write(key, json.dump_as_bytes(value))
+            return self.etcd.update(result)
+
+        with mock.patch.object(etcd_client, 'update',
+                               side_effect=racing_update) as mock_update:
+            res = dbapi.update_container(self.context, container.uuid,
+                                         {'host': 'host2'})
+        self.assertEqual(2, mock_update.call_count)
+        self.assertEqual(('Stopped', 'host2'), (res.status, res.host))
+        res = dbapi.list_containers(
+            self.context, filters={'host': 'host2', 'status': 'Stopped'})
+        self.assertEqual([container.uuid], [r.uuid for r in res])
+
+    @mock.patch('time.sleep')
+    def test_update_container_gives_up(self, mock_sleep):
+        CONF.set_override('etcd_write_retries', 2, group='etcd')
+        container = self._create_container(name='web')
+        with mock.patch.object(etcd_client, 'update',
+                               side_effect=etcd.EtcdCompareFailed) as m:
+            self.assertRaises(exception.ConcurrentUpdateConflict,
+                              dbapi.update_container, self.context,
+                              container.uuid, {'name': 'db'})
+        self.assertEqual(3, m.call_count)
+        # The name reserved for the update is released.
+        self._create_container(name='db')
+
+
+class DbContainerQueryPlanTestCase(base.DbTestCase):
+    """Check that the container queries use the indexes on SQLite."""
+
+    def setUp(self):
+        cfg.CONF.set_override('db_type', 'sql')
+        super(DbContainerQueryPlanTestCase, self).setUp()
+        self.admin_context = zun_context.get_admin_context(all_tenants=True)
+        for i in range(10):
+            utils.create_test_container(
+                context=self.context, uuid=uuidutils.generate_uuid(),
+                name='container' + str(i), host='host' + str(i % 3))
+
+    def _query_plans(self, func, *args, **kwargs):
+        plans = []
+
+        def explain(conn, cursor, statement, parameters, exec_context,
+                    executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                plan_cursor = cursor.connection.cursor()
+                plan_cursor.execute('EXPLAIN QUERY PLAN ' + statement,
+                                    parameters)
+                plans.append(' '.join(
+                    row[-1] for row in plan_cursor.fetchall()))
+
+        engine = sqla_api.get_engine()
+        sa.event.listen(engine, 'before_cursor_execute', explain)
+        try:
+            func(*args, **kwargs)
+        finally:
+            sa.event.remove(engine, 'before_cursor_execute', explain)
+        return plans
+
+    def assertSearchesIndex(self, index, plans):
+        pattern = (r'SEARCH (TABLE )?container USING (COVERING )?INDEX '
+                   r'%s \(' % index)
+        self.assertTrue(any(re.search(pattern, plan) for plan in plans),
+                        plans)
+
+    def test_list_containers_by_host(self):
+        plans = self._query_plans(dbapi.list_containers, self.admin_context,
+                                  filters={'host': 'host1'})
+        self.assertSearchesIndex('container_host_status_idx', plans)
+
+    def test_list_containers_of_project_by_name(self):
+        plans = self._query_plans(dbapi.list_containers, self.context,
+                                  filters={'name': 'container1'})
+        self.assertSearchesIndex('container_project_id_name_idx', plans)
+
+    def test_validate_unique_container_name(self):
+        plans = self._query_plans(self.dbapi._validate_unique_container_name,
+                                  self.context, 'web')
+        self.assertSearchesIndex('container_project_id_name_idx', plans)
+
+    def test_list_unused_containers(self):
+        filters = {'auto_remove': True, 'status': consts.DELETED,
+                   'task_state': None}
+        plans = self._query_plans(dbapi.list_containers, self.admin_context,
+                                  filters=filters)
+        self.assertSearchesIndex('container_status_task_state_idx', plans)
+
+    def test_list_containers_after_marker(self):
+        for sort_dir in ('asc', 'desc'):
+            marker = dbapi.list_containers(
+                self.admin_context, limit=3, sort_key='name',
+                sort_dir=sort_dir)[-1]
+            plans = self._query_plans(
+                dbapi.list_containers, self.admin_context, limit=3,
+                marker=marker, sort_key='name', sort_dir=sort_dir)
+            self.assertSearchesIndex('container_name_idx', plans)
@@ -0,0 +1,234 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+import etcd
+from oslo_config import cfg
+from oslo_serialization import jsonutils as json
+from oslo_utils import uuidutils
+
+from zun.common import exception
+from zun.db import api as dbapi
+from zun.db.etcd import api as etcd_api
+from zun.db.etcd import cache
+from zun.tests import base
+from zun.tests.unit.db import base as db_base
+from zun.tests.unit.db import utils
+
+
+def _node(key, value, index):
+    return {'key': key, 'value': json.dump_as_bytes(value),
+            'modifiedIndex': index}
+
+
+def _result(action, node, etcd_index=None):
+    result = etcd.EtcdResult(action, node)
+    result.etcd_index = etcd_index
+    return result
+
+
+class TestEtcdCache(base.TestCase):
+
+    def setUp(self):
+        super(TestEtcdCache, self).setUp()
+        self.client = mock.MagicMock()
+        self.cache = cache.EtcdCache(self.client, ['/containers'])
+        self.client.read.return_value = _result('get', {
+            'key': '/containers', 'dir': True, 'nodes': [
+                _node('/containers/a', {'uuid': 'a', 'host': 'host1'}, 5),
+                _node('/containers/b', {'uuid': 'b', 'host': 'host2'}, 7)]},
+            etcd_index=10)
+        patcher = mock.patch('zun.common.utils.spawn_n')
+        self.mock_spawn = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _watch_event(self, action, node):
+        self.client.read.reset_mock()
+        self.client.read.return_value = _result(action, node)
+        self.cache._watch_once('/containers')
+
+    def test_load_on_first_use(self):
+        self.assertTrue(self.cache.serves('/containers/a'))
+        self.assertTrue(self.cache.serves('/containers'))
+        self.client.read.assert_called_once_with('/containers',
+                                                 recursive=True)
+        self.mock_spawn.assert_called_once_with(self.cache._watch,
+                                                '/containers')
+        self.assertEqual('a', json.loads(
+            self.cache.read('/containers/a').value)['uuid'])
+        self.assertRaises(etcd.EtcdKeyNotFound, self.cache.read,
+                          '/containers/c')
+        self.assertEqual(['b'], [n.data['uuid'] for n in self.cache.list(
+            '/containers', {'host': 'host2'})])
+
+    def test_uncached_path(self):
+        self.assertFalse(self.cache.serves('/images/a'))
+        self.assertFalse(self.client.read.called)
+
+    def test_load_failure(self):
+        self.client.read.side_effect = etcd.EtcdConnectionFailed
+        self.assertFalse(self.cache.serves('/containers/a'))
+        self.assertFalse(self.mock_spawn.called)
+        self.client.read.side_effect = None
+        self.assertTrue(self.cache.serves('/containers/a'))
+
+    def test_load_missing_path(self):
+        self.client.read.side_effect = etcd.EtcdKeyNotFound(
+            payload={'index': 12})
+        self.assertTrue(self.cache.serves('/containers'))
+        self.assertEqual([], self.cache.list('/containers'))
+        self.assertEqual(12, self.cache.get_stats()['paths'][
+            '/containers']['index'])
+
+    def test_watch_applies_changes(self):
+        self.cache.serves('/containers')
+        self._watch_event('set', _node('/containers/c', {'uuid': 'c'}, 11))
+        self.client.read.assert_called_once_with(
+            '/containers', recursive=True, wait=True, waitIndex=11,
+            timeout=60)
+        self._watch_event('delete', {'key': '/containers/a',
+                                     'modifiedIndex': 14})
+        self.client.read.assert_called_once_with(
+            '/containers', recursive=True, wait=True, waitIndex=12,
+            timeout=60)
+        self.assertEqual(['b', 'c'], sorted(
+            n.data['uuid'] for n in self.cache.list('/containers')))
+
+        self._watch_event('delete', {'key': '/containers', 'dir': True,
+                                     'modifiedIndex': 20})
+        self.assertEqual([], self.cache.list('/containers'))
+
+    def test_record_own_writes(self):
+        self.cache.serves('/containers')
+        self.cache.record(_result('compareAndSwap', _node(
+            '/containers/a', {'uuid': 'a', 'host': 'host3'}, 12)))
+        self.assertEqual('host3', self.cache.read('/containers/a').data[
+            'host'])
+        # The watch event of an older write does not undo it.
+        self._watch_event('set', _node('/containers/a',
+                                       {'uuid': 'a', 'host': 'host1'}, 11))
+        self.assertEqual('host3', self.cache.read('/containers/a').data[
+            'host'])
+
+        self.cache.record(_result('delete', {'key': '/containers/a',
+                                             'modifiedIndex': 13}))
+        self.assertRaises(etcd.EtcdKeyNotFound, self.cache.read,
+                          '/containers/a')
+        self._watch_event('compareAndSwap', _node(
+            '/containers/a', {'uuid': 'a', 'host': 'host3'}, 12))
+        self.assertRaises(etcd.EtcdKeyNotFound, self.cache.read,
+                          '/containers/a')
+        self._watch_event('delete', {'key': '/containers/a',
+                                     'modifiedIndex': 13})
+        self.assertEqual(['b'], [n.data['uuid']
+                                 for n in self.cache.list('/containers')])
+
+    @mock.patch('time.sleep')
+    def test_watch_resumes_after_failure(self, mock_sleep):
+        self.cache.serves('/containers')
+        served = []
+
+        def read(*args, **kwargs):
+            if self.client.read.call_count == 1:
+                raise etcd.EtcdConnectionFailed('connection refused')
+            served.append(self.cache.serves('/containers'))
+            if self.client.read.call_count == 2:
+                raise etcd.EtcdWatchTimedOut('timed out')
+            self.cache.stop()
+            return _result('set', _node('/containers/c', {'uuid': 'c'}, 11))
+
+        self.client.read.reset_mock()
+        self.client.read.side_effect = read
+        self.cache._watch('/containers')
+        self.assertEqual([False, True], served)
+        self.assertEqual(
+            [mock.call('/containers', recursive=True, wait=True,
+                       waitIndex=11, timeout=60)] * 3,
+            self.client.read.call_args_list)
+        self.assertTrue(self.cache.serves('/containers/c'))
+
+    def test_watch_reloads_cleared_events(self):
+        self.cache.serves('/containers')
+        loaded = _result('get', {
+            'key': '/containers', 'dir': True, 'nodes': [
+                _node('/containers/d', {'uuid': 'd'}, 1500)]},
+            etcd_index=1600)
+
+        def read(path, **kwargs):
+            if self.client.read.call_count == 1:
+                raise etcd.EtcdEventIndexCleared('cleared')
+            if not kwargs.get('wait'):
+                return loaded
+            self.assertEqual(1601, kwargs['waitIndex'])
+            self.cache.stop()
+            raise etcd.EtcdWatchTimedOut('timed out')
+
+        self.client.read.reset_mock()
+        self.client.read.side_effect = read
+        self.cache._watch('/containers')
+        self.assertEqual(3, self.client.read.call_count)
+        self.assertEqual(['d'], [n.data['uuid']
+                                 for n in self.cache.list('/containers')])
+
+
+class TestEtcdAPICache(db_base.DbTestCase):
+
+    def setUp(self):
+        cfg.CONF.set_override('db_type', 'etcd')
+        super(TestEtcdAPICache, self).setUp()
+        self.etcd = utils.FakeEtcdClient()
+        self.etcd.patch(self)
+        patcher = mock.patch('zun.common.utils.spawn_n')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dbapi._cache = cache.EtcdCache(self.dbapi.client,
+                                            etcd_api.CACHED_PATHS)
+        self.addCleanup(setattr, self.dbapi, '_cache', None)
+        self.addCleanup(setattr, self.dbapi, '_container_indexes_built',
+                        False)
+
+    def test_compute_node_lookups(self):
+        node = utils.create_test_compute_node(
+            context=self.context, uuid=uuidutils.generate_uuid(),
+            hostname='host1')
+        utils.create_test_compute_node(
+            context=self.context, uuid=uuidutils.generate_uuid(),
+            hostname='host2')
+        res = dbapi.get_compute_node_by_hostname(self.context, 'host1')
+        self.assertEqual(node.uuid, res.uuid)
+        self.etcd.reads = 0
+        res = dbapi.get_compute_node_by_hostname(self.context, 'host1')
+        self.assertEqual(node.uuid, res.uuid)
+        self.assertEqual(0, self.etcd.reads)
+
+        dbapi.update_compute_node(self.context, node.uuid, {'cpus': 8})
+        res = dbapi.get_compute_node(self.context, node.uuid)
+        self.assertEqual(8, res.cpus)
+        # Only the read of the compare-and-swap update went to etcd.
+        self.assertEqual(1, self.etcd.reads)
+
+    def test_container_lookups(self):
+        container = utils.create_test_container(context=self.context,
+                                                name='web')
+        self.assertEqual(container.uuid, dbapi.get_container_by_name(
+            self.context, 'web').uuid)
+        self.etcd.reads = 0
+        self.assertEqual(container.uuid, dbapi.get_container_by_uuid(
+            self.context, container.uuid).uuid)
+        self.assertEqual(0, self.etcd.reads)
+
+        dbapi.destroy_container(self.context, container.uuid)
+        self.assertRaises(exception.ContainerNotFound,
+                          dbapi.get_container_by_uuid, self.context,
+                          container.uuid)
+        self.assertEqual([], dbapi.list_containers(self.context))
@@ -21,6 +21,7 @@ from oslo_utils import uuidutils
 import six
 
 from zun.common import exception
+from zun.db.etcd import api as etcd_api
 from zun.tests.unit.db import base
 from zun.tests.unit.db import utils
 from zun.tests.unit.db.utils import FakeEtcdMultipleResult
@@ -137,6 +138,14 @@ class DbImageTestCase(base.DbTestCase):
                                       {'size': new_size})
         self.assertEqual(new_size, res.size)
 
+    def test_update_image_warm_status(self):
+        image = utils.create_test_image(context=self.context)
+        self.dbapi.update_image_warm_status(image.uuid, 'host1', 'pulling')
+        res = self.dbapi.update_image_warm_status(image.uuid, 'host2',
+                                                  'ready')
+        self.assertEqual({'host1': 'pulling', 'host2': 'ready'},
+                         res.warm_status)
+
     def test_update_image_not_found(self):
         image_uuid = uuidutils.generate_uuid()
         new_size = '2000'
@@ -319,3 +328,27 @@ class EtcdDbImageTestCase(base.DbTestCase):
         self.assertRaises(exception.InvalidParameterValue,
                           self.dbapi.update_image, image.uuid,
                           {'uuid': 'newuuid'})
+
+    @mock.patch('zun.db.etcd.api.EtcdAPI.get_image_by_repo_and_tag')
+    def test_pull_image_reserves_repo_and_tag(self, mock_get):
+        # Concurrent pulls all miss the image in the lookup.
+        mock_get.return_value = None
+        utils.FakeEtcdClient().patch(self)
+        utils.create_test_image(context=self.context, repo='ubuntu')
+        self.assertRaises(exception.ImageAlreadyExists,
+                          utils.create_test_image, context=self.context,
+                          repo='ubuntu', uuid=uuidutils.generate_uuid())
+        utils.create_test_image(context=self.context, repo='ubuntu',
+                                tag='16.04', uuid=uuidutils.generate_uuid())
+
+    @mock.patch('zun.db.etcd.api.EtcdAPI.get_image_by_repo_and_tag')
+    def test_clean_all_data_releases_repo_and_tag(self, mock_get):
+        mock_get.return_value = None
+        fake_etcd = utils.FakeEtcdClient()
+        fake_etcd.patch(self)
+        utils.create_test_image(context=self.context, repo='ubuntu')
+        etcd_api.clean_all_data()
+        self.assertEqual([], [k for k in fake_etcd.store
+                              if k.startswith('/image_tags')])
+        utils.create_test_image(context=self.context, repo='ubuntu',
+                                uuid=uuidutils.generate_uuid())
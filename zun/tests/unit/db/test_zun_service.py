@@ -143,7 +143,7 @@ class EtcdDbZunServiceTestCase(base.DbTestCase):
     def test_create_zun_service_already_exists(self, mock_write, mock_read):
         mock_read.side_effect = etcd.EtcdKeyNotFound
         utils.create_test_zun_service()
-        mock_read.side_effect = lambda *args: None
+        mock_write.side_effect = etcd.EtcdAlreadyExist
         self.assertRaises(exception.ResourceExists,
                           utils.create_test_zun_service)
 
@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 """Zun test utilities."""
+import etcd
 import mock
 
 from oslo_config import cfg
@@ -110,6 +111,7 @@ def get_test_image(**kwargs):
         'tag': kwargs.get('tag', 'latest'),
         'image_id': kwargs.get('image_id', 'sha256:c54a2cc56cbb2f0400'),
         'size': kwargs.get('size', '1848'),
+        'warm_status': kwargs.get('warm_status'),
         'project_id': kwargs.get('project_id', 'fake_project'),
         'user_id': kwargs.get('user_id', 'fake_user'),
         'created_at': kwargs.get('created_at'),
@@ -299,6 +301,7 @@ def get_test_compute_node(**kwargs):
         'kernel_version': kwargs.get('kernel_version',
                                      '3.10.0-123.el7.x86_64'),
         'labels': kwargs.get('labels', {"dev.type": "product"}),
+        'image_digest': kwargs.get('image_digest'),
         'created_at': kwargs.get('created_at'),
         'updated_at': kwargs.get('updated_at'),
     }
@@ -324,6 +327,116 @@ class FakeEtcdResult(object):
         self.value = json.dump_as_bytes(value)
 
 
+def fake_etcd_read(values, path='/containers'):
+    """Serve values at path/<uuid>, and all of them for any other key."""
+    by_key = {path + '/' + v['uuid']: v for v in values}
+
+    def read(key, *args, **kwargs):
+        if key in by_key:
+            return FakeEtcdResult(by_key[key])
+        return FakeEtcdMultipleResult(values)
+    return read
+
+
+class FakeEtcdClient(object):
+    """In-memory etcd keyspace serving the calls of the etcd backend.
+
+    Patch the read, write, update and delete methods of etcd.Client with
+    the methods of an instance to run the etcd backend against it. The
+    compare-and-swap conditions are honoured, the ttls are not.
+    """
+
+    def __init__(self):
+        self.store = {}
+        self.dirs = {'': set()}
+        self.modified = {}
+        self.index = 0
+        self.reads = 0
+        self.nodes_read = 0
+
+    def _node(self, key):
+        return {'key': key, 'value': self.store[key],
+                'modifiedIndex': self.modified.get(key)}
+
+    def read(self, key, **kwargs):
+        self.reads += 1
+        key = key.rstrip('/')
+        if key in self.store:
+            self.nodes_read += 1
+            return self._result('get', self._node(key))
+        if key not in self.dirs:
+            raise etcd.EtcdKeyNotFound(payload={'cause': key,
+                                                'index': self.index})
+        nodes = []
+        for name in sorted(self.dirs[key]):
+            child = key + '/' + name
+            if child in self.store:
+                nodes.append(self._node(child))
+            else:
+                nodes.append({'key': child, 'dir': True})
+        self.nodes_read += len(nodes)
+        return self._result('get', {'key': key, 'dir': True,
+                                    'nodes': nodes})
+
+    def _result(self, action, node):
+        result = etcd.EtcdResult(action, node)
+        result.etcd_index = self.index
+        return result
+
+    def _check(self, key, prevExist=None, prevIndex=None, prevValue=None):
+        if prevExist is False and key in self.store:
+            raise etcd.EtcdAlreadyExist(payload={'cause': key})
+        if key not in self.store:
+            if prevExist or prevIndex is not None or prevValue is not None:
+                raise etcd.EtcdKeyNotFound(payload={'cause': key})
+            return
+        if ((prevIndex is not None and prevIndex != self.modified[key]) or
+                (prevValue is not None and prevValue != self.store[key])):
+            raise etcd.EtcdCompareFailed(payload={'cause': key})
+
+    def write(self, key, value, ttl=None, **kwargs):
+        self._check(key, **kwargs)
+        parent, name = key.rsplit('/', 1)
+        self.index += 1
+        self.store[key] = value
+        self.modified[key] = self.index
+        while name:
+            self.dirs.setdefault(parent, set()).add(name)
+            if not parent:
+                break
+            parent, name = parent.rsplit('/', 1)
+        return self._result('set', self._node(key))
+
+    def update(self, result):
+        return self.write(result.key, result.value, prevExist=True,
+                          prevIndex=result.modifiedIndex)
+
+    def delete(self, key, recursive=False, **kwargs):
+        key = key.rstrip('/')
+        if key in self.store:
+            self._check(key, **kwargs)
+            del self.store[key]
+        elif recursive and key in self.dirs:
+            for child in list(self.dirs[key]):
+                self.delete(key + '/' + child, recursive=True)
+            del self.dirs[key]
+        else:
+            raise etcd.EtcdKeyNotFound(payload={'cause': key})
+        parent, name = key.rsplit('/', 1)
+        self.dirs[parent].discard(name)
+        self.index += 1
+        return self._result('delete', {'key': key,
+                                       'modifiedIndex': self.index})
+
+    def patch(self, test):
+        """Patch etcd.Client for the duration of a test."""
+        for name in ('read', 'write', 'update', 'delete'):
+            patcher = mock.patch.object(etcd.Client, name,
+                                        side_effect=getattr(self, name))
+            patcher.start()
+            test.addCleanup(patcher.stop)
+
+
 def get_test_capsule(**kwargs):
     return {
         'capsule_version': kwargs.get('capsule_version', 'beta'),
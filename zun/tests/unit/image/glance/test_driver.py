@@ -12,11 +12,17 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import hashlib
+import io
 import mock
 import os
 import shutil
+import tarfile
 import tempfile
 
+from docker import errors
+from oslo_serialization import jsonutils
+
 from zun.common import exception
 import zun.conf
 from zun.image.glance import driver
@@ -52,15 +58,30 @@ class TestDriver(base.BaseTestCase):
     def test_pull_image_should_pull_no_image_present_locally(
             self, mock_should_pull_image, mock_search):
         mock_should_pull_image.return_value = False
-        mock_search.return_value = {'image': 'nginx', 'path': 'xyz',
-                                    'checksum': 'xxx'}
-        mock_open_file = mock.mock_open()
-        with mock.patch('zun.image.glance.driver.open', mock_open_file):
-            self.assertEqual(({'image': 'nginx', 'path': 'xyz',
-                               'checksum': 'xxx'}, True),
+        image = {'image': 'nginx', 'path': 'xyz', 'id': 'xyz',
+                 'checksum_algorithm': 'md5', 'checksum': 'xxx'}
+        mock_search.return_value = image
+        with mock.patch.object(self.driver.image_cache, 'verify',
+                               return_value=False) as mock_verify:
+            self.assertEqual((image, True),
                              self.driver.pull_image(None, 'nonexisting',
                                                     'tag', 'never'))
-        mock_open_file.assert_any_call('xyz', 'rb')
+        mock_verify.assert_called_once_with('xyz', 'md5', 'xxx')
+
+    @mock.patch.object(driver.GlanceDriver,
+                       '_search_image_on_host')
+    @mock.patch('zun.common.utils.should_pull_image')
+    def test_pull_image_verified_locally(self, mock_should_pull_image,
+                                         mock_search):
+        image = {'image': 'nginx', 'path': 'xyz', 'id': 'xyz',
+                 'checksum_algorithm': 'md5', 'checksum': 'xxx'}
+        mock_search.return_value = image
+        with mock.patch.object(self.driver.image_cache, 'verify',
+                               return_value=True):
+            self.assertEqual((image, True),
+                             self.driver.pull_image(None, 'nginx',
+                                                    'tag', 'always'))
+        self.assertFalse(mock_should_pull_image.called)
 
     @mock.patch.object(driver.GlanceDriver,
                        '_search_image_on_host')
@@ -71,13 +92,27 @@ class TestDriver(base.BaseTestCase):
                                 mock_search):
         mock_should_pull_image.return_value = True
         mock_search.return_value = {'image': 'nginx', 'path': 'xyz',
+                                    'id': 'xyz', 'checksum_algorithm': 'md5',
                                     'checksum': 'xxx'}
-        mock_open_file = mock.mock_open()
-        with mock.patch('zun.image.glance.driver.open', mock_open_file):
-            mock_find_image.side_effect = Exception
+        mock_find_image.side_effect = Exception
+        with mock.patch.object(self.driver.image_cache, 'verify',
+                               return_value=False):
             self.assertRaises(exception.ZunException, self.driver.pull_image,
                               None, 'nonexisting', 'tag', 'always')
-        mock_open_file.assert_any_call('xyz', 'rb')
+
+    def _make_image_tarball(self, repo_tags):
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode='w') as tar:
+            for name, content in (
+                    ('layer.tar', b'0' * 4096),
+                    ('manifest.json', jsonutils.dump_as_bytes(
+                        [{'Config': 'config.json',
+                          'RepoTags': repo_tags}]))):
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        data = data.getvalue()
+        return [data[i:i + 1000] for i in range(0, len(data), 1000)], data
 
     @mock.patch.object(driver.GlanceDriver,
                        '_search_image_on_host')
@@ -87,24 +122,232 @@ class TestDriver(base.BaseTestCase):
     def test_pull_image_success(self, mock_find_image, mock_download_image,
                                 mock_should_pull_image, mock_search_on_host):
         mock_should_pull_image.return_value = True
-        mock_search_on_host.return_value = {'image': 'nginx', 'path': 'xyz',
-                                            'checksum': 'xxx'}
+        mock_search_on_host.return_value = None
+        chunks, data = self._make_image_tarball(['cirros:latest'])
         image_meta = mock.MagicMock()
         image_meta.id = '1234'
+        image_meta.checksum = hashlib.md5(data).hexdigest()
         mock_find_image.return_value = image_meta
-        mock_download_image.return_value = 'content'
+        mock_download_image.return_value = iter(chunks)
         CONF.set_override('images_directory', self.test_dir, group='glance')
         out_path = os.path.join(self.test_dir, '1234' + '.tar')
-        mock_open_file = mock.mock_open()
-        with mock.patch('zun.image.glance.driver.open', mock_open_file):
+        with mock.patch.object(self.driver.image_cache,
+                               'set_checksum') as mock_set_checksum:
             ret = self.driver.pull_image(None, 'image', 'latest', 'always')
-        mock_open_file.assert_any_call('xyz', 'rb')
-        mock_open_file.assert_any_call(out_path, 'wb')
         self.assertTrue(mock_search_on_host.called)
         self.assertTrue(mock_should_pull_image.called)
         self.assertTrue(mock_find_image.called)
         self.assertTrue(mock_download_image.called)
-        self.assertEqual(({'image': 'image', 'path': out_path}, False), ret)
+        self.assertEqual(({'image': 'image', 'path': out_path, 'id': '1234',
+                           'manifest_repo_tag': ['cirros', 'latest']},
+                          False), ret)
+        self.driver.release_image(ret[0])
+        with open(out_path, 'rb') as fd:
+            self.assertEqual(data, fd.read())
+        mock_set_checksum.assert_called_once_with(
+            '1234', 'md5', image_meta.checksum)
+
+    @mock.patch('zun.image.glance.utils.find_image')
+    def test_pull_image_cached_kept_until_released(self, mock_find_image):
+        CONF.set_override('images_directory', self.test_dir, group='glance')
+        chunks, data = self._make_image_tarball(['cirros:latest'])
+        with open(os.path.join(self.test_dir, '1234.tar'), 'wb') as fd:
+            fd.write(data)
+        image_meta = mock.MagicMock(id='1234')
+        image_meta.checksum = hashlib.md5(data).hexdigest()
+        mock_find_image.return_value = image_meta
+
+        image, image_loaded = self.driver.pull_image(None, 'image', 'latest',
+                                                     'ifnotpresent')
+        self.assertTrue(image_loaded)
+        self.assertEqual('1234', image['id'])
+
+        # An image downloaded before the cached one is loaded overflows the
+        # cache.
+        CONF.set_override('image_cache_max_size', 1, group='glance')
+        self.addCleanup(CONF.clear_override, 'image_cache_max_size',
+                        group='glance')
+        with open(os.path.join(self.test_dir, '5678.tar'), 'wb') as fd:
+            fd.write(b'0' * 1024 * 1024)
+        self.driver.image_cache.add('5678', 'other', 'latest')
+        self.assertTrue(os.path.isfile(image['path']))
+
+        self.driver.release_image(image)
+        self.assertEqual(['1234'], self.driver.image_cache.evict())
+        self.assertFalse(os.path.isfile(image['path']))
+
+    @mock.patch.object(driver.GlanceDriver,
+                       '_search_image_on_host')
+    @mock.patch('zun.image.glance.utils.download_image_in_chunks')
+    @mock.patch('zun.image.glance.utils.find_image')
+    def test_pull_image_checksum_mismatch(self, mock_find_image,
+                                          mock_download_image,
+                                          mock_search_on_host):
+        mock_search_on_host.return_value = None
+        chunks, data = self._make_image_tarball(['cirros:latest'])
+        image_meta = mock.MagicMock()
+        image_meta.id = '1234'
+        image_meta.checksum = 'xxx'
+        mock_find_image.return_value = image_meta
+        mock_download_image.return_value = iter(chunks)
+        CONF.set_override('images_directory', self.test_dir, group='glance')
+        self.assertRaises(exception.ImageChecksumMismatch,
+                          self.driver.pull_image,
+                          None, 'image', 'latest', 'always')
+        # Neither the image nor the temporary file are left behind.
+        self.assertEqual([], os.listdir(self.test_dir))
+
+    @mock.patch('zun.container.docker.utils.docker_client')
+    @mock.patch.object(driver.GlanceDriver,
+                       '_search_image_on_host')
+    @mock.patch('zun.image.glance.utils.download_image_in_chunks')
+    @mock.patch('zun.image.glance.utils.find_image')
+    def test_pull_image_direct_load(self, mock_find_image,
+                                    mock_download_image,
+                                    mock_search_on_host, mock_docker):
+        CONF.set_override('direct_load', True, group='glance')
+        self.addCleanup(CONF.clear_override, 'direct_load', group='glance')
+        CONF.set_override('images_directory', self.test_dir, group='glance')
+        mock_search_on_host.return_value = None
+        chunks, data = self._make_image_tarball(['cirros:latest'])
+        image_meta = mock.MagicMock(id='1234', size=len(data))
+        image_meta.checksum = hashlib.md5(data).hexdigest()
+        mock_find_image.return_value = image_meta
+        mock_download_image.return_value = iter(chunks)
+        loaded = []
+        docker = mock_docker.return_value.__enter__.return_value
+        docker.load_image.side_effect = lambda c: loaded.append(b''.join(c))
+
+        # The image does not fit in the cache, it is not written.
+        CONF.set_override('image_cache_max_size', 1, group='glance')
+        self.addCleanup(CONF.clear_override, 'image_cache_max_size',
+                        group='glance')
+        image_meta.size = 2 * 1024 * 1024
+        ret = self.driver.pull_image(None, 'image', 'latest', 'always')
+
+        self.assertEqual(({'image': 'image', 'path': None,
+                           'manifest_repo_tag': ['cirros', 'latest']},
+                          True), ret)
+        self.assertEqual([data], loaded)
+        self.assertEqual([], os.listdir(self.test_dir))
+        self.driver.image_cache.remove_loaded('1234')
+
+    @mock.patch('zun.container.docker.utils.docker_client')
+    @mock.patch('zun.image.glance.utils.download_image_in_chunks')
+    @mock.patch('zun.image.glance.utils.find_image')
+    def test_pull_image_direct_load_not_kept(self, mock_find_image,
+                                             mock_download_image,
+                                             mock_docker):
+        CONF.set_override('direct_load', True, group='glance')
+        self.addCleanup(CONF.clear_override, 'direct_load', group='glance')
+        CONF.set_override('direct_load_keep_images', False, group='glance')
+        self.addCleanup(CONF.clear_override, 'direct_load_keep_images',
+                        group='glance')
+        CONF.set_override('images_directory', self.test_dir, group='glance')
+        self.addCleanup(self.driver.image_cache.remove_loaded, '5678')
+        chunks, data = self._make_image_tarball(['cirros:latest'])
+        image_meta = mock.MagicMock(id='5678', size=len(data))
+        image_meta.checksum = hashlib.md5(data).hexdigest()
+        mock_find_image.return_value = image_meta
+        mock_download_image.return_value = iter(chunks)
+        docker = mock_docker.return_value.__enter__.return_value
+        docker.load_image.side_effect = lambda c: list(c)
+        docker.inspect_image.return_value = {'Id': 'sha256:abcd'}
+        expected = ({'image': 'image', 'path': None,
+                     'manifest_repo_tag': ['cirros', 'latest']}, True)
+
+        ret = self.driver.pull_image(None, 'image', 'latest', 'ifnotpresent')
+        self.assertEqual(expected, ret)
+        self.assertEqual([], os.listdir(self.test_dir))
+
+        # The image loaded in docker is used without downloading it again.
+        ret = self.driver.pull_image(None, 'image', 'latest', 'ifnotpresent')
+        self.assertEqual(expected, ret)
+        mock_download_image.assert_called_once_with(None, '5678')
+        docker.inspect_image.assert_called_with('cirros:latest')
+
+        # The image is downloaded again once it was removed from docker.
+        docker.inspect_image.side_effect = [
+            errors.NotFound('not found'), {'Id': 'sha256:abcd'}]
+        mock_download_image.return_value = iter(chunks)
+        ret = self.driver.pull_image(None, 'image', 'latest', 'ifnotpresent')
+        self.assertEqual(expected, ret)
+        self.assertEqual(2, mock_download_image.call_count)
+
+    @mock.patch('zun.container.docker.utils.docker_client')
+    @mock.patch.object(driver.GlanceDriver,
+                       '_search_image_on_host')
+    @mock.patch('zun.image.glance.utils.download_image_in_chunks')
+    @mock.patch('zun.image.glance.utils.find_image')
+    def test_pull_image_direct_load_checksum_mismatch(
+            self, mock_find_image, mock_download_image, mock_search_on_host,
+            mock_docker):
+        CONF.set_override('direct_load', True, group='glance')
+        self.addCleanup(CONF.clear_override, 'direct_load', group='glance')
+        CONF.set_override('images_directory', self.test_dir, group='glance')
+        mock_search_on_host.return_value = None
+        chunks, data = self._make_image_tarball(['cirros:latest'])
+        image_meta = mock.MagicMock(id='1234', size=len(data))
+        image_meta.checksum = 'xxx'
+        mock_find_image.return_value = image_meta
+        mock_download_image.return_value = iter(chunks)
+        docker = mock_docker.return_value.__enter__.return_value
+        docker.load_image.side_effect = lambda c: list(c)
+
+        self.assertRaises(exception.ImageChecksumMismatch,
+                          self.driver.pull_image,
+                          None, 'image', 'latest', 'always')
+        # The unverified image is removed from docker.
+        docker.remove_image.assert_called_once_with('cirros:latest',
+                                                    force=True)
+        self.assertEqual([], os.listdir(self.test_dir))
+
+    @mock.patch('zun.container.docker.utils.docker_client')
+    @mock.patch.object(driver.GlanceDriver,
+                       '_search_image_on_host')
+    @mock.patch('zun.image.glance.utils.download_image_in_chunks')
+    @mock.patch('zun.image.glance.utils.find_image')
+    def test_pull_image_direct_load_no_repo_tag(self, mock_find_image,
+                                                mock_download_image,
+                                                mock_search_on_host,
+                                                mock_docker):
+        CONF.set_override('direct_load', True, group='glance')
+        self.addCleanup(CONF.clear_override, 'direct_load', group='glance')
+        CONF.set_override('direct_load_keep_images', False, group='glance')
+        self.addCleanup(CONF.clear_override, 'direct_load_keep_images',
+                        group='glance')
+        CONF.set_override('images_directory', self.test_dir, group='glance')
+        mock_search_on_host.return_value = None
+        chunks, data = self._make_image_tarball([])
+        image_meta = mock.MagicMock(id='1234', size=len(data))
+        image_meta.checksum = hashlib.md5(data).hexdigest()
+        mock_find_image.return_value = image_meta
+        mock_download_image.return_value = iter(chunks)
+        docker = mock_docker.return_value.__enter__.return_value
+        docker.load_image.side_effect = lambda c: list(c)
+
+        # Neither the manifest nor a tarball tells how the image is tagged.
+        self.assertRaisesRegex(exception.ZunException,
+                               'Cannot find the repository and tag',
+                               self.driver.pull_image,
+                               None, 'image', 'latest', 'always')
+
+    def test_image_checksum(self):
+        image_meta = mock.MagicMock(checksum='md5sum',
+                                    os_hash_algo='sha512',
+                                    os_hash_value='sha512sum')
+        self.assertEqual(('md5', 'md5sum'),
+                         driver._image_checksum(image_meta))
+        CONF.set_override('image_checksum_algorithm', 'sha512',
+                          group='glance')
+        self.addCleanup(CONF.clear_override, 'image_checksum_algorithm',
+                        group='glance')
+        self.assertEqual(('sha512', 'sha512sum'),
+                         driver._image_checksum(image_meta))
+        CONF.set_override('image_checksum_algorithm', 'sha256',
+                          group='glance')
+        self.assertEqual(('md5', 'md5sum'),
+                         driver._image_checksum(image_meta))
 
     @mock.patch('zun.common.utils.should_pull_image')
     def test_pull_image_not_found(self, mock_should_pull_image):
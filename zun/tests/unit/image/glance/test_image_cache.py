@@ -0,0 +1,187 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+
+from zun.image.glance import image_cache
+from zun.tests import base
+
+
+class TestImageCacheManager(base.TestCase):
+    def setUp(self):
+        super(TestImageCacheManager, self).setUp()
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.config(images_directory=self.test_dir, group='glance')
+        self.cache = image_cache.ImageCacheManager()
+        self.cache.set_in_use(set())
+        self.addCleanup(self.cache.set_in_use, set())
+
+    def _write_image(self, image_id, size_mb=1):
+        with open(os.path.join(self.test_dir, image_id + '.tar'), 'wb') as fd:
+            fd.write(b'0' * size_mb * 1024 * 1024)
+
+    def _set_last_used(self, image_id, last_used):
+        self.cache._entries[image_id]['last_used'] = last_used
+
+    def test_index_built_once(self):
+        self._write_image('image1')
+        self.assertEqual(1024 * 1024, self.cache.get('image1')['size'])
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.test_dir, image_cache.INDEX_FILE)))
+
+        # A new process loads the index without scanning the directory.
+        self.cache._directory = None
+        with mock.patch('os.listdir') as mock_listdir:
+            self.assertIsNotNone(self.cache.get('image1'))
+        mock_listdir.assert_not_called()
+
+    def test_add_evicts_least_recently_used(self):
+        self.config(image_cache_max_size=2, group='glance')
+        now = time.time()
+        for i, image_id in enumerate(['image1', 'image2']):
+            self._write_image(image_id)
+            self.cache.add(image_id, 'repo%d' % i, 'latest')
+            self._set_last_used(image_id, now - 100 + i)
+        self.cache.touch('image1')
+
+        self._write_image('image3')
+        self.cache.add('image3', 'repo3', 'latest')
+
+        self.assertIsNotNone(self.cache.get('image1'))
+        self.assertIsNone(self.cache.get('image2'))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.test_dir, 'image2.tar')))
+        stats = self.cache.get_stats()
+        self.assertEqual(2, stats['images'])
+        self.assertEqual(2 * 1024 * 1024, stats['size'])
+        self.assertEqual(0, stats['pinned'])
+
+    def test_evict_skips_pinned_images(self):
+        for image_id in ['image1', 'image2']:
+            self._write_image(image_id)
+            self.cache.add(image_id, image_id, 'latest')
+        self._set_last_used('image1', 0)
+        self._set_last_used('image2', 0)
+        self.cache.set_in_use({('image1', 'latest')})
+        self.config(image_cache_max_size=1, group='glance')
+
+        self.assertEqual(['image2'], self.cache.evict())
+        self.assertIsNotNone(self.cache.get('image1'))
+        self.assertEqual(1, self.cache.get_stats()['pinned'])
+
+    def test_evict_skips_pinned_images_with_list_tags(self):
+        for image_id in ['image1', 'image2', 'image3']:
+            self._write_image(image_id)
+        # The tag of a container is a list, like the one of its pull.
+        self.cache.add('image1', 'image1', ['latest'])
+        self.cache.add('image2', 'image2', 'latest')
+        self.cache.add('image3', 'image3', ['latest'])
+        for image_id in ['image1', 'image2', 'image3']:
+            self._set_last_used(image_id, 0)
+        self.cache.set_in_use([('image1', ['latest']),
+                               ('image2', ['latest'])])
+        self.config(image_cache_max_size=1, group='glance')
+
+        self.assertEqual(['image3'], self.cache.evict())
+        self.assertEqual(2, self.cache.get_stats()['pinned'])
+
+        # Adding an image evicts the unpinned images.
+        self._write_image('image4')
+        self.cache.add('image4', 'image4', ['latest'])
+        self.assertIsNotNone(self.cache.get('image4'))
+
+    def test_evict_skips_acquired_images(self):
+        for image_id in ['image1', 'image2']:
+            self._write_image(image_id)
+            self.cache.add(image_id, image_id, 'latest')
+        self._set_last_used('image1', 0)
+        self._set_last_used('image2', 0)
+        self.cache.acquire('image1')
+        self.config(image_cache_max_size=1, group='glance')
+
+        # An image being loaded is not evicted by a concurrent download.
+        self._write_image('image3')
+        self.cache.add('image3', 'image3', 'latest')
+        self.assertIsNotNone(self.cache.get('image1'))
+        self.assertIsNone(self.cache.get('image2'))
+
+        self.cache.release('image1')
+        self.assertEqual(['image1'], self.cache.evict())
+
+    def test_evict_by_age(self):
+        self.config(image_cache_max_age=3600, group='glance')
+        for image_id in ['image1', 'image2']:
+            self._write_image(image_id)
+            self.cache.add(image_id, image_id, 'latest')
+        self._set_last_used('image1', time.time() - 7200)
+
+        self.assertEqual(['image1'], self.cache.evict())
+        self.assertIsNotNone(self.cache.get('image2'))
+
+    def test_evict_drops_missing_images(self):
+        self._write_image('image1')
+        self.cache.add('image1')
+        os.remove(os.path.join(self.test_dir, 'image1.tar'))
+
+        self.cache.evict()
+        self.assertIsNone(self.cache.get('image1'))
+
+    def test_verify_hashes_only_changed_images(self):
+        self._write_image('image1')
+        self.cache.add('image1')
+        md5sum = hashlib.md5(b'0' * 1024 * 1024).hexdigest()
+
+        with mock.patch.object(image_cache, 'compute_checksum',
+                               wraps=image_cache.compute_checksum) as m_hash:
+            self.assertTrue(self.cache.verify('image1', 'md5', md5sum))
+            self.assertTrue(self.cache.verify('image1', 'md5', md5sum))
+            self.assertFalse(self.cache.verify('image1', 'md5', 'other'))
+            self.assertEqual(1, m_hash.call_count)
+
+            # A new process trusts the verification recorded in the index.
+            self.cache._directory = None
+            self.assertTrue(self.cache.verify('image1', 'md5', md5sum))
+            self.assertEqual(1, m_hash.call_count)
+
+            self._write_image('image1', size_mb=2)
+            self.assertFalse(self.cache.verify('image1', 'md5', md5sum))
+            self.assertEqual(2, m_hash.call_count)
+
+    def test_verify_missing_image(self):
+        self.assertFalse(self.cache.verify('image1', 'md5', 'xxx'))
+
+    def test_scrub_removes_corrupted_images(self):
+        for image_id in ['image1', 'image2']:
+            self._write_image(image_id)
+            self.cache.add(image_id)
+            self.cache.set_checksum(
+                image_id, 'sha256',
+                hashlib.sha256(b'0' * 1024 * 1024).hexdigest())
+        # Corrupt image2 without changing its size or modification time.
+        path = os.path.join(self.test_dir, 'image2.tar')
+        stat = os.stat(path)
+        with open(path, 'r+b') as fd:
+            fd.write(b'1')
+        os.utime(path, (stat.st_atime, stat.st_mtime))
+
+        self.assertEqual(['image2'], self.cache.scrub())
+        self.assertIsNotNone(self.cache.get('image1'))
+        self.assertIsNone(self.cache.get('image2'))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(1, self.cache.get_stats()['verify']['corrupted'])
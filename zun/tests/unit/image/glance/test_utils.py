@@ -0,0 +1,199 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import hashlib
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+
+from glanceclient.common import exceptions as glance_exceptions
+import mock
+from oslo_serialization import jsonutils
+
+from zun.common import exception
+from zun.image.glance import metadata_cache
+from zun.image.glance import utils
+from zun.tests import base
+
+
+def make_image_tarball(repo_tags, chunk_size=1000):
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w') as tar:
+        for name, content in (
+                ('layer.tar', b'0' * 40960),
+                ('manifest.json', jsonutils.dump_as_bytes(
+                    [{'Config': 'config.json', 'RepoTags': repo_tags}]))):
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    data = data.getvalue()
+    return ([data[i:i + chunk_size] for i in range(0, len(data), chunk_size)],
+            data)
+
+
+class TestImageStream(base.BaseTestCase):
+    def setUp(self):
+        super(TestImageStream, self).setUp()
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.path = os.path.join(self.test_dir, 'image.tar')
+        self.chunks, self.data = make_image_tarball(['docker.io/cirros:0.3'])
+        self.loaded = []
+
+    def _load(self, chunks):
+        self.loaded.append(b''.join(chunks))
+
+    def test_write_image(self):
+        checksum, repo_tag = utils.write_image(iter(self.chunks), self.path)
+        self.assertEqual(hashlib.md5(self.data).hexdigest(), checksum)
+        self.assertEqual(['docker.io/cirros', '0.3'], repo_tag)
+        with open(self.path, 'rb') as fd:
+            self.assertEqual(self.data, fd.read())
+
+    def test_write_image_not_a_tarball(self):
+        checksum, repo_tag = utils.write_image(iter([b'x' * 100]),
+                                               self.path, 'sha256')
+        self.assertEqual(hashlib.sha256(b'x' * 100).hexdigest(), checksum)
+        self.assertIsNone(repo_tag)
+
+    def test_load_image_stream(self):
+        checksum, repo_tag = utils.load_image_stream(
+            iter(self.chunks), self._load, buffer_chunks=2,
+            checksum=hashlib.md5(self.data).hexdigest())
+        self.assertEqual([self.data], self.loaded)
+        self.assertEqual(['docker.io/cirros', '0.3'], repo_tag)
+        self.assertEqual([], os.listdir(self.test_dir))
+
+    def test_load_image_stream_keeps_image(self):
+        utils.load_image_stream(iter(self.chunks), self._load, self.path,
+                                buffer_chunks=2)
+        with open(self.path, 'rb') as fd:
+            self.assertEqual(self.data, fd.read())
+        self.assertEqual(['image.tar'], os.listdir(self.test_dir))
+
+    def test_load_image_stream_checksum_mismatch(self):
+        self.assertRaises(exception.ImageChecksumMismatch,
+                          utils.load_image_stream, iter(self.chunks),
+                          self._load, self.path, checksum='xxx')
+        self.assertEqual([], os.listdir(self.test_dir))
+
+    def test_load_image_stream_load_failure(self):
+        def load(chunks):
+            next(iter(chunks))
+            raise exception.DockerError('load failed')
+
+        self.assertRaises(exception.DockerError, utils.load_image_stream,
+                          iter(self.chunks), load, self.path,
+                          buffer_chunks=1)
+        self.assertEqual([], os.listdir(self.test_dir))
+
+    def test_load_image_stream_download_failure(self):
+        def chunks():
+            yield self.chunks[0]
+            raise IOError('connection reset')
+
+        self.assertRaises(IOError, utils.load_image_stream, chunks(),
+                          self._load, self.path)
+        self.assertEqual([], os.listdir(self.test_dir))
+
+
+class TestFindImages(base.TestCase):
+    def setUp(self):
+        super(TestFindImages, self).setUp()
+        self.cache = metadata_cache.ImageMetadataCache()
+        self.cache.clear()
+        self.addCleanup(self.cache.clear)
+        p = mock.patch.object(utils, 'create_glanceclient')
+        self.glance = p.start().return_value
+        self.addCleanup(p.stop)
+        self.context = mock.Mock(project_id='project1', is_admin=False)
+
+    def _image(self, name, image_id='1234'):
+        image = mock.Mock(id=image_id, container_format='docker')
+        image.name = name
+        return image
+
+    def test_find_images_exact_match_cached(self):
+        image_id = 'c1f2b5e4-0a5f-4b8e-9a51-3a8f5e0b2c11'
+        self.glance.images.list.return_value = [self._image('cirros',
+                                                            image_id)]
+        for _ in range(2):
+            images = utils.find_images(self.context, 'cirros', True)
+            self.assertEqual(['cirros'], [i.name for i in images])
+        self.glance.images.list.assert_called_once_with(
+            filters={'container_format': 'docker', 'name': 'cirros'})
+
+        # The image is also indexed by its id.
+        images = utils.find_images(self.context, image_id, True)
+        self.assertEqual([image_id], [i.id for i in images])
+        self.glance.images.get.assert_not_called()
+
+    def test_find_images_by_id_negative_cache(self):
+        self.glance.images.get.side_effect = glance_exceptions.NotFound
+        image_id = 'c1f2b5e4-0a5f-4b8e-9a51-3a8f5e0b2c11'
+        self.assertEqual([], utils.find_images(self.context, image_id, True))
+        self.assertEqual([], utils.find_images(self.context, image_id, True))
+        self.assertEqual(1, self.glance.images.get.call_count)
+        self.assertEqual(1, self.cache.get_stats()['negative_hits'])
+
+    def test_find_images_cache_scoped_by_project(self):
+        self.glance.images.list.return_value = [self._image('cirros')]
+        utils.find_images(self.context, 'cirros', True)
+        other = mock.Mock(project_id='project2', is_admin=False)
+        utils.find_images(other, 'cirros', True)
+        self.assertEqual(2, self.glance.images.list.call_count)
+
+    def test_find_images_substring(self):
+        self.glance.images.list.return_value = [self._image('cirros'),
+                                                self._image('ubuntu', '5678')]
+        self.assertEqual(['cirros'], [i.name for i in utils.find_images(
+            self.context, 'cir', False)])
+        self.assertEqual(['ubuntu'], [i.name for i in utils.find_images(
+            self.context, 'ubu', False)])
+        self.glance.images.list.assert_called_once_with(
+            filters={'container_format': 'docker'})
+
+    def test_find_images_cache_disabled(self):
+        self.config(image_metadata_cache_ttl=0, group='glance')
+        self.glance.images.list.return_value = []
+        utils.find_images(self.context, 'cirros', True)
+        utils.find_images(self.context, 'cirros', True)
+        self.assertEqual(2, self.glance.images.list.call_count)
+
+    def test_update_image_invalidates_cache(self):
+        self.glance.images.list.return_value = [self._image('cirros')]
+        utils.find_images(self.context, 'cirros', True)
+        utils.update_image(self.context, '1234', 'qcow2', 'docker', [])
+        utils.find_images(self.context, 'cirros', True)
+        self.assertEqual(2, self.glance.images.list.call_count)
+
+
+class TestGlanceClient(base.TestCase):
+    def setUp(self):
+        super(TestGlanceClient, self).setUp()
+        utils._glance_clients.clear()
+        self.addCleanup(utils._glance_clients.clear)
+
+    @mock.patch('zun.common.clients.OpenStackClients')
+    def test_create_glanceclient_reused(self, mock_clients):
+        mock_clients.return_value.glance.side_effect = (
+            lambda: mock.MagicMock())
+        context1 = mock.Mock(auth_token='token1', project_id='p1',
+                             user_id='u1')
+        context2 = mock.Mock(auth_token='token2', project_id='p1',
+                             user_id='u1')
+        first = utils.create_glanceclient(context1)
+        self.assertIs(first, utils.create_glanceclient(context1))
+        self.assertIsNot(first, utils.create_glanceclient(context2))
+        self.assertEqual(2, mock_clients.call_count)
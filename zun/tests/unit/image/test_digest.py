@@ -0,0 +1,65 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from zun.image import digest
+from zun.tests import base
+
+
+class TestImageDigest(base.BaseTestCase):
+
+    def test_split_reference(self):
+        self.assertEqual(('nginx', 'latest'), digest.split_reference('nginx'))
+        self.assertEqual(('nginx', '1.13'),
+                         digest.split_reference('nginx:1.13'))
+        self.assertEqual(('localhost:5000/app', 'latest'),
+                         digest.split_reference('localhost:5000/app'))
+        self.assertEqual(('localhost:5000/app', 'v1'),
+                         digest.split_reference('localhost:5000/app:v1'))
+
+    def test_normalize(self):
+        self.assertEqual('nginx:latest', digest.normalize('nginx'))
+        self.assertEqual('nginx:1.13',
+                         digest.normalize('docker.io/library/nginx', '1.13'))
+        self.assertEqual('kolla/zun:5.0',
+                         digest.normalize('docker.io/kolla/zun', '5.0'))
+
+    def test_contains(self):
+        image_digest = digest.ImageDigest.build(
+            ['nginx:latest', 'cirros:0.3.5', 'localhost:5000/app:v1'], 0.01)
+        self.assertTrue(image_digest.contains('nginx'))
+        self.assertTrue(image_digest.contains('docker.io/library/nginx',
+                                              'latest'))
+        self.assertTrue(image_digest.contains('cirros', '0.3.5'))
+        self.assertTrue(image_digest.contains('localhost:5000/app', 'v1'))
+        self.assertFalse(image_digest.contains('cirros', '0.4.0'))
+
+    def test_false_positive_rate(self):
+        images = ['image%d:latest' % i for i in range(500)]
+        image_digest = digest.ImageDigest.build(images, 0.01)
+        false_positives = len([
+            i for i in range(10000)
+            if image_digest.contains('other%d' % i)])
+        self.assertTrue(all(image_digest.contains('image%d' % i)
+                            for i in range(500)))
+        self.assertLess(false_positives, 300)
+
+    def test_serialization(self):
+        image_digest = digest.ImageDigest.build(['nginx:1.13'], 0.01)
+        loaded = digest.ImageDigest.from_string(image_digest.to_string())
+        self.assertEqual(image_digest.size, loaded.size)
+        self.assertEqual(image_digest.hash_count, loaded.hash_count)
+        self.assertTrue(loaded.contains('nginx', '1.13'))
+
+    def test_from_string_invalid(self):
+        self.assertIsNone(digest.ImageDigest.from_string('v0:1:64:AAAA'))
+        self.assertIsNone(digest.ImageDigest.from_string('v1:1:64:AAAA'))
+        self.assertIsNone(digest.ImageDigest.from_string('v1:bad'))
@@ -12,6 +12,13 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import threading
+
+import eventlet
+import greenlet
+import mock
+
+from zun.common import exception
 import zun.conf
 from zun.image import driver
 from zun.tests import base
@@ -31,3 +38,235 @@ class TestDriver(base.BaseTestCase):
     def test_load_image_driver(self):
         CONF.set_override('images_directory', None, group='glance')
         self.assertTrue(driver.load_image_driver, 'glance.GlanceDriver')
+
+
+class TestSingleFlight(base.BaseTestCase):
+    def setUp(self):
+        super(TestSingleFlight, self).setUp()
+        self.flights = driver.SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _blocking_call(self, result):
+        self.started.set()
+        self.release.wait()
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def _run_concurrently(self, count, result):
+        results = []
+        errors = []
+
+        def call():
+            try:
+                results.append(self.flights.do(
+                    'key', self._blocking_call, result))
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        threads[0].start()
+        self.started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        while self.flights.get_stats()['waiting'] < count - 1:
+            threading.Event().wait(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_do_coalesces_concurrent_calls(self):
+        results, errors = self._run_concurrently(3, {'path': 'out_path'})
+        self.assertEqual([], errors)
+        self.assertEqual([{'path': 'out_path'}] * 3, results)
+        # Every caller gets its own copy of the result.
+        self.assertEqual(3, len(set(id(r) for r in results)))
+        stats = self.flights.get_stats()
+        self.assertEqual(3, stats['calls'])
+        self.assertEqual(2, stats['coalesced'])
+        self.assertEqual(0, stats['in_flight'])
+
+    def test_do_shares_result(self):
+        share = mock.Mock()
+        self.flights = driver.SingleFlight(share=share)
+        results, errors = self._run_concurrently(3, {'path': 'out_path'})
+        self.assertEqual([], errors)
+        # The waiters are counted once the call completed.
+        share.assert_called_once_with({'path': 'out_path'}, 2)
+
+    def test_do_shares_exception(self):
+        results, errors = self._run_concurrently(
+            2, exception.ImageNotFound('not found'))
+        self.assertEqual([], results)
+        self.assertEqual(2, len(errors))
+        for error in errors:
+            self.assertIsInstance(error, exception.ImageNotFound)
+
+    def test_do_retries_interrupted_call(self):
+        interruption = greenlet.GreenletExit()
+        blocking_call = self._blocking_call
+        calls = []
+
+        def call(result):
+            calls.append(result)
+            if len(calls) == 1:
+                return blocking_call(interruption)
+            return blocking_call(result)
+
+        self._blocking_call = call
+        results, errors = self._run_concurrently(2, {'path': 'out_path'})
+        # The waiter makes the call again instead of getting None.
+        self.assertEqual([interruption], errors)
+        self.assertEqual([{'path': 'out_path'}], results)
+        self.assertEqual(2, len(calls))
+
+    def test_do_does_not_cache(self):
+        func = mock.Mock(return_value='result')
+        self.assertEqual('result', self.flights.do('key', func))
+        self.assertEqual('result', self.flights.do('key', func))
+        self.assertEqual(2, func.call_count)
+        self.assertEqual(0, self.flights.get_stats()['coalesced'])
+
+    @mock.patch.dict(driver._image_drivers, clear=True)
+    @mock.patch('zun.image.driver.load_image_driver')
+    def test_pull_image(self, mock_load_driver):
+        mock_load_driver.return_value.pull_image.return_value = (
+            {'path': 'out_path'}, False)
+        image, image_loaded = driver.pull_image(
+            None, 'repo', 'tag', image_driver='Glance')
+        self.assertEqual({'path': 'out_path', 'driver': 'glance'}, image)
+        self.assertFalse(image_loaded)
+        mock_load_driver.assert_called_once_with('glance')
+
+    @mock.patch.object(driver._pulls, 'do')
+    def test_pull_image_flight_key(self, mock_do):
+        context = mock.Mock(project_id='project1')
+        driver.pull_image(context, 'repo', ['tag'], 'ifnotpresent', 'glance')
+        driver.pull_image(context, 'repo', ['tag'], 'always', 'glance')
+        context.project_id = 'project2'
+        driver.pull_image(context, 'repo', ['tag'], 'always', 'glance')
+        keys = [call[0][0] for call in mock_do.call_args_list]
+        self.assertEqual(
+            [('glance', 'project1', 'repo', ('tag',), 'ifnotpresent'),
+             ('glance', 'project1', 'repo', ('tag',), 'always'),
+             ('glance', 'project2', 'repo', ('tag',), 'always')], keys)
+
+
+@mock.patch.dict(driver._image_drivers, clear=True)
+@mock.patch('zun.image.driver.load_image_driver')
+class TestImageDriverRegistry(base.BaseTestCase):
+
+    def test_get_image_driver_loads_once(self, mock_load_driver):
+        first = driver.get_image_driver('glance')
+        second = driver.get_image_driver('glance')
+        self.assertIs(first, second)
+        mock_load_driver.assert_called_once_with('glance')
+
+    def test_init_image_drivers(self, mock_load_driver):
+        CONF.set_override('image_driver_list', ['glance', 'docker'])
+        self.addCleanup(CONF.clear_override, 'image_driver_list')
+        driver.init_image_drivers()
+        self.assertEqual(2, mock_load_driver.call_count)
+        self.assertEqual({'glance', 'docker'}, set(driver._image_drivers))
+
+        mock_load_driver.reset_mock()
+        driver.get_image_driver('docker')
+        mock_load_driver.assert_not_called()
+
+    def test_init_image_drivers_reload_failure(self, mock_load_driver):
+        driver.init_image_drivers()
+        loaded = dict(driver._image_drivers)
+        mock_load_driver.side_effect = SystemExit(1)
+        driver.init_image_drivers()
+        self.assertEqual(loaded, driver._image_drivers)
+
+    def test_pull_image_records_latency(self, mock_load_driver):
+        mock_load_driver.return_value.pull_image.side_effect = (
+            exception.ImageNotFound('not found'))
+        self.assertRaises(exception.ImageNotFound, driver.pull_image,
+                          None, 'repo', 'tag', image_driver='docker')
+        stats = driver.get_image_driver_stats()['docker.pull_image']
+        self.assertGreaterEqual(stats['calls'], 1)
+        self.assertEqual(0, stats['errors'])
+        self.assertGreaterEqual(stats['max_time'], 0)
+
+
+class FakeImageDriver(driver.ContainerImageDriver):
+
+    def __init__(self, name, images=(), delay=0):
+        self.name = name
+        self.images = images
+        self.delay = delay
+        self.pulled = []
+
+    def search_image(self, context, repo, tag, exact_match):
+        eventlet.sleep(self.delay)
+        return [{'name': repo, 'driver': self.name}] if (
+            repo in self.images) else []
+
+    def pull_image(self, context, repo, tag, image_pull_policy):
+        self.pulled.append(repo)
+        if repo not in self.images:
+            raise exception.ImageNotFound('not found')
+        return {'image': repo, 'path': None}, True
+
+
+class TestMultiDriver(base.BaseTestCase):
+    def setUp(self):
+        super(TestMultiDriver, self).setUp()
+        self.glance = FakeImageDriver('glance', images=['cirros'])
+        self.docker = FakeImageDriver('docker', images=['cirros', 'nginx'])
+        p = mock.patch.dict(driver._image_drivers,
+                            {'glance': self.glance, 'docker': self.docker},
+                            clear=True)
+        p.start()
+        self.addCleanup(p.stop)
+        CONF.set_override('image_driver_list', ['glance', 'docker'])
+        self.addCleanup(CONF.clear_override, 'image_driver_list')
+
+    def _set_hedging(self):
+        CONF.set_override('image_pull_hedging', True)
+        self.addCleanup(CONF.clear_override, 'image_pull_hedging')
+
+    def test_search_image_merges_results_in_order(self):
+        self.glance.delay = 0.05
+        images = driver.search_image(None, 'cirros', None, None, True)
+        self.assertEqual(['glance', 'docker'],
+                         [i['driver'] for i in images])
+
+    def test_search_image_deadline(self):
+        CONF.set_override('image_driver_timeout', 1)
+        self.addCleanup(CONF.clear_override, 'image_driver_timeout')
+        self.docker.delay = 5
+        self.assertRaises(exception.ZunException, driver.search_image,
+                          None, 'cirros', None, None, True)
+
+    def test_pull_image_hedging_skips_misses(self):
+        self._set_hedging()
+        image, _loaded = driver.pull_image(None, 'nginx', 'latest')
+        self.assertEqual('docker', image['driver'])
+        self.assertEqual([], self.glance.pulled)
+
+    def test_pull_image_hedging_keeps_order(self):
+        self._set_hedging()
+        self.glance.delay = 0.05
+        image, _loaded = driver.pull_image(None, 'cirros', 'latest')
+        self.assertEqual('glance', image['driver'])
+        self.assertEqual([], self.docker.pulled)
+
+    def test_pull_image_hedging_lookup_failure(self):
+        self._set_hedging()
+        with mock.patch.object(FakeImageDriver, 'has_image',
+                               side_effect=Exception('unavailable')):
+            image, _loaded = driver.pull_image(None, 'nginx', 'latest')
+        self.assertEqual('docker', image['driver'])
+        # The drivers whose lookup failed are still tried, in order.
+        self.assertEqual(['nginx'], self.glance.pulled)
+
+    def test_pull_image_hedging_not_found(self):
+        self._set_hedging()
+        self.assertRaises(exception.ImageNotFound, driver.pull_image,
+                          None, 'ubuntu', 'latest')
+        self.assertEqual([], self.glance.pulled + self.docker.pulled)
@@ -141,6 +141,21 @@ class TestContainerObject(base.DbTestCase):
                      'memory': '512m'})
                 self.assertEqual(self.context, container._context)
 
+    def test_bulk_save(self):
+        uuids = [self.fake_container['uuid'], uuidutils.generate_uuid()]
+        containers = [objects.Container._from_db_object(
+            objects.Container(self.context),
+            dict(self.fake_container, uuid=uuid)) for uuid in uuids]
+        containers[0].status = 'Stopped'
+        containers[0].host = 'host2'
+        with mock.patch.object(self.dbapi, 'bulk_update_containers',
+                               autospec=True) as mock_bulk_update:
+            objects.Container.bulk_save(self.context, containers)
+            mock_bulk_update.assert_called_once_with(
+                self.context, {uuids[0]: {'status': 'Stopped',
+                                          'host': 'host2'}})
+            self.assertEqual(set(), containers[0].obj_what_changed())
+
     def test_refresh(self):
         uuid = self.fake_container['uuid']
         new_uuid = uuidutils.generate_uuid()
@@ -89,3 +89,14 @@ class TestImageObject(base.DbTestCase):
                                                            'image-test',
                                                            'tag': '512'})
                 self.assertEqual(self.context, image._context)
+
+    def test_update_warm_status(self):
+        uuid = self.fake_image['uuid']
+        warmed = dict(self.fake_image, warm_status={'host1': 'ready'})
+        with mock.patch.object(self.dbapi, 'update_image_warm_status',
+                               autospec=True) as mock_update:
+            mock_update.return_value = warmed
+            image = objects.Image(self.context, **self.fake_image)
+            image.update_warm_status(self.context, 'host1', 'ready')
+            mock_update.assert_called_once_with(uuid, 'host1', 'ready')
+            self.assertEqual({'host1': 'ready'}, image.warm_status)
@@ -344,15 +344,15 @@ class TestObject(test_base.TestCase, _TestObject):
 # For more information on object version testing, read
 # https://docs.openstack.org/zun/latest/
 object_data = {
-    'Container': '1.19-5f8a734d3b0cc2a47f48205944672ab5',
-    'Image': '1.0-0b976be24f4f6ee0d526e5c981ce0633',
+    'Container': '1.21-a1ae4d7f9b051a48ba248c2f7c6adda5',
+    'Image': '1.1-21e853778cd09b23ebdf826ae92c99ce',
     'MyObj': '1.0-34c4b1aadefd177b13f9a2f894cc23cd',
     'NUMANode': '1.0-cba878b70b2f8b52f1e031b41ac13b4e',
     'NUMATopology': '1.0-b54086eda7e4b2e6145ecb6ee2c925ab',
     'ResourceClass': '1.1-d661c7675b3cd5b8c3618b68ba64324e',
     'ResourceProvider': '1.0-92b427359d5a4cf9ec6c72cbe630ee24',
     'ZunService': '1.1-b1549134bfd5271daec417ca8cabc77e',
-    'ComputeNode': '1.6-33a173b969781644a95ea2925eb5cca2',
+    'ComputeNode': '1.7-099303909ac72db1a658f6b3bc984c85',
     'Capsule': '1.0-0dce1bd569773c35193d75c285226e75',
 }
 
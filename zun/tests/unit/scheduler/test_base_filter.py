@@ -17,6 +17,7 @@ import inspect
 import mock
 
 from zun.scheduler import base_filters
+from zun.scheduler import filters
 from zun.tests import base
 
 
@@ -39,3 +40,58 @@ class BaseFilterTestCase(base.TestCase):
         base_filter.run_filter_once_per_request = False
         result = base_filter.run_filter_for_index(2)
         self.assertTrue(result)
+
+
+class FakeFilter1(filters.BaseHostFilter):
+    """Rejects the hosts whose name ends with 1."""
+
+    def host_passes(self, host_state, container, extra_spec):
+        return not host_state.endswith('1')
+
+
+class FakeFilter2(filters.BaseHostFilter):
+    """Rejects the hosts whose name ends with 0."""
+
+    def host_passes(self, host_state, container, extra_spec):
+        return not host_state.endswith('0')
+
+
+class HostFilterHandlerTestCase(base.TestCase):
+    """Test case for the host filter handler."""
+
+    def setUp(self):
+        super(HostFilterHandlerTestCase, self).setUp()
+        self.handler = filters.HostFilterHandler()
+        self.statistics = base_filters.FilterStatistics()
+        self.statistics.clear()
+        self.addCleanup(self.statistics.clear)
+        self.container = mock.Mock(uuid='fake-uuid')
+        self.hosts = ['host%d' % i for i in range(200)]
+
+    def test_get_filtered_objects_statistics(self):
+        result = self.handler.get_filtered_objects(
+            [FakeFilter1(), FakeFilter2()], self.hosts, self.container, {})
+
+        self.assertEqual(160, len(result))
+        stats = self.statistics.get_stats()
+        self.assertEqual(1, stats['FakeFilter1']['calls'])
+        self.assertEqual(200, stats['FakeFilter1']['hosts'])
+        self.assertEqual(20, stats['FakeFilter1']['rejected'])
+        self.assertEqual(0.1, stats['FakeFilter1']['selectivity'])
+        self.assertEqual(180, stats['FakeFilter2']['hosts'])
+        self.assertEqual(20, stats['FakeFilter2']['rejected'])
+
+    def test_get_filtered_objects_adaptive_ordering(self):
+        self.config(adaptive_filter_ordering=True, group='scheduler')
+        self.statistics.record('FakeFilter1', 1000, 900, 0.1)
+        self.statistics.record('FakeFilter2', 1000, 100, 0.1)
+        filter1 = FakeFilter1()
+        filter2 = FakeFilter2()
+
+        self.assertEqual([filter2, filter1],
+                         self.statistics.order([filter1, filter2]))
+        self.handler.get_filtered_objects([filter1, filter2], self.hosts,
+                                          self.container, {})
+        stats = self.statistics.get_stats()
+        self.assertEqual(1200, stats['FakeFilter2']['hosts'])
+        self.assertEqual(1180, stats['FakeFilter1']['hosts'])
@@ -49,6 +49,18 @@ class ChanceSchedulerTestCase(base.TestCase):
         calls = [mock.call(all_hosts)]
         self.assertEqual(calls, mock_random_choice.call_args_list)
 
+    @mock.patch.object(driver_cls, 'hosts_up')
+    def test_select_destinations_many(self, mock_hosts_up):
+        mock_hosts_up.return_value = ['host1', 'host2']
+        test_container = utils.get_test_container()
+        containers = [objects.Container(self.context, **test_container),
+                      objects.Container(self.context, **test_container)]
+        dests = self.driver_cls().select_destinations(self.context, containers,
+                                                      {})
+
+        self.assertEqual(2, len(dests))
+        mock_hosts_up.assert_called_once_with(self.context)
+
     @mock.patch.object(driver_cls, 'hosts_up')
     def test_select_destinations_no_valid_host(self, mock_hosts_up):
 
@@ -10,12 +10,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 import mock
 
 from zun.common import context
 from zun.common import exception
+from zun.image import digest
 from zun import objects
 from zun.scheduler import filter_scheduler
+from zun.scheduler import host_state
 from zun.tests import base
 from zun.tests.unit.db import utils
 
@@ -36,12 +40,32 @@ class FilterSchedulerTestCase(base.TestCase):
         super(FilterSchedulerTestCase, self).setUp()
         self.context = context.RequestContext('fake_user', 'fake_project')
         self.driver = self.driver_cls()
+        host_state.HostStateCache().clear()
+        self.addCleanup(host_state.HostStateCache().clear)
+
+    def _get_compute_node(self, hostname, mem_total=1024 * 128,
+                          mem_used=1024 * 4, updated_at=None,
+                          image_digest=None):
+        node = objects.ComputeNode(self.context)
+        node.cpus = 48
+        node.cpu_used = 0.0
+        node.mem_total = mem_total
+        node.mem_used = mem_used
+        node.hostname = hostname
+        node.numa_topology = None
+        node.labels = {}
+        node.total_containers = 0
+        node.image_digest = image_digest
+        node.created_at = None
+        node.updated_at = updated_at
+        return node
 
     @mock.patch.object(objects.ComputeNode, 'list')
     @mock.patch.object(objects.ZunService, 'list_by_binary')
     @mock.patch('random.choice')
     def test_select_destinations(self, mock_random_choice,
                                  mock_list_by_binary, mock_compute_list):
+        self.config(host_subset_size=4, group='scheduler')
         all_services = [FakeService('service1', 'host1'),
                         FakeService('service2', 'host2'),
                         FakeService('service3', 'host3'),
@@ -63,6 +87,7 @@ class FilterSchedulerTestCase(base.TestCase):
         node1.hostname = 'host1'
         node1.numa_topology = None
         node1.labels = {}
+        node1.total_containers = 0
         node2 = objects.ComputeNode(self.context)
         node2.cpus = 48
         node2.cpu_used = 0.0
@@ -71,6 +96,7 @@ class FilterSchedulerTestCase(base.TestCase):
         node2.hostname = 'host2'
         node2.numa_topology = None
         node2.labels = {}
+        node2.total_containers = 0
         node3 = objects.ComputeNode(self.context)
         node3.cpus = 48
         node3.cpu_used = 0.0
@@ -79,6 +105,7 @@ class FilterSchedulerTestCase(base.TestCase):
         node3.hostname = 'host3'
         node3.numa_topology = None
         node3.labels = {}
+        node3.total_containers = 0
         node4 = objects.ComputeNode(self.context)
         node4.cpus = 48
         node4.cpu_used = 0.0
@@ -87,6 +114,7 @@ class FilterSchedulerTestCase(base.TestCase):
         node4.hostname = 'host4'
         node4.numa_topology = None
         node4.labels = {}
+        node4.total_containers = 0
         nodes = [node1, node2, node3, node4]
         mock_compute_list.return_value = nodes
 
@@ -121,3 +149,172 @@ class FilterSchedulerTestCase(base.TestCase):
         self.assertRaises(exception.NoValidHost,
                           self.driver.select_destinations, self.context,
                           containers, extra_spec)
+
+    @mock.patch.object(objects.ComputeNode, 'list')
+    @mock.patch.object(objects.ZunService, 'list_by_binary')
+    @mock.patch('random.choice')
+    def test_select_destinations_consumes_resources(self, mock_random_choice,
+                                                    mock_list_by_binary,
+                                                    mock_compute_list):
+        mock_list_by_binary.return_value = [FakeService('service1', 'host1'),
+                                            FakeService('service2', 'host2')]
+        self.driver.servicegroup_api.service_is_up = mock.Mock(
+            return_value=True)
+        updated_at = datetime.datetime(2017, 6, 1)
+        nodes = [self._get_compute_node('host1', mem_total=1024, mem_used=0,
+                                        updated_at=updated_at),
+                 self._get_compute_node('host2', mem_total=1024, mem_used=0,
+                                        updated_at=updated_at)]
+
+        def _list_nodes(context, filters=None):
+            # None of the compute nodes has changed since the first refresh.
+            return [] if filters else nodes
+        mock_compute_list.side_effect = _list_nodes
+        mock_random_choice.side_effect = lambda hosts: hosts[0]
+        test_container = utils.get_test_container(memory='1024M')
+        containers = [objects.Container(self.context, **test_container),
+                      objects.Container(self.context, **test_container)]
+
+        dests = self.driver.select_destinations(self.context, containers, {})
+
+        self.assertEqual(['host1', 'host2'], [d['host'] for d in dests])
+        self.assertRaises(exception.NoValidHost,
+                          self.driver.select_destinations, self.context,
+                          containers[:1], {})
+
+    @mock.patch.object(objects.ComputeNode, 'list')
+    def test_host_state_cache_delta_refresh(self, mock_compute_list):
+        self.config(host_state_full_refresh_interval=300, group='scheduler')
+        node1 = self._get_compute_node(
+            'host1', updated_at=datetime.datetime(2017, 6, 1))
+        mock_compute_list.return_value = [node1,
+                                          self._get_compute_node('host2')]
+        cache = host_state.HostStateCache()
+        host_states = cache.get_all_host_states(self.context)
+        self.assertEqual(['host1', 'host2'],
+                         sorted(h.hostname for h in host_states))
+        mock_compute_list.assert_called_once_with(self.context)
+
+        mock_compute_list.reset_mock()
+        mock_compute_list.return_value = [self._get_compute_node(
+            'host1', mem_used=2048,
+            updated_at=datetime.datetime(2017, 6, 1, 0, 0, 30))]
+        host_states = cache.get_all_host_states(self.context, ['host1'])
+        mock_compute_list.assert_called_once_with(
+            self.context, filters={
+                'updated_since': node1.updated_at - datetime.timedelta(
+                    seconds=60)})
+        self.assertEqual(1, len(host_states))
+        self.assertEqual(2048, host_states[0].mem_used)
+
+        # A node read again in the overlap window keeps its consumption.
+        cache.consume(host_states[0], objects.Container(
+            self.context, **utils.get_test_container(memory='512M')))
+        host_states = cache.get_all_host_states(self.context, ['host1'])
+        self.assertEqual(2560, host_states[0].mem_used)
+
+        # A node whose late clock stamped a change older than the newest
+        # change seen is still refreshed.
+        mock_compute_list.return_value = [self._get_compute_node(
+            'host2', mem_used=1024,
+            updated_at=datetime.datetime(2017, 6, 1, 0, 0, 10))]
+        host_states = cache.get_all_host_states(self.context, ['host2'])
+        self.assertEqual(1024, host_states[0].mem_used)
+
+        self.config(host_state_full_refresh_interval=0, group='scheduler')
+        mock_compute_list.reset_mock()
+        host_states = cache.get_all_host_states(self.context)
+        mock_compute_list.assert_called_once_with(self.context)
+        self.assertEqual(['host2'], [h.hostname for h in host_states])
+
+    @mock.patch.object(objects.ComputeNode, 'list')
+    @mock.patch.object(objects.ZunService, 'list_by_binary')
+    def test_select_destinations_best_fit(self, mock_list_by_binary,
+                                          mock_compute_list):
+        mock_list_by_binary.return_value = [FakeService('service1', 'host1'),
+                                            FakeService('service2', 'host2'),
+                                            FakeService('service3', 'host3')]
+        self.driver.servicegroup_api.service_is_up = mock.Mock(
+            return_value=True)
+        mock_compute_list.return_value = [
+            self._get_compute_node('host1', mem_total=4096, mem_used=0),
+            self._get_compute_node('host2', mem_total=4096, mem_used=3072),
+            self._get_compute_node('host3', mem_total=4096, mem_used=2048)]
+        test_container = utils.get_test_container(memory='1024M', cpu=None)
+        containers = [objects.Container(self.context, **test_container)]
+
+        dests = self.driver.select_destinations(self.context, containers, {})
+        self.assertEqual('host2', dests[0]['host'])
+
+        self.config(ram_weight_multiplier=1.0, group='scheduler')
+        dests = self.driver.select_destinations(self.context, containers, {})
+        self.assertEqual('host1', dests[0]['host'])
+
+    @mock.patch.object(objects.ComputeNode, 'list')
+    @mock.patch.object(objects.ZunService, 'list_by_binary')
+    def test_select_destinations_image_locality(self, mock_list_by_binary,
+                                                mock_compute_list):
+        mock_list_by_binary.return_value = [FakeService('service1', 'host1'),
+                                            FakeService('service2', 'host2')]
+        self.driver.servicegroup_api.service_is_up = mock.Mock(
+            return_value=True)
+        image_digest = digest.ImageDigest.build(['ubuntu:latest'], 0.01)
+        mock_compute_list.return_value = [
+            self._get_compute_node('host1', mem_used=0),
+            self._get_compute_node('host2', mem_used=0,
+                                   image_digest=image_digest.to_string())]
+        test_container = utils.get_test_container(memory='1024M', cpu=None)
+        containers = [objects.Container(self.context, **test_container)]
+
+        dests = self.driver.select_destinations(self.context, containers, {})
+        self.assertEqual('host2', dests[0]['host'])
+
+        host_states = host_state.HostStateCache().get_all_host_states(
+            self.context, ['host2'])
+        self.assertTrue(host_states[0].image_digest.contains('ubuntu'))
+
+    @mock.patch.object(objects.ComputeNode, 'list')
+    @mock.patch.object(objects.ZunService, 'list_by_binary')
+    def test_select_destinations_rollback(self, mock_list_by_binary,
+                                          mock_compute_list):
+        mock_list_by_binary.return_value = [FakeService('service1', 'host1')]
+        self.driver.servicegroup_api.service_is_up = mock.Mock(
+            return_value=True)
+        mock_compute_list.return_value = [self._get_compute_node(
+            'host1', mem_total=1024, mem_used=0,
+            updated_at=datetime.datetime(2017, 6, 1))]
+        test_container = utils.get_test_container(memory='512M', cpu=1.0)
+        containers = [objects.Container(self.context, **test_container)
+                      for i in range(3)]
+
+        self.assertRaises(exception.NoValidHost,
+                          self.driver.select_destinations, self.context,
+                          containers, {})
+
+        host_states = host_state.HostStateCache().get_all_host_states(
+            self.context)
+        self.assertEqual(0, host_states[0].mem_used)
+        self.assertEqual(0.0, host_states[0].cpu_used)
+        self.assertEqual(0, host_states[0].total_containers)
+        mock_list_by_binary.assert_called_once_with(self.context,
+                                                    'zun-compute')
+
+    def test_host_state_cache_release_after_refresh(self):
+        cache = host_state.HostStateCache()
+        host = host_state.HostState('host1')
+        host.update_from_compute_node(self._get_compute_node(
+            'host1', mem_used=0))
+        container = objects.Container(self.context, **utils.get_test_container(
+            memory='512M', cpu=1.0))
+        generation = cache.consume(host, container)
+        self.assertEqual(512, host.mem_used)
+
+        # The compute node reported the placement meanwhile.
+        host.update_from_compute_node(self._get_compute_node(
+            'host1', mem_used=512))
+        cache.release(host, container, generation)
+        self.assertEqual(512, host.mem_used)
+
+        generation = cache.consume(host, container)
+        cache.release(host, container, generation)
+        self.assertEqual(512, host.mem_used)
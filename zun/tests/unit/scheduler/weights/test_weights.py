@@ -0,0 +1,131 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from zun.common import context
+from zun.image import digest
+from zun import objects
+from zun.scheduler import base_weights
+from zun.scheduler.host_state import HostState
+from zun.scheduler import weights
+from zun.scheduler.weights import container_count
+from zun.scheduler.weights import cpu
+from zun.scheduler.weights import image_locality
+from zun.scheduler.weights import ram
+from zun.tests import base
+
+
+class TestWeighers(base.TestCase):
+
+    def setUp(self):
+        super(TestWeighers, self).setUp()
+        self.context = context.RequestContext('fake_user', 'fake_project')
+        self.container = objects.Container(self.context)
+        self.weight_handler = weights.HostWeightHandler()
+        self.hosts = [
+            self._get_host('host1', mem_used=1024, cpu_used=8,
+                           total_containers=2),
+            self._get_host('host2', mem_used=3072, cpu_used=2,
+                           total_containers=8),
+            self._get_host('host3', mem_used=2048, cpu_used=4,
+                           total_containers=4)]
+
+    def _get_host(self, hostname, mem_used, cpu_used, total_containers):
+        host = HostState(hostname)
+        host.mem_total = 4096
+        host.mem_used = mem_used
+        host.cpus = 16
+        host.cpu_used = cpu_used
+        host.total_containers = total_containers
+        return host
+
+    def _get_weighed_hosts(self, weigher_classes, count=None):
+        return self.weight_handler.get_weighed_objects(
+            [cls() for cls in weigher_classes], self.hosts, self.container,
+            {}, count=count)
+
+    def test_all_weighers(self):
+        classes = weights.all_weighers()
+        self.assertEqual(
+            ['CPUWeigher', 'ContainerCountWeigher', 'ImageLocalityWeigher',
+             'RAMWeigher'],
+            sorted(cls.__name__ for cls in classes))
+
+    def test_normalize(self):
+        self.assertEqual((), base_weights.normalize([]))
+        self.assertEqual([0, 0], base_weights.normalize([3, 3]))
+        self.assertEqual([0.0, 0.5, 1.0],
+                         list(base_weights.normalize([1, 2, 3])))
+        self.assertEqual([0.5, 1.0],
+                         list(base_weights.normalize([2, 3], minval=1)))
+
+    def test_ram_weigher_pack(self):
+        weighed_hosts = self._get_weighed_hosts([ram.RAMWeigher])
+        self.assertEqual(['host2', 'host3', 'host1'],
+                         [h.obj.hostname for h in weighed_hosts])
+        self.assertEqual([0.0, -0.5, -1.0],
+                         [h.weight for h in weighed_hosts])
+
+    def test_ram_weigher_spread(self):
+        self.config(ram_weight_multiplier=2.0, group='scheduler')
+        weighed_hosts = self._get_weighed_hosts([ram.RAMWeigher])
+        self.assertEqual(['host1', 'host3', 'host2'],
+                         [h.obj.hostname for h in weighed_hosts])
+        self.assertEqual(2.0, weighed_hosts[0].weight)
+
+    def test_cpu_weigher(self):
+        weighed_hosts = self._get_weighed_hosts([cpu.CPUWeigher])
+        self.assertEqual(['host1', 'host3', 'host2'],
+                         [h.obj.hostname for h in weighed_hosts])
+
+    def test_container_count_weigher(self):
+        weighed_hosts = self._get_weighed_hosts(
+            [container_count.ContainerCountWeigher])
+        self.assertEqual([0.0, 0.0, 0.0], [h.weight for h in weighed_hosts])
+
+        self.config(container_count_weight_multiplier=1.0, group='scheduler')
+        weighed_hosts = self._get_weighed_hosts(
+            [container_count.ContainerCountWeigher])
+        self.assertEqual(['host1', 'host3', 'host2'],
+                         [h.obj.hostname for h in weighed_hosts])
+
+    def test_combined_weighers_top_k(self):
+        self.config(cpu_weight_multiplier=0.5, group='scheduler')
+        weighed_hosts = self._get_weighed_hosts(
+            [ram.RAMWeigher, cpu.CPUWeigher], count=2)
+        self.assertEqual(2, len(weighed_hosts))
+        # host1: -1.0 + 0.0, host2: 0.0 + 0.5, host3: -0.5 + 0.5 * 2 / 3
+        self.assertEqual(['host2', 'host3'],
+                         [h.obj.hostname for h in weighed_hosts])
+
+    def test_image_locality_weigher(self):
+        self.hosts[1].image_digest = digest.ImageDigest.build(
+            ['nginx:1.13'], 0.01)
+        self.hosts[2].image_digest = digest.ImageDigest.build(
+            ['nginx:latest'], 0.01)
+        self.container.image = 'nginx'
+        self.container.image_tag = ['1.13']
+        weighed_hosts = self._get_weighed_hosts(
+            [image_locality.ImageLocalityWeigher])
+        self.assertEqual('host2', weighed_hosts[0].obj.hostname)
+        self.assertEqual([1.0, 0.0, 0.0], [h.weight for h in weighed_hosts])
+
+        self.container.image_tag = None
+        weighed_hosts = self._get_weighed_hosts(
+            [image_locality.ImageLocalityWeigher])
+        self.assertEqual('host3', weighed_hosts[0].obj.hostname)
+
+    def test_image_locality_weigher_no_image(self):
+        self.hosts[0].image_digest = digest.ImageDigest.build(
+            ['nginx:latest'], 0.01)
+        weighed_hosts = self._get_weighed_hosts(
+            [image_locality.ImageLocalityWeigher])
+        self.assertEqual([0.0, 0.0, 0.0], [h.weight for h in weighed_hosts])
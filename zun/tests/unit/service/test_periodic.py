@@ -0,0 +1,78 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from zun.common import consts
+from zun.compute import manager
+import zun.conf
+from zun import objects
+from zun.service import periodic
+from zun.tests import base
+
+
+class ContainerStateSyncPeriodicJobTestCase(base.TestCase):
+    def setUp(self):
+        super(ContainerStateSyncPeriodicJobTestCase, self).setUp()
+        with mock.patch('zun.container.driver.load_container_driver'), \
+                mock.patch.object(periodic, 'ComputeNodeTracker'):
+            self.job = periodic.ContainerStateSyncPeriodicJob(zun.conf.CONF)
+        self.mock_update = self.job.driver.update_containers_states
+        self.addCleanup(manager._container_events_watched.clear)
+
+    @mock.patch.object(objects.Container, 'list')
+    def test_sync_container_state_without_events(self, mock_list):
+        for i in range(2):
+            self.job.sync_container_state(self.context)
+        self.assertEqual(2, self.mock_update.call_count)
+
+    @mock.patch.object(objects.Container, 'list')
+    def test_sync_container_state_with_events(self, mock_list):
+        manager._container_events_watched.set()
+        for i in range(2):
+            self.job.sync_container_state(self.context)
+        self.assertEqual(1, self.mock_update.call_count)
+
+        # The interval no longer applies once the events stop.
+        manager._container_events_watched.clear()
+        self.job.sync_container_state(self.context)
+        self.assertEqual(2, self.mock_update.call_count)
+
+    @mock.patch('zun.image.glance.image_cache.ImageCacheManager')
+    @mock.patch.object(objects.Container, 'list')
+    def test_manage_image_cache(self, mock_list, mock_cache_manager):
+        self.config(sandbox_image_driver='glance',
+                    sandbox_image='kubernetes/pause')
+        mock_list.return_value = [
+            objects.Container(self.context, image='cirros',
+                              image_tag=['latest'], image_driver='glance',
+                              status=consts.RUNNING),
+            objects.Container(self.context, image='ubuntu',
+                              image_tag=['16.04'], image_driver='docker',
+                              status=consts.RUNNING)]
+        self.job.manage_image_cache(self.context)
+        mock_cache_manager.return_value.set_in_use.assert_called_once_with(
+            [('cirros', ['latest']), ('kubernetes/pause', 'latest')])
+        mock_cache_manager.return_value.evict.assert_called_once_with()
+
+    @mock.patch('time.time')
+    def test_is_due(self, mock_time):
+        mock_time.return_value = 1000
+        self.assertTrue(self.job._is_due('task', 60))
+        self.assertFalse(self.job._is_due('task', 60))
+        self.assertFalse(self.job._is_due('delayed', 60,
+                                          run_immediately=False))
+        self.assertFalse(self.job._is_due('disabled', -1))
+        mock_time.return_value = 1060
+        self.assertTrue(self.job._is_due('task', 60))
+        self.assertTrue(self.job._is_due('delayed', 60,
+                                         run_immediately=False))